@@ -1,8 +1,11 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict
 
+from app.schemas.routing import RouteRule
+
 
 def find_env_file() -> Path | None:
     current = Path.cwd()
@@ -16,7 +19,39 @@ def find_env_file() -> Path | None:
 class Settings(BaseSettings):
     openai_api_key: str = ""
     openai_model: str = "gpt-5-mini"
+    openai_base_url: str = ""
+    openai_timeout: float = 60.0
+    openai_max_connections: int = 50
+    openai_max_keepalive_connections: int = 20
+    openai_keepalive_expiry: float = 60.0
+    llm_max_concurrency: int = 16
+    llm_max_queue: int = 64
+    llm_queue_timeout: float = 30.0
+    llm_tokens_per_minute: int = 0
+    llm_max_retries: int = 3
+    llm_hedge_after_ms: float = 0
+    llm_hedge_model: str = ""
+    llm_hedge_max_fraction: float = 0.1
+    # JSON list of RouteRule; empty sends every task to openai_model.
+    llm_routes: list[RouteRule] = []
+    generation_job_concurrency: int = 8
+    stream_disconnect_policy: Literal["discard", "persist"] = "discard"
+    llm_cache_path: str = "./data/llm_cache.db"
+    llm_cache_memory_entries: int = 256
+    llm_cache_ttl: int = 24 * 3600
     database_url: str = "sqlite:///./data/app.db"
+    pdf_extract_workers: int = 0
+    ncbi_api_key: str = ""
+    ncbi_email: str = ""
+    ncbi_tool: str = "message-writer"
+    ncbi_requests_per_second: float = 0
+    ncbi_max_retries: int = 3
+    pubmed_mirror_path: str = ""
+    pubmed_cache_path: str = "./data/pubmed_cache.db"
+    pubmed_cache_memory_entries: int = 2048
+    pubmed_search_ttl: int = 600
+    pubmed_article_ttl: int = 7 * 24 * 3600
+    pubmed_stale_while_revalidate: int = 0
 
     model_config = ConfigDict(
         env_file=find_env_file(),
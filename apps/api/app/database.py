@@ -43,6 +43,21 @@ def _setup_fts(connection):
     """))
 
 
+def _setup_chunk_terms(connection):
+    # Term ids are derived from content: drop them with the chunk or when it
+    # changes (backfill_chunk_terms recomputes missing rows).
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS chunk_terms_ad AFTER DELETE ON chunks BEGIN
+            DELETE FROM chunk_terms WHERE chunk_id = old.id;
+        END;
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS chunk_terms_au AFTER UPDATE OF content ON chunks BEGIN
+            DELETE FROM chunk_terms WHERE chunk_id = old.id;
+        END;
+    """))
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -57,4 +72,5 @@ def init_db(eng=None):
     Base.metadata.create_all(bind=target_engine)
     with target_engine.connect() as conn:
         _setup_fts(conn)
+        _setup_chunk_terms(conn)
         conn.commit()
@@ -1,19 +1,139 @@
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
 
 import httpx
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from app.database import init_db
-from app.routers import messages, references, search
+from app.config import settings
+from app.database import SessionLocal, init_db
+from app.routers import generation_jobs, messages, metrics, references, search
+from app.services.chunk_terms import backfill_chunk_terms
+from app.services.generation_jobs import GenerationJobRunner
+from app.services.llm_cache import CachingProvider, LLMResponseCache
+from app.services.llm_governor import GovernedProvider, LLMGovernor, LLMOverloaded
+from app.services.llm_hedging import HedgedProvider
+from app.services.llm_provider import LLMProvider, build_llm_provider
+from app.services.llm_routing import ModelRouter
+from app.services.ncbi_transport import NCBITransport, ncbi_limits
+from app.services.pubmed_cache import PubMedCache
+from app.services.pubmed_history import SearchSessionStore
+from app.services.pubmed_mirror import PubMedMirror
+from app.services.search_staging import SearchStaging
+from app.services.stream_generation import StreamDisconnects
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
-    app.state.http_client = httpx.AsyncClient(timeout=10.0)
+    with SessionLocal() as db:
+        backfill_chunk_terms(db)
+    app.state.http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(10.0, connect=5.0),
+        limits=ncbi_limits(),
+    )
+    app.state.ncbi_transport = NCBITransport(
+        app.state.http_client,
+        api_key=settings.ncbi_api_key,
+        requests_per_second=settings.ncbi_requests_per_second,
+        tool=settings.ncbi_tool,
+        email=settings.ncbi_email,
+        max_retries=settings.ncbi_max_retries,
+    )
+    app.state.search_sessions = SearchSessionStore()
+    app.state.search_staging = SearchStaging()
+    app.state.pubmed_mirror = None
+    if settings.pubmed_mirror_path:
+        app.state.pubmed_mirror = PubMedMirror(settings.pubmed_mirror_path)
+    app.state.pubmed_cache = None
+    if settings.pubmed_cache_path:
+        app.state.pubmed_cache = PubMedCache(
+            settings.pubmed_cache_path,
+            memory_entries=settings.pubmed_cache_memory_entries,
+            search_ttl=settings.pubmed_search_ttl,
+            article_ttl=settings.pubmed_article_ttl,
+            stale_while_revalidate=settings.pubmed_stale_while_revalidate,
+        )
+    app.state.llm_provider = build_llm_provider(settings)
+    base_provider = app.state.llm_provider
+    app.state.llm_governor = None
+    if settings.openai_api_key:
+        app.state.llm_governor = LLMGovernor(
+            max_concurrency=settings.llm_max_concurrency,
+            max_queue=settings.llm_max_queue,
+            tokens_per_minute=settings.llm_tokens_per_minute,
+            queue_timeout=settings.llm_queue_timeout,
+        )
+    # Hedging sits inside the governor, which admits the primary request; the
+    # hedge takes its own slot and TPM budget only if both are free.
+    app.state.llm_hedging = None
+    if settings.openai_api_key and settings.llm_hedge_after_ms > 0:
+        primary = app.state.llm_provider
+        hedge = primary.with_model(settings.llm_hedge_model) if settings.llm_hedge_model else primary
+        app.state.llm_hedging = HedgedProvider(
+            primary,
+            hedge,
+            settings.llm_hedge_after_ms / 1000,
+            governor=app.state.llm_governor,
+            max_fraction=settings.llm_hedge_max_fraction,
+        )
+        app.state.llm_provider = app.state.llm_hedging
+    if app.state.llm_governor is not None:
+        app.state.llm_provider = GovernedProvider(
+            app.state.llm_provider, app.state.llm_governor, max_retries=settings.llm_max_retries
+        )
+    # The cache wraps the governor so hits and joined requests use no capacity.
+    app.state.llm_cache = None
+    if settings.llm_cache_path and settings.openai_api_key:
+        app.state.llm_cache = LLMResponseCache(
+            settings.llm_cache_path,
+            memory_entries=settings.llm_cache_memory_entries,
+            ttl=settings.llm_cache_ttl,
+        )
+        app.state.llm_cache.purge_expired()
+        app.state.llm_provider = CachingProvider(app.state.llm_provider, app.state.llm_cache)
+    # Routed models share the default chain's pooled clients, governor and
+    # cache; hedging stays on the default model.
+    app.state.llm_router = None
+    if settings.openai_api_key and settings.llm_routes:
+        def build_routed(model: str) -> LLMProvider:
+            provider = GovernedProvider(
+                base_provider.with_model(model), app.state.llm_governor, max_retries=settings.llm_max_retries
+            )
+            if app.state.llm_cache is not None:
+                provider = CachingProvider(provider, app.state.llm_cache)
+            return provider
+
+        app.state.llm_router = ModelRouter(settings.llm_routes, app.state.llm_provider, build_routed)
+    app.state.stream_disconnects = StreamDisconnects(settings.stream_disconnect_policy)
+    app.state.generation_jobs = GenerationJobRunner(
+        SessionLocal,
+        app.state.llm_provider,
+        concurrency=settings.generation_job_concurrency,
+        router=app.state.llm_router,
+    )
+    await app.state.generation_jobs.resume()
+    app.state.pdf_executor = None
+    if settings.pdf_extract_workers > 0:
+        app.state.pdf_executor = ProcessPoolExecutor(
+            max_workers=settings.pdf_extract_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
     yield
+    await app.state.generation_jobs.shutdown()
     await app.state.http_client.aclose()
+    await app.state.llm_provider.aclose()
+    if app.state.pubmed_cache is not None:
+        app.state.pubmed_cache.close()
+    if app.state.pubmed_mirror is not None:
+        app.state.pubmed_mirror.close()
+    if app.state.llm_cache is not None:
+        app.state.llm_cache.close()
+    if app.state.pdf_executor is not None:
+        app.state.pdf_executor.shutdown(cancel_futures=True)
 
 
 app = FastAPI(title="Message Writer API", lifespan=lifespan)
@@ -25,9 +145,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(LLMOverloaded)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
 app.include_router(search.router)
 app.include_router(references.router)
 app.include_router(messages.router)
+app.include_router(generation_jobs.router)
+app.include_router(metrics.router)
 
 
 @app.get("/health")
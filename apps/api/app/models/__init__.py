@@ -1,8 +1,13 @@
 from app.database import Base
 from app.models.reference import Reference
 from app.models.chunk import Chunk
+from app.models.chunk_terms import ChunkTerms
 from app.models.working_set_item import WorkingSetItem
 from app.models.message import Message
 from app.models.message_version import MessageVersion
+from app.models.generation_job import GenerationJob, GenerationJobItem
+from app.models.generation_usage import GenerationUsage
+from app.models.generation_route import GenerationRoute
+from app.models.message_variant import MessageVariant
 
-__all__ = ["Base", "Reference", "Chunk", "WorkingSetItem", "Message", "MessageVersion"]
+__all__ = ["Base", "Reference", "Chunk", "ChunkTerms", "WorkingSetItem", "Message", "MessageVersion", "GenerationJob", "GenerationJobItem", "GenerationUsage", "GenerationRoute", "MessageVariant"]
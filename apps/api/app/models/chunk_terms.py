@@ -0,0 +1,13 @@
+from sqlalchemy import ForeignKey, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class ChunkTerms(Base):
+    # Sorted term ids of a chunk's normalized text, packed as int32 (see
+    # services/chunk_terms.py). Kept in step with chunks by triggers.
+    __tablename__ = "chunk_terms"
+
+    chunk_id: Mapped[int] = mapped_column(ForeignKey("chunks.id", ondelete="CASCADE"), primary_key=True)
+    term_ids: Mapped[bytes] = mapped_column(LargeBinary)
@@ -0,0 +1,21 @@
+from sqlalchemy import ForeignKey, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class GenerationRoute(Base):
+    # The routing decision behind a version; latency and tokens are on its
+    # generation_usage row.
+    __tablename__ = "generation_routes"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    message_version_id: Mapped[int] = mapped_column(
+        ForeignKey("message_versions.id", ondelete="CASCADE"), unique=True
+    )
+    task: Mapped[str] = mapped_column(String)
+    rule: Mapped[str] = mapped_column(String)
+    model: Mapped[str] = mapped_column(String)
+    hint: Mapped[str | None] = mapped_column(String, nullable=True)
+    prompt_chars: Mapped[int] = mapped_column(default=0)
+    evidence_chars: Mapped[int] = mapped_column(default=0)
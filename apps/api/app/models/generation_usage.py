@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import ForeignKey, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class GenerationUsage(Base):
+    __tablename__ = "generation_usage"
+    __table_args__ = (Index("ix_generation_usage_created_at", "created_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    message_version_id: Mapped[int] = mapped_column(
+        ForeignKey("message_versions.id", ondelete="CASCADE"), unique=True
+    )
+    model: Mapped[str] = mapped_column(String)
+    prompt_tokens: Mapped[int] = mapped_column(default=0)
+    completion_tokens: Mapped[int] = mapped_column(default=0)
+    cached_tokens: Mapped[int] = mapped_column(default=0)
+    latency_ms: Mapped[float] = mapped_column(default=0.0)
+    ttft_ms: Mapped[float | None] = mapped_column(nullable=True)
+    cache_hit: Mapped[bool] = mapped_column(default=False)
+    chunk_count: Mapped[int] = mapped_column(default=0)
+    supported_claims: Mapped[int] = mapped_column(default=0)
+    dropped_claims: Mapped[int] = mapped_column(default=0)
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
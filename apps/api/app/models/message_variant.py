@@ -0,0 +1,13 @@
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class MessageVariant(Base):
+    # Sibling messages generated together; group_id is the first sibling's id.
+    __tablename__ = "message_variants"
+
+    message_id: Mapped[int] = mapped_column(ForeignKey("messages.id", ondelete="CASCADE"), primary_key=True)
+    group_id: Mapped[int] = mapped_column(ForeignKey("messages.id", ondelete="CASCADE"), index=True)
+    variant_index: Mapped[int] = mapped_column(default=0)
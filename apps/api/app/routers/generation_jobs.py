@@ -0,0 +1,54 @@
+import asyncio
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from sse_starlette import EventSourceResponse
+
+from app.database import get_db
+from app.schemas.generation import BatchGenerateRequest, GenerationJobItemResult, GenerationJobStatus
+from app.services.generation_jobs import (
+    GenerationJobRunner,
+    create_job,
+    get_generation_jobs,
+    get_job,
+    job_results,
+    stream_job_results,
+)
+
+router = APIRouter(prefix="/generation-jobs", tags=["generation-jobs"])
+
+
+@router.post("", response_model=GenerationJobStatus, status_code=202)
+async def create_generation_job(
+    request: BatchGenerateRequest,
+    db: Session = Depends(get_db),
+    runner: GenerationJobRunner = Depends(get_generation_jobs),
+) -> GenerationJobStatus:
+    def _create() -> GenerationJobStatus:
+        job = create_job(db, request.prompts, request.reference_ids, request.top_k)
+        return GenerationJobStatus.model_validate(job)
+
+    status = await asyncio.get_running_loop().run_in_executor(None, _create)
+    runner.start(status.id)
+    return status
+
+
+@router.get("/{job_id}", response_model=GenerationJobStatus)
+def get_generation_job(job_id: int, db: Session = Depends(get_db)) -> GenerationJobStatus:
+    return GenerationJobStatus.model_validate(get_job(db, job_id))
+
+
+@router.get("/{job_id}/results", response_model=list[GenerationJobItemResult])
+def get_generation_job_results(job_id: int, db: Session = Depends(get_db)) -> list[GenerationJobItemResult]:
+    get_job(db, job_id)
+    return job_results(db, job_id)
+
+
+@router.get("/{job_id}/results/stream")
+def stream_generation_job_results(
+    job_id: int,
+    db: Session = Depends(get_db),
+    runner: GenerationJobRunner = Depends(get_generation_jobs),
+):
+    get_job(db, job_id)
+    return EventSourceResponse(stream_job_results(db, runner, job_id))
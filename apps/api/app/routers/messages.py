@@ -1,8 +1,7 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from sse_starlette import EventSourceResponse
 
-from app.config import settings
 from app.database import get_db
 from app.schemas.generation import GenerateRequest, GenerateResponse
 from app.schemas.messages import (
@@ -17,32 +16,47 @@ from app.schemas.messages import (
 )
 from app.services.editing import edit_message, get_message, list_messages, refine_message, update_status
 from app.services.generation import generate_message
-from app.services.llm_provider import (
-    LLMGenerationResult,
-    LLMProvider,
-    MockProvider,
-    OpenAIProvider,
-)
-from app.services.stream_generation import stream_generate_pipeline
+from app.services.llm_governor import LLMGovernor
+from app.services.llm_provider import LLMProvider
+from app.services.llm_routing import ModelRouter
+from app.services.stream_generation import StreamDisconnects, stream_generate_pipeline
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
 
-def get_llm_provider() -> LLMProvider:
-    if settings.openai_api_key:
-        return OpenAIProvider(api_key=settings.openai_api_key, model=settings.openai_model)
-    return MockProvider(fixed_result=LLMGenerationResult(claims=[]))
+def get_llm_provider(request: Request) -> LLMProvider:
+    return request.app.state.llm_provider
+
+
+def get_llm_governor(request: Request) -> LLMGovernor | None:
+    return getattr(request.app.state, "llm_governor", None)
+
+
+def get_llm_router(request: Request) -> ModelRouter | None:
+    return getattr(request.app.state, "llm_router", None)
+
+
+def get_stream_disconnects(request: Request) -> StreamDisconnects | None:
+    return getattr(request.app.state, "stream_disconnects", None)
 
 
 @router.post("/generate", response_model=GenerateResponse)
-def generate(
+async def generate(
     request: GenerateRequest,
     db: Session = Depends(get_db),
     llm: LLMProvider = Depends(get_llm_provider),
+    model_router: ModelRouter | None = Depends(get_llm_router),
 ) -> GenerateResponse:
-    response = generate_message(db, request.prompt, request.reference_ids, llm, request.top_k)
-    db.commit()
-    return response
+    return await generate_message(
+        db,
+        request.prompt,
+        request.reference_ids,
+        llm,
+        request.top_k,
+        request.variants,
+        model_router,
+        request.model_hint,
+    )
 
 
 @router.post("/generate/stream")
@@ -50,9 +64,26 @@ async def generate_stream(
     request: GenerateRequest,
     db: Session = Depends(get_db),
     llm: LLMProvider = Depends(get_llm_provider),
+    governor: LLMGovernor | None = Depends(get_llm_governor),
+    disconnects: StreamDisconnects | None = Depends(get_stream_disconnects),
+    model_router: ModelRouter | None = Depends(get_llm_router),
 ):
+    # Shed load before the 200 and the event stream start; once streaming,
+    # an overload can only be reported as an error event.
+    if governor is not None:
+        governor.check_capacity()
     return EventSourceResponse(
-        stream_generate_pipeline(db, request.prompt, request.reference_ids, llm, request.top_k)
+        stream_generate_pipeline(
+            db,
+            request.prompt,
+            request.reference_ids,
+            llm,
+            request.top_k,
+            request.variants,
+            disconnects,
+            model_router,
+            request.model_hint,
+        )
     )
 
 
@@ -67,15 +98,24 @@ def get_message_detail(message_id: int, db: Session = Depends(get_db)) -> Messag
 
 
 @router.post("/{message_id}/refine", response_model=RefineResponse)
-def refine(
+async def refine(
     message_id: int,
     request: RefineRequest,
     db: Session = Depends(get_db),
     llm: LLMProvider = Depends(get_llm_provider),
+    model_router: ModelRouter | None = Depends(get_llm_router),
 ) -> RefineResponse:
-    response = refine_message(db, message_id, request.instruction, request.reference_ids, llm, request.top_k)
-    db.commit()
-    return response
+    return await refine_message(
+        db,
+        message_id,
+        request.instruction,
+        request.reference_ids,
+        llm,
+        request.top_k,
+        request.mode,
+        model_router,
+        request.model_hint,
+    )
 
 
 @router.put("/{message_id}", response_model=EditResponse)
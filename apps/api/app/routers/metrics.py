@@ -0,0 +1,94 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.schemas.usage import ExpensiveGeneration, UsageBucket
+from app.services.usage import expensive_generations, usage_summary
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/pubmed-cache")
+def pubmed_cache_stats(request: Request) -> dict:
+    cache = request.app.state.pubmed_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.get("/ncbi")
+def ncbi_transport_stats(request: Request) -> dict:
+    return dict(request.app.state.ncbi_transport.stats)
+
+
+@router.get("/search-staging")
+def search_staging_stats(request: Request) -> dict:
+    return dict(request.app.state.search_staging.stats)
+
+
+@router.get("/llm-cache")
+def llm_cache_stats(request: Request) -> dict:
+    cache = request.app.state.llm_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats}
+
+
+@router.get("/llm-governor")
+def llm_governor_stats(request: Request) -> dict:
+    governor = request.app.state.llm_governor
+    if governor is None:
+        return {"enabled": False}
+    stats = dict(governor.stats)
+    stats["wait_ms_avg"] = round(stats["wait_ms_total"] / stats["admitted"], 1) if stats["admitted"] else 0.0
+    return {"enabled": True, "max_concurrency": governor.max_concurrency, "max_queue": governor.max_queue, **stats}
+
+
+@router.get("/llm-hedging")
+def llm_hedging_stats(request: Request) -> dict:
+    hedging = request.app.state.llm_hedging
+    if hedging is None:
+        return {"enabled": False}
+    stats = dict(hedging.stats)
+    stats["hedge_rate"] = round(stats["hedged"] / stats["streams"], 3) if stats["streams"] else 0.0
+    stats["hedge_win_rate"] = round(stats["hedge_wins"] / stats["hedged"], 3) if stats["hedged"] else 0.0
+    return {"enabled": True, "hedge_after_ms": hedging.hedge_after * 1000, "hedge_model": hedging.hedge.model, **stats}
+
+
+@router.get("/llm-routing")
+def llm_routing_stats(request: Request) -> dict:
+    routing = request.app.state.llm_router
+    if routing is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "default_model": routing.model,
+        "rules": [rule.model_dump() for rule in routing.rules],
+        "decisions": dict(routing.stats),
+    }
+
+
+@router.get("/stream-disconnects")
+def stream_disconnect_stats(request: Request) -> dict:
+    disconnects = request.app.state.stream_disconnects
+    return {"on_disconnect": disconnects.on_disconnect, **disconnects.stats}
+
+
+@router.get("/llm-usage")
+def llm_usage(
+    group_by: Literal["day", "model", "route"] = "day",
+    days: int = Query(default=30, ge=1, le=365),
+    db: Session = Depends(get_db),
+) -> list[UsageBucket]:
+    return usage_summary(db, group_by, days)
+
+
+@router.get("/llm-usage/expensive")
+def llm_usage_expensive(
+    days: int = Query(default=30, ge=1, le=365),
+    limit: int = Query(default=20, ge=1, le=200),
+    db: Session = Depends(get_db),
+) -> list[ExpensiveGeneration]:
+    return expensive_generations(db, days, limit)
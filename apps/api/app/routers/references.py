@@ -1,4 +1,9 @@
 import json
+import tempfile
+import zipfile
+from concurrent.futures import Executor
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO
 
 import httpx
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
@@ -10,17 +15,35 @@ from app.models.chunk import Chunk
 from app.models.reference import Reference
 from app.models.working_set_item import WorkingSetItem
 from app.schemas.references import (
+    BatchUploadItem,
+    BatchUploadResponse,
+    BulkPubMedImportItem,
+    BulkPubMedImportRequest,
+    BulkPubMedImportResponse,
     ReferenceListResponse,
     ReferenceResponse,
     SaveFromPubMedRequest,
     UploadResponse,
 )
+from app.services.chunk_store import insert_chunks
 from app.services.chunking import chunk_text
-from app.services.pdf_extraction import extract_text_from_pdf
+from app.services.pdf_extraction import get_pdf_executor
+from app.services.pdf_ingest import (
+    InvalidPdf,
+    PdfTooLarge,
+    PdfUploadError,
+    ingest_pdf,
+    ingest_pdf_batch,
+    spool_pdf_upload,
+)
 from app.services.pubmed_client import PubMedClient, get_pubmed_client
+from app.services.search_staging import SearchStaging, get_search_staging
 
 router = APIRouter(prefix="/references", tags=["references"])
 
+MAX_BATCH_FILES = 500
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
+
 
 def _to_response(ref: Reference, chunk_count: int) -> ReferenceResponse:
     return ReferenceResponse(
@@ -33,11 +56,30 @@ def _to_response(ref: Reference, chunk_count: int) -> ReferenceResponse:
     )
 
 
+def _add_pubmed_reference(db: Session, article: dict, chunks: list[str] | None = None) -> tuple[Reference, int]:
+    ref = Reference(
+        pmid=article["pmid"],
+        title=article["title"],
+        authors=", ".join(article["authors"]) or None,
+        abstract=article["abstract"] or None,
+        source="pubmed",
+    )
+    db.add(ref)
+    db.flush()
+
+    if chunks is None:
+        chunks = chunk_text(article["abstract"])
+    chunk_count = insert_chunks(db, ref.id, chunks)
+    db.add(WorkingSetItem(reference_id=ref.id))
+    return ref, chunk_count
+
+
 @router.post("/from-pubmed", response_model=ReferenceResponse, status_code=201)
 async def save_from_pubmed(
     body: SaveFromPubMedRequest,
     db: Session = Depends(get_db),
     pubmed: PubMedClient = Depends(get_pubmed_client),
+    staging: SearchStaging = Depends(get_search_staging),
 ) -> ReferenceResponse:
     existing = db.query(Reference).filter(Reference.pmid == body.pmid).first()
     if existing:
@@ -52,32 +94,100 @@ async def save_from_pubmed(
         ).scalar() or 0
         return _to_response(existing, count)
 
-    try:
-        article = await pubmed.fetch_by_pmid(body.pmid)
-    except httpx.HTTPError:
-        raise HTTPException(status_code=502, detail="PubMed API unavailable")
-    if article is None:
-        raise HTTPException(status_code=404, detail="Article not found on PubMed")
+    staged = staging.get(body.pmid)
+    if staged is not None:
+        article, chunks = staged.article, staged.chunks
+    else:
+        try:
+            article = await pubmed.fetch_by_pmid(body.pmid)
+        except httpx.HTTPError:
+            raise HTTPException(status_code=502, detail="PubMed API unavailable")
+        if article is None:
+            raise HTTPException(status_code=404, detail="Article not found on PubMed")
+        chunks = None
 
-    ref = Reference(
-        pmid=article["pmid"],
-        title=article["title"],
-        authors=", ".join(article["authors"]) or None,
-        abstract=article["abstract"] or None,
-        source="pubmed",
-    )
-    db.add(ref)
-    db.flush()
+    ref, chunk_count = _add_pubmed_reference(db, article, chunks)
+    db.commit()
+    staging.discard([body.pmid])
+    db.refresh(ref)
 
-    chunks_text = chunk_text(article["abstract"])
-    for i, content in enumerate(chunks_text):
-        db.add(Chunk(reference_id=ref.id, content=content, chunk_index=i))
+    return _to_response(ref, chunk_count)
+
+
+@router.post("/from-pubmed/bulk", response_model=BulkPubMedImportResponse, status_code=201)
+async def bulk_import_from_pubmed(
+    body: BulkPubMedImportRequest,
+    db: Session = Depends(get_db),
+    pubmed: PubMedClient = Depends(get_pubmed_client),
+    staging: SearchStaging = Depends(get_search_staging),
+) -> BulkPubMedImportResponse:
+    pmids = list(dict.fromkeys(p.strip() for p in body.pmids if p.strip()))
+    results: dict[str, BulkPubMedImportItem] = {}
+
+    existing = {
+        ref.pmid: ref.id
+        for ref in db.query(Reference.pmid, Reference.id).filter(Reference.pmid.in_(pmids))
+    }
+    if existing:
+        in_working_set = {
+            rid for (rid,) in db.query(WorkingSetItem.reference_id)
+            .filter(WorkingSetItem.reference_id.in_(existing.values()))
+        }
+        counts = dict(
+            db.query(Chunk.reference_id, func.count(Chunk.id))
+            .filter(Chunk.reference_id.in_(existing.values()))
+            .group_by(Chunk.reference_id)
+        )
+        for pmid, ref_id in existing.items():
+            if ref_id not in in_working_set:
+                db.add(WorkingSetItem(reference_id=ref_id))
+            results[pmid] = BulkPubMedImportItem(
+                pmid=pmid, status="existing", reference_id=ref_id, chunk_count=counts.get(ref_id, 0),
+            )
+
+    to_fetch = []
+    from_staging = []
+    for pmid in pmids:
+        if pmid in existing:
+            continue
+        staged = staging.get(pmid)
+        if staged is None:
+            to_fetch.append(pmid)
+            continue
+        from_staging.append(pmid)
+        ref, chunk_count = _add_pubmed_reference(db, staged.article, staged.chunks)
+        results[pmid] = BulkPubMedImportItem(
+            pmid=pmid, status="imported", reference_id=ref.id, chunk_count=chunk_count,
+        )
+
+    if to_fetch:
+        # fetch_by_pmids splits the PMIDs into efetch-sized batches itself.
+        try:
+            articles = await pubmed.fetch_by_pmids(to_fetch)
+        except httpx.HTTPError:
+            articles = []
+            for pmid in to_fetch:
+                results[pmid] = BulkPubMedImportItem(pmid=pmid, status="failed", error="PubMed API unavailable")
+        requested = set(to_fetch)
+        for article in articles:
+            if article["pmid"] not in requested or article["pmid"] in results:
+                continue
+            ref, chunk_count = _add_pubmed_reference(db, article)
+            results[article["pmid"]] = BulkPubMedImportItem(
+                pmid=article["pmid"], status="imported", reference_id=ref.id, chunk_count=chunk_count,
+            )
 
-    db.add(WorkingSetItem(reference_id=ref.id))
     db.commit()
-    db.refresh(ref)
+    staging.discard(from_staging)
 
-    return _to_response(ref, len(chunks_text))
+    items = [results.get(p) or BulkPubMedImportItem(pmid=p, status="not_found") for p in pmids]
+    return BulkPubMedImportResponse(
+        results=items,
+        imported=sum(1 for i in items if i.status == "imported"),
+        existing=sum(1 for i in items if i.status == "existing"),
+        not_found=sum(1 for i in items if i.status == "not_found"),
+        failed=sum(1 for i in items if i.status == "failed"),
+    )
 
 
 @router.post("/upload", response_model=UploadResponse, status_code=201)
@@ -85,38 +195,36 @@ def upload_pdf(
     file: UploadFile = File(...),
     title: str | None = Form(None),
     db: Session = Depends(get_db),
+    pdf_executor: Executor | None = Depends(get_pdf_executor),
 ) -> UploadResponse:
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Only PDF files are accepted")
 
-    pdf_bytes = file.file.read()
-
-    if len(pdf_bytes) > 50_000_000:
-        raise HTTPException(status_code=413, detail="File too large (max 50MB)")
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as spooled:
+        try:
+            spool_pdf_upload(file.file, spooled)
+        except InvalidPdf as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except PdfTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
 
-    if not pdf_bytes[:5].startswith(b"%PDF-"):
-        raise HTTPException(status_code=400, detail="Invalid PDF file")
+        ref_title = title or file.filename or "Untitled"
 
-    ref_title = title or file.filename or "Untitled"
-
-    ref = Reference(title=ref_title, source="pdf_upload", status="processing")
-    db.add(ref)
-    db.flush()
-
-    try:
-        text = extract_text_from_pdf(pdf_bytes)
-    except Exception as e:
-        ref.status = "failed"
-        ref.extraction_meta = json.dumps({"error": str(e)})
-        db.commit()
-        return UploadResponse(
-            reference_id=ref.id, title=ref.title, status="failed",
-            char_count=0, chunk_count=0,
-        )
+        ref = Reference(title=ref_title, source="pdf_upload", status="processing")
+        db.add(ref)
+        db.flush()
 
-    chunks = chunk_text(text)
-    for i, content in enumerate(chunks):
-        db.add(Chunk(reference_id=ref.id, content=content, chunk_index=i))
+        try:
+            with db.begin_nested():
+                char_count, chunk_count = ingest_pdf(db, ref.id, spooled.name, pdf_executor)
+        except Exception as e:
+            ref.status = "failed"
+            ref.extraction_meta = json.dumps({"error": str(e)})
+            db.commit()
+            return UploadResponse(
+                reference_id=ref.id, title=ref.title, status="failed",
+                char_count=0, chunk_count=0,
+            )
 
     db.add(WorkingSetItem(reference_id=ref.id))
     ref.status = "processed"
@@ -124,10 +232,71 @@ def upload_pdf(
 
     return UploadResponse(
         reference_id=ref.id, title=ref.title, status="processed",
-        char_count=len(text), chunk_count=len(chunks),
+        char_count=char_count, chunk_count=chunk_count,
     )
 
 
+def _check_batch_size(entries: list) -> None:
+    # Checked before each member is spooled, so an archive with too many
+    # members is rejected before it fills the temp dir.
+    if len(entries) >= MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"Too many files (max {MAX_BATCH_FILES})")
+
+
+def _spool_batch_member(filename: str, src: BinaryIO, path: Path) -> tuple[str, Path] | BatchUploadItem:
+    try:
+        with open(path, "wb") as dest:
+            spool_pdf_upload(src, dest)
+    except PdfUploadError as e:
+        return BatchUploadItem(
+            filename=filename, reference_id=None, status="failed",
+            char_count=0, chunk_count=0, error=str(e),
+        )
+    return filename, path
+
+
+@router.post("/upload/batch", response_model=BatchUploadResponse, status_code=201)
+def upload_pdf_batch(
+    files: list[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    pdf_executor: Executor | None = Depends(get_pdf_executor),
+) -> BatchUploadResponse:
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        entries: list[tuple[str, Path] | BatchUploadItem] = []
+
+        for file in files:
+            filename = file.filename or "Untitled"
+            if file.content_type in ZIP_CONTENT_TYPES or filename.lower().endswith(".zip"):
+                try:
+                    archive = zipfile.ZipFile(file.file)
+                except zipfile.BadZipFile:
+                    raise HTTPException(status_code=400, detail=f"Invalid zip archive: {filename}")
+                with archive:
+                    for member in archive.infolist():
+                        name = PurePosixPath(member.filename)
+                        if member.is_dir() or name.suffix.lower() != ".pdf" or name.name.startswith("."):
+                            continue
+                        _check_batch_size(entries)
+                        with archive.open(member) as src:
+                            entries.append(_spool_batch_member(name.name, src, tmp_dir / f"{len(entries)}.pdf"))
+            elif file.content_type == "application/pdf":
+                _check_batch_size(entries)
+                entries.append(_spool_batch_member(filename, file.file, tmp_dir / f"{len(entries)}.pdf"))
+            else:
+                raise HTTPException(status_code=400, detail=f"Only PDF files or zip archives are accepted: {filename}")
+
+        if not entries:
+            raise HTTPException(status_code=400, detail="No PDF files in upload")
+
+        spooled = [e for e in entries if isinstance(e, tuple)]
+        ingested = iter(ingest_pdf_batch(db, spooled, pdf_executor))
+
+    results = [next(ingested) if isinstance(e, tuple) else e for e in entries]
+    processed = sum(1 for r in results if r.status == "processed")
+    return BatchUploadResponse(results=results, processed=processed, failed=len(results) - processed)
+
+
 @router.get("/", response_model=ReferenceListResponse)
 def list_references(db: Session = Depends(get_db)) -> ReferenceListResponse:
     chunk_count_sub = (
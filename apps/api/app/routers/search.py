@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
 from app.schemas.references import PubMedResult, SearchResponse
 from app.services.pubmed_client import PubMedClient, get_pubmed_client
+from app.services.search_staging import SearchStaging, get_search_staging
 
 router = APIRouter(tags=["search"])
 
@@ -9,11 +10,17 @@ router = APIRouter(tags=["search"])
 @router.get("/search", response_model=SearchResponse)
 async def search(
     query: str = "",
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=20, ge=1, le=100),
     pubmed: PubMedClient = Depends(get_pubmed_client),
+    staging: SearchStaging = Depends(get_search_staging),
 ) -> SearchResponse:
     if not query.strip():
-        return SearchResponse(results=[])
+        return SearchResponse(results=[], page=page, page_size=page_size)
 
-    raw_results = await pubmed.search(query)
+    raw_results, total = await pubmed.search_page(query, page, page_size)
+    # Users usually import one of the top hits next; keep them parsed and
+    # pre-chunked so the import is a local insert.
+    await staging.stage(raw_results)
     results = [PubMedResult(**r) for r in raw_results]
-    return SearchResponse(results=results)
+    return SearchResponse(results=results, total=total, page=page, page_size=page_size)
@@ -11,6 +11,9 @@ class ClaimStatus(str, Enum):
 class Citation(BaseModel):
     reference_id: int
     chunk_id: int
+    # Set when the verifier replaced the model's citation with a retrieved
+    # chunk that supports the claim.
+    repaired: bool = False
 
 
 class Claim(BaseModel):
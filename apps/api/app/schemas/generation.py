@@ -1,12 +1,22 @@
-from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, ConfigDict, Field
 
 from app.schemas.claims import Claim
 
 
+MAX_VARIANTS = 4
+
+
 class GenerateRequest(BaseModel):
     prompt: str = Field(min_length=1)
     reference_ids: list[int]
     top_k: int = Field(default=5, ge=1)
+    # Sibling messages generated from one retrieval pass.
+    variants: int = Field(default=1, ge=1, le=MAX_VARIANTS)
+    # Matched against LLM_ROUTES rules, e.g. "fast"; unmatched hints use the default model.
+    model_hint: str | None = None
 
 
 class GenerateResponse(BaseModel):
@@ -14,3 +24,38 @@ class GenerateResponse(BaseModel):
     message_text: str
     claims: list[Claim]
     warnings: list[str]
+    variant: int = 0
+    # Every sibling when more than one variant was requested; the top-level
+    # fields are variant 0.
+    variants: list["GenerateResponse"] = []
+
+
+MAX_BATCH_PROMPTS = 1000
+
+
+class BatchGenerateRequest(BaseModel):
+    prompts: list[Annotated[str, Field(min_length=1)]] = Field(min_length=1, max_length=MAX_BATCH_PROMPTS)
+    reference_ids: list[int]
+    top_k: int = Field(default=5, ge=1)
+
+
+class GenerationJobStatus(BaseModel):
+    id: int
+    status: Literal["queued", "running", "completed", "failed"]
+    total: int
+    completed: int
+    failed: int
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class GenerationJobItemResult(BaseModel):
+    position: int
+    prompt: str
+    status: Literal["pending", "done", "failed"]
+    message_id: int | None = None
+    message_text: str = ""
+    warnings: list[str] = []
+    error: str | None = None
@@ -23,6 +23,9 @@ class RefineRequest(BaseModel):
     instruction: str = Field(min_length=1)
     reference_ids: list[int]
     top_k: int = Field(default=5, ge=1)
+    # "edits" asks the model only for changed claims and keeps the rest.
+    mode: Literal["full", "edits"] = "full"
+    model_hint: str | None = None
 
 
 class EditRequest(BaseModel):
@@ -69,5 +72,7 @@ class MessageDetail(BaseModel):
     created_at: datetime
     updated_at: datetime
     versions: list[MessageVersionSchema]
+    # Other messages generated alongside this one as variants.
+    sibling_ids: list[int] = []
 
     model_config = ConfigDict(from_attributes=True)
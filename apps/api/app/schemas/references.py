@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, Field
 
 
 class PubMedResult(BaseModel):
@@ -13,12 +15,35 @@ class PubMedResult(BaseModel):
 
 class SearchResponse(BaseModel):
     results: list[PubMedResult]
+    total: int = 0
+    page: int = 1
+    page_size: int = 20
 
 
 class SaveFromPubMedRequest(BaseModel):
     pmid: str
 
 
+class BulkPubMedImportRequest(BaseModel):
+    pmids: list[str] = Field(min_length=1, max_length=1000)
+
+
+class BulkPubMedImportItem(BaseModel):
+    pmid: str
+    status: Literal["imported", "existing", "not_found", "failed"]
+    reference_id: int | None = None
+    chunk_count: int = 0
+    error: str | None = None
+
+
+class BulkPubMedImportResponse(BaseModel):
+    results: list[BulkPubMedImportItem]
+    imported: int
+    existing: int
+    not_found: int
+    failed: int
+
+
 class ReferenceResponse(BaseModel):
     id: int
     pmid: str | None
@@ -32,6 +57,21 @@ class ReferenceListResponse(BaseModel):
     references: list[ReferenceResponse]
 
 
+class BatchUploadItem(BaseModel):
+    filename: str
+    reference_id: int | None
+    status: Literal["processed", "failed"]
+    char_count: int
+    chunk_count: int
+    error: str | None = None
+
+
+class BatchUploadResponse(BaseModel):
+    results: list[BatchUploadItem]
+    processed: int
+    failed: int
+
+
 class UploadResponse(BaseModel):
     reference_id: int
     title: str
@@ -0,0 +1,18 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+RouteTask = Literal["generate", "variants", "refine", "refine_edits"]
+
+
+class RouteRule(BaseModel):
+    # The first matching rule picks the model; requests no rule matches use
+    # OPENAI_MODEL. Empty lists and None limits match anything.
+    model: str
+    name: str = ""
+    tasks: list[RouteTask] = []
+    # A hinted request only matches rules listing its hint; rules without
+    # hints only match unhinted requests.
+    hints: list[str] = []
+    max_prompt_chars: int | None = None
+    max_evidence_chars: int | None = None
@@ -2,6 +2,8 @@ from typing import Literal
 
 from pydantic import BaseModel
 
+from app.schemas.claims import Claim
+
 
 class StatusEvent(BaseModel):
     stage: Literal["retrieving", "generating", "verifying", "persisting", "done"]
@@ -9,6 +11,13 @@ class StatusEvent(BaseModel):
 
 class DeltaEvent(BaseModel):
     text: str
+    variant: int = 0
+
+
+class ClaimEvent(BaseModel):
+    index: int
+    claim: Claim
+    variant: int = 0
 
 
 class ErrorEvent(BaseModel):
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class UsageBucket(BaseModel):
+    key: str
+    generations: int
+    cache_hits: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    supported_claims: int
+    tokens_per_supported_claim: float | None
+    latency_ms_p50: float | None
+    latency_ms_p95: float | None
+    ttft_ms_p50: float | None
+    ttft_ms_p95: float | None
+
+
+class ExpensiveGeneration(BaseModel):
+    message_id: int
+    version_number: int
+    source: str
+    prompt: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    chunk_count: int
+    supported_claims: int
+    latency_ms: float
+    created_at: datetime
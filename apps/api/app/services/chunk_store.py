@@ -0,0 +1,36 @@
+from typing import Iterable
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.chunk import Chunk
+from app.services.chunk_terms import store_chunk_terms
+
+INSERT_BATCH_SIZE = 500
+
+
+def insert_chunks(
+    db: Session,
+    reference_id: int,
+    contents: Iterable[str],
+    batch_size: int = INSERT_BATCH_SIZE,
+) -> int:
+    # Core-style bulk insert keeps no ORM objects in the session, so memory
+    # stays flat no matter how many chunks a document produces.
+    batch: list[dict] = []
+    count = 0
+    for content in contents:
+        batch.append({"reference_id": reference_id, "content": content, "chunk_index": count})
+        count += 1
+        if len(batch) >= batch_size:
+            _insert_batch(db, batch)
+            batch = []
+    if batch:
+        _insert_batch(db, batch)
+    return count
+
+
+def _insert_batch(db: Session, batch: list[dict]) -> None:
+    # Term ids are computed once here rather than on every verification.
+    ids = db.scalars(insert(Chunk).returning(Chunk.id, sort_by_parameter_order=True), batch).all()
+    store_chunk_terms(db, ((chunk_id, row["content"]) for chunk_id, row in zip(ids, batch)))
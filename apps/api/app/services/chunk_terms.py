@@ -0,0 +1,89 @@
+import re
+from array import array
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Iterable, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.chunk import Chunk
+from app.models.chunk_terms import ChunkTerms
+
+# Words, numbers and joined forms ("once-weekly", "1.5", "patient's");
+# surrounding punctuation is dropped, so "reduced," matches "reduced".
+TERM = re.compile(r"\w+(?:[.\-'’]\w+)*")
+BACKFILL_BATCH_SIZE = 1000
+
+
+def terms(text: str) -> set[str]:
+    return set(TERM.findall(text.lower()))
+
+
+@lru_cache(maxsize=1 << 16)
+def term_id(term: str) -> int:
+    # A hashed vocabulary: no lookup table to keep in sync, and claim text is
+    # mapped the same way without a database round trip. At 32 bits a
+    # collision within one claim/chunk pair is vanishingly unlikely.
+    return int.from_bytes(blake2b(term.encode(), digest_size=4).digest(), "little", signed=True)
+
+
+def term_ids(text: str) -> list[int]:
+    return sorted({term_id(t) for t in terms(text)})
+
+
+def shingle_ids(text: str) -> set[int]:
+    # Consecutive term pairs: sharing one is stronger evidence than sharing
+    # the individual words.
+    words = TERM.findall(text.lower())
+    return {term_id(f"{a} {b}") for a, b in zip(words, words[1:])}
+
+
+def pack(ids: Sequence[int]) -> bytes:
+    return array("i", ids).tobytes()
+
+
+def unpack(blob: bytes) -> array:
+    ids = array("i")
+    ids.frombytes(blob)
+    return ids
+
+
+def store_chunk_terms(db: Session, chunks: Iterable[tuple[int, str]]) -> None:
+    rows = [{"chunk_id": chunk_id, "term_ids": pack(term_ids(content))} for chunk_id, content in chunks]
+    if rows:
+        db.execute(insert(ChunkTerms), rows)
+
+
+def attach_terms(db: Session, chunks: list[dict]) -> list[dict]:
+    # Adds stored "term_ids" to chunk dicts for the grounding verifier;
+    # chunks without a row are tokenized from content there.
+    stored = load_chunk_terms(db, [c["id"] for c in chunks])
+    for chunk in chunks:
+        if chunk["id"] in stored:
+            chunk["term_ids"] = stored[chunk["id"]]
+    return chunks
+
+
+def load_chunk_terms(db: Session, chunk_ids: list[int]) -> dict[int, array]:
+    if not chunk_ids:
+        return {}
+    rows = db.execute(select(ChunkTerms.chunk_id, ChunkTerms.term_ids).where(ChunkTerms.chunk_id.in_(chunk_ids)))
+    return {chunk_id: unpack(blob) for chunk_id, blob in rows}
+
+
+def backfill_chunk_terms(db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    # Chunks ingested before chunk_terms existed, or whose content changed.
+    count = 0
+    while True:
+        rows = db.execute(
+            select(Chunk.id, Chunk.content)
+            .outerjoin(ChunkTerms, ChunkTerms.chunk_id == Chunk.id)
+            .where(ChunkTerms.chunk_id.is_(None))
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return count
+        store_chunk_terms(db, rows)
+        db.commit()
+        count += len(rows)
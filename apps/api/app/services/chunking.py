@@ -1,19 +1,44 @@
 from __future__ import annotations
 
 import re
+from typing import Iterable, Iterator
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
 
 
 def chunk_text(text: str, max_chunk_size: int = 500) -> list[str]:
     if not text.strip():
         return []
 
-    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
-    chunks: list[str] = []
+    sentences = _SENTENCE_BOUNDARY.split(text.strip())
+    return list(_pack_sentences(sentences, max_chunk_size))
+
+
+def chunk_text_stream(pieces: Iterable[str], max_chunk_size: int = 500) -> Iterator[str]:
+    # Same output as chunk_text("".join(pieces)), but only the trailing
+    # (possibly unfinished) sentence is held between pieces.
+    return _pack_sentences(_stream_sentences(pieces), max_chunk_size)
+
+
+def _stream_sentences(pieces: Iterable[str]) -> Iterator[str]:
+    pending = ""
+    for piece in pieces:
+        buffer = pending + piece if pending else piece.lstrip()
+        sentences = _SENTENCE_BOUNDARY.split(buffer)
+        pending = sentences.pop()
+        yield from sentences
+
+    pending = pending.rstrip()
+    if pending:
+        yield pending
+
+
+def _pack_sentences(sentences: Iterable[str], max_chunk_size: int) -> Iterator[str]:
     current = ""
 
     for sentence in sentences:
         if current and len(current) + 1 + len(sentence) > max_chunk_size:
-            chunks.append(current)
+            yield current
             current = sentence
         elif current:
             current += " " + sentence
@@ -21,6 +46,4 @@ def chunk_text(text: str, max_chunk_size: int = 500) -> list[str]:
             current = sentence
 
     if current:
-        chunks.append(current)
-
-    return chunks
+        yield current
@@ -0,0 +1,52 @@
+import json
+
+from pydantic import ValidationError
+
+from app.services.llm_provider import LLMClaim
+
+
+class IncrementalClaimParser:
+    # Structured output is {"claims": [{...}, ...]}, so each claim object
+    # opens at depth two; a claim is returned as soon as its brace closes.
+    CLAIM_DEPTH = 2
+
+    def __init__(self) -> None:
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._current: list[str] | None = None
+
+    def feed(self, delta: str) -> list[LLMClaim]:
+        claims: list[LLMClaim] = []
+        for ch in delta:
+            if self._current is not None:
+                self._current.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if ch == "{" and self._depth == self.CLAIM_DEPTH:
+                    self._current = [ch]
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == self.CLAIM_DEPTH and self._current is not None:
+                    claim = _parse_claim("".join(self._current))
+                    self._current = None
+                    if claim is not None:
+                        claims.append(claim)
+        return claims
+
+
+def _parse_claim(text: str) -> LLMClaim | None:
+    # A malformed object is left to the final parse of the full completion.
+    try:
+        return LLMClaim.model_validate(json.loads(text))
+    except (ValueError, ValidationError):
+        return None
@@ -1,13 +1,19 @@
+import asyncio
 import json
+from functools import partial
 
 from sqlalchemy.orm import Session
 
 from app.models.message import Message
+from app.models.message_variant import MessageVariant
 from app.models.message_version import MessageVersion
+from app.schemas.claims import Claim
 from app.schemas.generation import GenerateResponse
 from app.services.grounding_verifier import verify_claims
-from app.services.llm_provider import LLMProvider
+from app.services.llm_provider import LLMProvider, LLMUsage
+from app.services.llm_routing import ModelRouter, route_llm, tag_usage
 from app.services.retrieval import retrieve
+from app.services.usage import record_usage
 
 SYSTEM_PROMPT = """\
 You are a medical/scientific writing assistant for regulated pharmaceutical marketing content.
@@ -39,14 +45,20 @@ OUTPUT FORMAT:
 """
 
 
-def generate_message(
+async def generate_message(
     db: Session,
     prompt: str,
     reference_ids: list[int],
     llm: LLMProvider,
     top_k: int = 5,
+    variants: int = 1,
+    router: ModelRouter | None = None,
+    hint: str | None = None,
 ) -> GenerateResponse:
-    chunks = retrieve(db, prompt, reference_ids, top_k)
+    # Database and verification work run in the executor; the LLM call is
+    # awaited on the event loop so it holds neither a thread nor a connection.
+    loop = asyncio.get_running_loop()
+    chunks = await loop.run_in_executor(None, partial(retrieve_and_release, db, prompt, reference_ids, top_k))
     if not chunks:
         return GenerateResponse(
             message_id=None,
@@ -55,13 +67,98 @@ def generate_message(
             warnings=["Insufficient evidence: no relevant chunks found for the given references."],
         )
 
-    result = llm.generate_claims(prompt, chunks, SYSTEM_PROMPT)
+    task = "variants" if variants > 1 else "generate"
+    llm, decision = route_llm(router, llm, task, prompt, chunks, hint)
 
-    supported, dropped = verify_claims(result.claims, chunks)
+    # One retrieval, n concurrent calls over the same system prompt and
+    # evidence prefix.
+    results = await asyncio.gather(*(
+        llm.async_generate_claims(variant_prompt(prompt, k, variants), chunks, SYSTEM_PROMPT)
+        for k in range(variants)
+    ))
+    verified = await asyncio.gather(*(
+        loop.run_in_executor(None, partial(verify_claims, r.claims, chunks)) for r in results
+    ))
+
+    generated = [
+        (supported, dropped, tag_usage(r.usage, decision)) for r, (supported, dropped) in zip(results, verified)
+    ]
+    message_ids = await loop.run_in_executor(
+        None, partial(persist_generated, db, prompt, generated, len(chunks))
+    )
+
+    responses = [
+        variant_response(message_id, supported, dropped, k)
+        for k, (message_id, (supported, dropped, _)) in enumerate(zip(message_ids, generated))
+    ]
+    if variants == 1:
+        return responses[0]
+    return responses[0].model_copy(update={"variants": responses})
+
+
+def variant_prompt(prompt: str, variant: int, variants: int) -> str:
+    # Variant 0 is the plain prompt, so it shares cache entries with a
+    # single generation. The others differ only in a short suffix, keeping the
+    # shared prefix long and the cache keys distinct.
+    if variant == 0:
+        return prompt
+    return (
+        f"{prompt}\n\n(Alternative {variant + 1} of {variants}: word this version differently "
+        f"from a first draft and prefer other supporting evidence where it exists.)"
+    )
+
+
+def variant_response(message_id: int, supported: list[Claim], dropped: list[Claim], variant: int) -> GenerateResponse:
+    return GenerateResponse(
+        message_id=message_id,
+        message_text=" ".join(c.text for c in supported),
+        claims=supported,
+        warnings=[f"Dropped claim: '{c.text}' - {c.warning}" for c in dropped],
+        variant=variant,
+    )
+
+
+def retrieve_and_release(db: Session, query: str, reference_ids: list[int], top_k: int) -> list[dict]:
+    chunks = retrieve(db, query, reference_ids, top_k)
+    # End the read transaction so the pooled connection goes back to the
+    # pool while the LLM call is pending.
+    db.commit()
+    return chunks
 
-    message_text = " ".join(c.text for c in supported)
-    warnings: list[str] = [f"Dropped claim: '{c.text}' - {c.warning}" for c in dropped]
 
+def persist_generated(
+    db: Session,
+    prompt: str,
+    generated: list[tuple[list[Claim], list[Claim], LLMUsage | None]],
+    chunk_count: int,
+    source: str = "generated",
+) -> list[int]:
+    message_ids = []
+    for supported, dropped, usage in generated:
+        message_text = " ".join(c.text for c in supported)
+        msg = add_generated_message(db, prompt, message_text, supported, dropped, usage, chunk_count, source)
+        message_ids.append(msg.id)
+    if len(message_ids) > 1:
+        db.add_all(
+            MessageVariant(message_id=message_id, group_id=message_ids[0], variant_index=k)
+            for k, message_id in enumerate(message_ids)
+        )
+    # Commit in the same executor call as the flush: holding SQLite's write
+    # lock across an await stalls every other writer queued in the executor.
+    db.commit()
+    return message_ids
+
+
+def add_generated_message(
+    db: Session,
+    prompt: str,
+    message_text: str,
+    supported: list[Claim],
+    dropped: list[Claim],
+    usage: LLMUsage | None = None,
+    chunk_count: int = 0,
+    source: str = "generated",
+) -> Message:
     msg = Message(status="draft")
     db.add(msg)
     db.flush()
@@ -73,14 +170,9 @@ def generate_message(
         message_text=message_text,
         claims_json=json.dumps([c.model_dump() for c in supported]),
         dropped_claims_json=json.dumps([c.model_dump() for c in dropped]),
-        source="generated",
+        source=source,
     )
     db.add(version)
     db.flush()
-
-    return GenerateResponse(
-        message_id=msg.id,
-        message_text=message_text,
-        claims=supported,
-        warnings=warnings,
-    )
+    record_usage(db, version, usage, chunk_count, supported, dropped)
+    return msg
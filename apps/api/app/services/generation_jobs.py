@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from functools import partial
+from typing import AsyncIterator, Callable
+
+from fastapi import HTTPException, Request
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.generation_job import GenerationJob, GenerationJobItem
+from app.models.message_version import MessageVersion
+from app.schemas.claims import Claim
+from app.schemas.generation import GenerationJobItemResult, GenerationJobStatus
+from app.schemas.streaming import sse_event
+from app.services.generation import SYSTEM_PROMPT, add_generated_message
+from app.services.grounding_verifier import verify_claims
+from app.services.llm_governor import LLMOverloaded
+from app.services.llm_provider import LLMProvider, LLMUsage
+from app.services.llm_routing import ModelRouter, route_llm, tag_usage
+from app.services.retrieval import retrieve_many
+
+logger = logging.getLogger(__name__)
+
+JOB_CONCURRENCY = 8
+PERSIST_GROUP_SIZE = 25
+NO_EVIDENCE_WARNING = "Insufficient evidence: no relevant chunks found for the given references."
+
+
+@dataclass
+class _Outcome:
+    item_id: int
+    position: int
+    prompt: str
+    message_text: str = ""
+    supported: list[Claim] = field(default_factory=list)
+    dropped: list[Claim] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+    error: str | None = None
+    generated: bool = False
+    usage: LLMUsage | None = None
+    chunk_count: int = 0
+    retry_after: float | None = None
+
+
+def create_job(db: Session, prompts: list[str], reference_ids: list[int], top_k: int) -> GenerationJob:
+    job = GenerationJob(reference_ids_json=json.dumps(reference_ids), top_k=top_k, total=len(prompts))
+    db.add(job)
+    db.flush()
+    db.execute(
+        insert(GenerationJobItem),
+        [{"job_id": job.id, "position": i, "prompt": prompt} for i, prompt in enumerate(prompts)],
+    )
+    db.commit()
+    return job
+
+
+def get_job(db: Session, job_id: int) -> GenerationJob:
+    job = db.get(GenerationJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Generation job not found")
+    return job
+
+
+def job_results(db: Session, job_id: int) -> list[GenerationJobItemResult]:
+    rows = db.execute(
+        select(GenerationJobItem, MessageVersion.message_text)
+        .outerjoin(
+            MessageVersion,
+            (MessageVersion.message_id == GenerationJobItem.message_id) & (MessageVersion.version_number == 1),
+        )
+        .where(GenerationJobItem.job_id == job_id)
+        .order_by(GenerationJobItem.position)
+    ).all()
+    return [_item_result(item, text or "") for item, text in rows]
+
+
+def _item_result(item: GenerationJobItem, message_text: str) -> GenerationJobItemResult:
+    return GenerationJobItemResult(
+        position=item.position,
+        prompt=item.prompt,
+        status=item.status,
+        message_id=item.message_id,
+        message_text=message_text,
+        warnings=json.loads(item.warnings_json),
+        error=item.error,
+    )
+
+
+class GenerationJobRunner:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        llm: LLMProvider,
+        concurrency: int = JOB_CONCURRENCY,
+        group_size: int = PERSIST_GROUP_SIZE,
+        router: ModelRouter | None = None,
+    ) -> None:
+        self._session_factory = session_factory
+        self._llm = llm
+        self._router = router
+        self._concurrency = concurrency
+        self._group_size = group_size
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._retries: dict[int, asyncio.TimerHandle] = {}
+        self._subscribers: dict[int, set[asyncio.Queue]] = {}
+
+    def start(self, job_id: int) -> None:
+        if self.is_running(job_id):
+            return
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(partial(self._finished, job_id))
+
+    def is_running(self, job_id: int) -> bool:
+        return job_id in self._tasks
+
+    async def resume(self) -> list[int]:
+        # Jobs interrupted by a restart pick up their pending items; items
+        # already persisted as done or failed are not regenerated.
+        job_ids = await asyncio.get_running_loop().run_in_executor(None, self._unfinished_job_ids)
+        for job_id in job_ids:
+            self.start(job_id)
+        return job_ids
+
+    async def shutdown(self) -> None:
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def subscribe(self, job_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: int, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def _publish(self, job_id: int, event: GenerationJobItemResult | None) -> None:
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+
+    async def _run(self, job_id: int) -> float | None:
+        loop = asyncio.get_running_loop()
+        try:
+            reference_ids, top_k, items = await loop.run_in_executor(None, partial(self._start_job, job_id))
+            chunk_sets = await loop.run_in_executor(
+                None, partial(self._retrieve, [prompt for _, _, prompt in items], reference_ids, top_k)
+            )
+            semaphore = asyncio.Semaphore(self._concurrency)
+            pending = [
+                asyncio.create_task(self._generate(semaphore, item, chunks))
+                for item, chunks in zip(items, chunk_sets)
+            ]
+            group: list[_Outcome] = []
+            retry_after: float | None = None
+            try:
+                for next_done in asyncio.as_completed(pending):
+                    outcome = await next_done
+                    if outcome.retry_after is not None:
+                        retry_after = max(retry_after or 0.0, outcome.retry_after)
+                    group.append(outcome)
+                    if len(group) >= self._group_size:
+                        await self._flush(job_id, group)
+                        group = []
+                await self._flush(job_id, group, final=True, requeued=retry_after is not None)
+            finally:
+                for task in pending:
+                    task.cancel()
+            return retry_after
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Generation job %s failed", job_id)
+            await loop.run_in_executor(None, partial(self._mark_failed, job_id))
+        finally:
+            self._publish(job_id, None)
+
+    async def _generate(self, semaphore: asyncio.Semaphore, item: tuple, chunks: list[dict]) -> _Outcome:
+        item_id, position, prompt = item
+        outcome = _Outcome(item_id=item_id, position=position, prompt=prompt)
+        if not chunks:
+            outcome.warnings = [NO_EVIDENCE_WARNING]
+            return outcome
+        llm, decision = route_llm(self._router, self._llm, "generate", prompt, chunks)
+        try:
+            async with semaphore:
+                result = await llm.async_generate_claims(prompt, chunks, SYSTEM_PROMPT)
+        except LLMOverloaded as exc:
+            # Out of capacity is not a property of the prompt: leave the item
+            # pending instead of failing it.
+            outcome.retry_after = exc.retry_after
+            return outcome
+        except Exception as exc:
+            outcome.error = str(exc) or type(exc).__name__
+            return outcome
+        # Verify as each result arrives rather than after the whole batch.
+        supported, dropped = await asyncio.get_running_loop().run_in_executor(
+            None, partial(verify_claims, result.claims, chunks)
+        )
+        outcome.generated = True
+        outcome.usage = tag_usage(result.usage, decision)
+        outcome.chunk_count = len(chunks)
+        outcome.supported = supported
+        outcome.dropped = dropped
+        outcome.message_text = " ".join(c.text for c in supported)
+        outcome.warnings = [f"Dropped claim: '{c.text}' - {c.warning}" for c in dropped]
+        return outcome
+
+    def _finished(self, job_id: int, task: asyncio.Task) -> None:
+        self._tasks.pop(job_id, None)
+        retry_after = None if task.cancelled() else task.result()
+        if retry_after is not None:
+            # Items refused for capacity are still pending; run them again
+            # once the governor expects room (or on the next resume).
+            self._retries[job_id] = asyncio.get_running_loop().call_later(retry_after, self._retry, job_id)
+
+    def _retry(self, job_id: int) -> None:
+        self._retries.pop(job_id, None)
+        self.start(job_id)
+
+    async def _flush(self, job_id: int, group: list[_Outcome], final: bool = False, requeued: bool = False) -> None:
+        results = await asyncio.get_running_loop().run_in_executor(
+            None, partial(self._persist_group, job_id, group, final, requeued)
+        )
+        for result in results:
+            self._publish(job_id, result)
+
+    def _start_job(self, job_id: int) -> tuple[list[int], int, list[tuple[int, int, str]]]:
+        with self._session_factory() as db:
+            job = db.get(GenerationJob, job_id)
+            job.status = "running"
+            items = db.execute(
+                select(GenerationJobItem.id, GenerationJobItem.position, GenerationJobItem.prompt)
+                .where(GenerationJobItem.job_id == job_id, GenerationJobItem.status == "pending")
+                .order_by(GenerationJobItem.position)
+            ).all()
+            reference_ids, top_k = job.reference_ids, job.top_k
+            db.commit()
+        return reference_ids, top_k, [tuple(row) for row in items]
+
+    def _retrieve(self, prompts: list[str], reference_ids: list[int], top_k: int) -> list[list[dict]]:
+        with self._session_factory() as db:
+            return retrieve_many(db, prompts, reference_ids, top_k)
+
+    def _persist_group(
+        self, job_id: int, group: list[_Outcome], final: bool, requeued: bool = False
+    ) -> list[GenerationJobItemResult]:
+        # One transaction per group: messages, item states and job counters
+        # commit together, so a restart never regenerates a persisted item.
+        results = []
+        with self._session_factory() as db:
+            job = db.get(GenerationJob, job_id)
+            for outcome in group:
+                if outcome.retry_after is not None:
+                    continue
+                item = db.get(GenerationJobItem, outcome.item_id)
+                if outcome.error is not None:
+                    item.status = "failed"
+                    item.error = outcome.error
+                    job.failed += 1
+                else:
+                    if outcome.generated:
+                        msg = add_generated_message(
+                            db,
+                            outcome.prompt,
+                            outcome.message_text,
+                            outcome.supported,
+                            outcome.dropped,
+                            outcome.usage,
+                            outcome.chunk_count,
+                        )
+                        item.message_id = msg.id
+                    item.status = "done"
+                    item.warnings_json = json.dumps(outcome.warnings)
+                    job.completed += 1
+                results.append(_item_result(item, outcome.message_text))
+            if final:
+                job.status = "queued" if requeued else "completed"
+            db.commit()
+        return results
+
+    def _mark_failed(self, job_id: int) -> None:
+        with self._session_factory() as db:
+            job = db.get(GenerationJob, job_id)
+            if job is not None:
+                job.status = "failed"
+                db.commit()
+
+    def _unfinished_job_ids(self) -> list[int]:
+        with self._session_factory() as db:
+            return list(
+                db.scalars(
+                    select(GenerationJob.id)
+                    .where(GenerationJob.status.in_(("queued", "running")))
+                    .order_by(GenerationJob.id)
+                )
+            )
+
+
+async def stream_job_results(
+    db: Session, runner: GenerationJobRunner, job_id: int
+) -> AsyncIterator[dict]:
+    loop = asyncio.get_running_loop()
+    # Subscribe before reading the snapshot so no result falls in between.
+    queue = runner.subscribe(job_id)
+    try:
+        sent: set[int] = set()
+        for result in await loop.run_in_executor(None, partial(job_results, db, job_id)):
+            if result.status != "pending":
+                sent.add(result.position)
+                yield sse_event("result", result)
+        while runner.is_running(job_id) or not queue.empty():
+            result = await queue.get()
+            if result is None:
+                break
+            if result.position not in sent:
+                sent.add(result.position)
+                yield sse_event("result", result)
+
+        def _final_status() -> GenerationJobStatus:
+            db.expire_all()
+            return GenerationJobStatus.model_validate(get_job(db, job_id))
+
+        yield sse_event("status", await loop.run_in_executor(None, _final_status))
+    finally:
+        runner.unsubscribe(job_id, queue)
+
+
+def get_generation_jobs(request: Request) -> GenerationJobRunner:
+    return request.app.state.generation_jobs
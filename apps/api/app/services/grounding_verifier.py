@@ -1,30 +1,76 @@
+import re
+from collections import Counter, defaultdict
+
 from app.schemas.claims import Citation, Claim, ClaimStatus
+from app.services.chunk_terms import shingle_ids, term_id, term_ids, terms
 from app.services.llm_provider import LLMClaim
 
+# A repaired citation must also share this many term pairs with the claim,
+# and contain every number in it, so a chunk that merely uses the same
+# vocabulary is not attached.
+MIN_SHARED_SHINGLES = 2
+DIGIT = re.compile(r"\d")
+
 
 def verify_claims(
     claims: list[LLMClaim],
     available_chunks: list[dict],
     overlap_threshold: float = 0.3,
+    repair: bool = True,
 ) -> tuple[list[Claim], list[Claim]]:
     chunk_map = {c["id"]: c for c in available_chunks}
     supported: list[Claim] = []
     dropped: list[Claim] = []
 
-    for claim in claims:
+    # All claims share one bit space over their terms: each claim is a mask,
+    # each cited chunk is reduced once to the mask of claim terms it contains,
+    # and every (claim, chunk) overlap is a single AND plus a popcount.
+    claim_terms = [term_ids(claim.text) for claim in claims]
+    bits = {t: 1 << i for i, t in enumerate({t for ids in claim_terms for t in ids})}
+    cited = {cit.chunk_id for claim in claims for cit in claim.citations if cit.chunk_id in chunk_map}
+    chunk_masks = {chunk_id: _chunk_mask(chunk_map[chunk_id], bits) for chunk_id in cited}
+    shingles: _ShingleIndex | None = None
+
+    for claim, ids in zip(claims, claim_terms):
         if not claim.citations:
             dropped.append(Claim(text=claim.text, citations=[], status=ClaimStatus.dropped, warning="No citations provided"))
             continue
 
+        claim_mask = sum(bits[t] for t in ids)
         valid_citations: list[Citation] = []
         for cit in claim.citations:
-            chunk = chunk_map.get(cit.chunk_id)
-            if chunk is None:
+            chunk_mask = chunk_masks.get(cit.chunk_id)
+            if chunk_mask is None:
                 continue
-            if _overlap_score(claim.text, chunk.get("content", "")) < overlap_threshold:
+            score = (claim_mask & chunk_mask).bit_count() / len(ids) if ids else 0.0
+            if score < overlap_threshold:
                 continue
             valid_citations.append(Citation(reference_id=cit.reference_id, chunk_id=cit.chunk_id))
 
+        # Rather than drop a claim whose citations all miss, look for a
+        # retrieved chunk that supports it; a drop costs a regeneration.
+        if not valid_citations and repair and ids:
+            if shingles is None:
+                shingles = _ShingleIndex(available_chunks)
+            numbers = sum(bits[term_id(t)] for t in terms(claim.text) if DIGIT.search(t))
+            best, best_score = None, 0.0
+            # Candidates come most-shared first, so ties keep the chunk
+            # sharing more shingles.
+            for chunk_id, shared in shingles.candidates(claim.text):
+                if shared < MIN_SHARED_SHINGLES:
+                    break
+                if chunk_id not in chunk_masks:
+                    chunk_masks[chunk_id] = _chunk_mask(chunk_map[chunk_id], bits)
+                if chunk_masks[chunk_id] & numbers != numbers:
+                    continue
+                score = (claim_mask & chunk_masks[chunk_id]).bit_count() / len(ids)
+                if score > best_score:
+                    best, best_score = chunk_id, score
+            if best is not None and best_score >= overlap_threshold:
+                valid_citations.append(
+                    Citation(reference_id=chunk_map[best]["reference_id"], chunk_id=best, repaired=True)
+                )
+
         if not valid_citations:
             dropped.append(
                 Claim(text=claim.text, citations=[], status=ClaimStatus.dropped, warning="All citations invalid or below overlap threshold")
@@ -35,9 +81,36 @@ def verify_claims(
     return supported, dropped
 
 
-def _overlap_score(claim_text: str, chunk_content: str) -> float:
-    claim_words = set(claim_text.lower().split())
-    if not claim_words:
-        return 0.0
-    chunk_words = set(chunk_content.lower().split())
-    return len(claim_words & chunk_words) / len(claim_words)
+def verify_claim(claim: LLMClaim, available_chunks: list[dict], overlap_threshold: float = 0.3) -> Claim:
+    supported, dropped = verify_claims([claim], available_chunks, overlap_threshold)
+    return (supported or dropped)[0]
+
+
+def _chunk_mask(chunk: dict, bits: dict[int, int]) -> int:
+    # Stored term ids when retrieval attached them, else tokenize the content.
+    ids = chunk.get("term_ids")
+    if ids is None:
+        ids = term_ids(chunk.get("content", ""))
+    mask = 0
+    for t in ids:
+        bit = bits.get(t)
+        if bit is not None:
+            mask |= bit
+    return mask
+
+
+class _ShingleIndex:
+    # Inverted index from term-pair shingles to the chunks containing them,
+    # built only when a claim needs repair. Chunks without content (term ids
+    # only) cannot be shingled and are not repair candidates.
+
+    def __init__(self, chunks: list[dict]) -> None:
+        self._postings: dict[int, list[int]] = defaultdict(list)
+        for chunk in chunks:
+            for shingle in shingle_ids(chunk.get("content", "")):
+                self._postings[shingle].append(chunk["id"])
+
+    def candidates(self, text: str) -> list[tuple[int, int]]:
+        # (chunk_id, shared shingles), most shared first.
+        counts = Counter(chunk_id for s in shingle_ids(text) for chunk_id in self._postings.get(s, ()))
+        return counts.most_common()
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+from app.services.llm_provider import (
+    LLMEditResult,
+    LLMGenerationResult,
+    LLMProvider,
+    LLMUsage,
+    StreamResult,
+    _build_user_message,
+)
+
+REPLAY_DELTA_SIZE = 32
+
+
+class _LeaderAborted(Exception):
+    pass
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        path: str | Path,
+        memory_entries: int = 256,
+        ttl: float = 24 * 3600,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, tuple[LLMGenerationResult, float]] = OrderedDict()
+        self._memory_entries = memory_entries
+        self.ttl = ttl
+        self._clock = clock
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "joined": 0, "upstream_calls": 0}
+
+    def get(self, key: str) -> LLMGenerationResult | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            from_memory = entry is not None
+            if from_memory:
+                self._memory.move_to_end(key)
+            else:
+                row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (LLMGenerationResult.model_validate_json(row[0]), row[1])
+                    self._remember(key, entry)
+
+            if entry is None or self._clock() - entry[1] >= self.ttl:
+                self.stats["misses"] += 1
+                return None
+            self.stats["memory_hits" if from_memory else "disk_hits"] += 1
+            return entry[0]
+
+    def set(self, key: str, result: LLMGenerationResult) -> None:
+        now = self._clock()
+        with self._lock:
+            self._remember(key, (result, now))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, result.model_dump_json(), now),
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at <= ?", (self._clock() - self.ttl,)
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _remember(self, key: str, entry: tuple[LLMGenerationResult, float]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+
+def cache_key(model: str, system_prompt: str, prompt: str, evidence_chunks: list[dict]) -> str:
+    payload = json.dumps([model, system_prompt, _build_user_message(prompt, evidence_chunks)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CachingProvider:
+    def __init__(self, inner: LLMProvider, cache: LLMResponseCache) -> None:
+        self.inner = inner
+        self.cache = cache
+        self.model = getattr(inner, "model", type(inner).__name__)
+        # One map for sync and streaming callers: concurrent futures can be
+        # resolved from a worker thread and awaited from the event loop.
+        self._inflight: dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    def generate_claims(
+        self,
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+    ) -> LLMGenerationResult:
+        key = cache_key(self.model, system_prompt, prompt, evidence_chunks)
+        while True:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._served(cached)
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return self._served(future.result())
+                except _LeaderAborted:
+                    continue
+            try:
+                result = self.inner.generate_claims(prompt, evidence_chunks, system_prompt)
+            except BaseException as exc:
+                self._finish(key, future, exc=exc if isinstance(exc, Exception) else _LeaderAborted())
+                raise
+            try:
+                self.cache.set(key, result)
+            finally:
+                self._finish(key, future, result=result)
+            return result
+
+    async def async_generate_claims(
+        self,
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+    ) -> LLMGenerationResult:
+        key = cache_key(self.model, system_prompt, prompt, evidence_chunks)
+        while True:
+            cached = await _off_loop(self.cache.get, key)
+            if cached is not None:
+                return self._served(cached)
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return self._served(await asyncio.wrap_future(future))
+                except _LeaderAborted:
+                    continue
+            try:
+                result = await self.inner.async_generate_claims(prompt, evidence_chunks, system_prompt)
+            except BaseException as exc:
+                self._finish(key, future, exc=exc if isinstance(exc, Exception) else _LeaderAborted())
+                raise
+            await self._store(key, future, result)
+            return result
+
+    async def async_generate_edits(
+        self,
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+    ) -> LLMEditResult:
+        # Edits depend on the previous version, which a refine rarely repeats.
+        return await self.inner.async_generate_edits(prompt, evidence_chunks, system_prompt)
+
+    async def async_stream_claims(
+        self,
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+        result: StreamResult,
+    ) -> AsyncIterator[str]:
+        key = cache_key(self.model, system_prompt, prompt, evidence_chunks)
+        while True:
+            cached = await _off_loop(self.cache.get, key)
+            if cached is None:
+                future, leader = self._join(key)
+                if leader:
+                    break
+                try:
+                    cached = await asyncio.wrap_future(future)
+                except _LeaderAborted:
+                    continue
+            async for delta in _replay(self._served(cached), result):
+                yield delta
+            return
+
+        upstream = StreamResult()
+        try:
+            async for delta in self.inner.async_stream_claims(prompt, evidence_chunks, system_prompt, upstream):
+                yield delta
+        except BaseException as exc:
+            # A client disconnect closes this generator mid-stream; joined
+            # callers then retry rather than inherit the cancellation.
+            self._finish(key, future, exc=exc if isinstance(exc, Exception) else _LeaderAborted())
+            raise
+        # A stream won by the hedge model is not the answer this key stands
+        # for: it is neither stored nor handed to joined callers.
+        answered_by = upstream.usage.model if upstream.usage is not None else self.model
+        if upstream.parsed is None or answered_by != self.model:
+            self._finish(key, future, exc=_LeaderAborted())
+        else:
+            await self._store(key, future, upstream.parsed)
+        result.usage = upstream.usage
+        result.parsed = upstream.parsed
+
+    def _served(self, cached: LLMGenerationResult) -> LLMGenerationResult:
+        # Only the caller that went upstream is charged for the tokens.
+        return cached.model_copy().with_usage(LLMUsage(model=self.model, cache_hit=True))
+
+    def _join(self, key: str) -> tuple[Future, bool]:
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.cache.stats["joined"] += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            self.cache.stats["upstream_calls"] += 1
+            return future, True
+
+    async def _store(self, key: str, future: Future, result: LLMGenerationResult) -> None:
+        # Joined callers are released even if the write fails or the caller
+        # is cancelled while it runs.
+        try:
+            await _off_loop(self.cache.set, key, result)
+        finally:
+            self._finish(key, future, result=result)
+
+    def _finish(
+        self,
+        key: str,
+        future: Future,
+        result: LLMGenerationResult | None = None,
+        exc: BaseException | None = None,
+    ) -> None:
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+
+async def _off_loop(fn: Callable, *args):
+    # Cache reads and writes are SQLite I/O; keep them off the event loop.
+    return await asyncio.get_running_loop().run_in_executor(None, partial(fn, *args))
+
+
+async def _replay(cached: LLMGenerationResult, result: StreamResult) -> AsyncIterator[str]:
+    text = cached.model_dump_json()
+    for i in range(0, len(text), REPLAY_DELTA_SIZE):
+        yield text[i:i + REPLAY_DELTA_SIZE]
+    result.usage = cached.usage
+    result.parsed = cached
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
+import openai
+
+from app.services.llm_provider import LLMEditResult, LLMGenerationResult, LLMProvider, StreamResult, _build_user_message
+from app.services.ncbi_transport import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Structured claim lists rarely exceed this; it is reserved up front because
+# the real completion size is only known afterwards.
+COMPLETION_TOKEN_ESTIMATE = 800
+
+
+class LLMOverloaded(Exception):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"LLM capacity exhausted, retry after {math.ceil(retry_after)}s")
+        self.retry_after = retry_after
+
+
+def estimate_tokens(prompt: str, evidence_chunks: list[dict], system_prompt: str) -> int:
+    # About four characters per token for English prose.
+    prompt_chars = len(system_prompt) + len(_build_user_message(prompt, evidence_chunks))
+    return prompt_chars // 4 + COMPLETION_TOKEN_ESTIMATE
+
+
+class LLMGovernor:
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        max_queue: int = 64,
+        tokens_per_minute: int = 0,
+        queue_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._budget = TokenBucket(tokens_per_minute / 60, capacity=tokens_per_minute) if tokens_per_minute else None
+        self._clock = clock
+        self._waiting = 0
+        self._avg_call_s = 5.0
+        self.stats = {
+            "in_flight": 0,
+            "queued": 0,
+            "max_queued": 0,
+            "admitted": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "rate_limited": 0,
+            "upstream_errors": 0,
+            "retries": 0,
+        }
+
+    def check_capacity(self) -> None:
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise LLMOverloaded(self.retry_after())
+
+    def retry_after(self) -> float:
+        # Time for the current queue to drain through the concurrency slots.
+        return max(1.0, self._avg_call_s * (self._waiting + 1) / self.max_concurrency)
+
+    @asynccontextmanager
+    async def admit(self, tokens: int) -> AsyncIterator[None]:
+        self.check_capacity()
+        self._waiting += 1
+        self.stats["queued"] = self._waiting
+        self.stats["max_queued"] = max(self.stats["max_queued"], self._waiting)
+        start = self._clock()
+        try:
+            # asyncio.timeout runs the acquire in this task, so an uncontended
+            # semaphore is taken without suspending and the queue count stays exact.
+            async with asyncio.timeout(self.queue_timeout):
+                await self._acquire(tokens)
+        except TimeoutError:
+            self.stats["timed_out"] += 1
+            raise LLMOverloaded(self.retry_after()) from None
+        finally:
+            self._waiting -= 1
+            self.stats["queued"] = self._waiting
+
+        waited_ms = (self._clock() - start) * 1000
+        self.stats["admitted"] += 1
+        self.stats["wait_ms_total"] += waited_ms
+        self.stats["wait_ms_max"] = max(self.stats["wait_ms_max"], waited_ms)
+        self.stats["in_flight"] += 1
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self._avg_call_s = 0.8 * self._avg_call_s + 0.2 * (self._clock() - started)
+            self.stats["in_flight"] -= 1
+            self._semaphore.release()
+
+    async def try_admit(self, tokens: int) -> bool:
+        # For optional extra requests (hedges): take a slot and budget only if
+        # both are free right now, so they never queue ahead of real requests.
+        # A True result must be paired with release().
+        if self._semaphore.locked():
+            return False
+        await self._semaphore.acquire()
+        if self._budget is not None and not self._budget.try_acquire(tokens):
+            self._semaphore.release()
+            return False
+        self.stats["admitted"] += 1
+        self.stats["in_flight"] += 1
+        return True
+
+    def release(self) -> None:
+        self.stats["in_flight"] -= 1
+        self._semaphore.release()
+
+    async def _acquire(self, tokens: int) -> None:
+        await self._semaphore.acquire()
+        if self._budget is None:
+            return
+        try:
+            await self._budget.acquire(tokens)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+
+class GovernedProvider:
+    def __init__(
+        self,
+        inner: LLMProvider,
+        governor: LLMGovernor,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 20.0,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.inner = inner
+        self.governor = governor
+        self.model = getattr(inner, "model", type(inner).__name__)
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._sleep = sleep
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    def generate_claims(
+        self,
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+    ) -> LLMGenerationResult:
+        # The API only uses the async paths; sync callers (scripts) bypass admission.
+        return self.inner.generate_claims(prompt, evidence_chunks, system_prompt)
+
+    async def async_generate_claims(
+        self,
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+    ) -> LLMGenerationResult:
+        return await self._call(self.inner.async_generate_claims, prompt, evidence_chunks, system_prompt)
+
+    async def async_generate_edits(
+        self,
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+    ) -> LLMEditResult:
+        return await self._call(self.inner.async_generate_edits, prompt, evidence_chunks, system_prompt)
+
+    async def _call(
+        self,
+        call: Callable[[str, list[dict], str], Awaitable[T]],
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+    ) -> T:
+        tokens = estimate_tokens(prompt, evidence_chunks, system_prompt)
+        attempt = 0
+        while True:
+            async with self.governor.admit(tokens):
+                try:
+                    return await call(prompt, evidence_chunks, system_prompt)
+                except openai.RateLimitError as exc:
+                    delay = self._after_rate_limit(attempt, exc)
+                except openai.APIError as exc:
+                    delay = self._after_upstream_error(attempt, exc)
+                    if delay is None:
+                        raise
+            # Back off outside the slot so other requests keep flowing.
+            attempt += 1
+            await self._sleep(delay)
+
+    async def async_stream_claims(
+        self,
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+        result: StreamResult,
+    ) -> AsyncIterator[str]:
+        tokens = estimate_tokens(prompt, evidence_chunks, system_prompt)
+        attempt = 0
+        while True:
+            started = False
+            async with self.governor.admit(tokens):
+                try:
+                    async for delta in self.inner.async_stream_claims(prompt, evidence_chunks, system_prompt, result):
+                        started = True
+                        yield delta
+                    return
+                except openai.RateLimitError as exc:
+                    # Deltas already sent cannot be retracted; only retry a
+                    # stream that was refused before producing output.
+                    if started:
+                        raise
+                    delay = self._after_rate_limit(attempt, exc)
+                except openai.APIError as exc:
+                    delay = None if started else self._after_upstream_error(attempt, exc)
+                    if delay is None:
+                        raise
+            attempt += 1
+            await self._sleep(delay)
+
+    def _after_rate_limit(self, attempt: int, exc: openai.RateLimitError) -> float:
+        self.governor.stats["rate_limited"] += 1
+        delay = self._backoff(attempt, exc.response.headers.get("retry-after"))
+        if attempt >= self._max_retries:
+            raise LLMOverloaded(delay) from exc
+        self.governor.stats["retries"] += 1
+        logger.info("LLM provider returned 429, retrying in %.2fs", delay)
+        return delay
+
+    def _after_upstream_error(self, attempt: int, exc: openai.APIError) -> float | None:
+        # The SDK's own retries are off, so the transient failures it would
+        # retry (connection errors, timeouts, 408, 409, 5xx) are retried here,
+        # with the same backoff outside the slot. None means re-raise.
+        if not _transient(exc):
+            return None
+        self.governor.stats["upstream_errors"] += 1
+        if attempt >= self._max_retries:
+            return None
+        retry_after = exc.response.headers.get("retry-after") if isinstance(exc, openai.APIStatusError) else None
+        delay = self._backoff(attempt, retry_after)
+        self.governor.stats["retries"] += 1
+        logger.info("LLM provider call failed (%s), retrying in %.2fs", type(exc).__name__, delay)
+        return delay
+
+    def _backoff(self, attempt: int, retry_after: str | None) -> float:
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self._backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self._backoff_max, self._backoff_base * 2 ** attempt))
+
+
+def _transient(exc: openai.APIError) -> bool:
+    if isinstance(exc, openai.APIConnectionError):
+        return True
+    return isinstance(exc, openai.APIStatusError) and (exc.status_code in (408, 409) or exc.status_code >= 500)
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator
+
+from app.services.llm_governor import LLMGovernor, estimate_tokens
+from app.services.llm_provider import LLMEditResult, LLMGenerationResult, LLMProvider, StreamResult
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+# Streams the hedge fraction is measured over, so a long quiet spell does not
+# bank allowance for a burst of hedges when the provider slows down.
+HEDGE_WINDOW = 200
+
+
+class _Attempt:
+    def __init__(self, provider: LLMProvider, prompt: str, evidence_chunks: list[dict], system_prompt: str) -> None:
+        self.result = StreamResult()
+        self.stream = provider.async_stream_claims(prompt, evidence_chunks, system_prompt, self.result)
+        self.first = asyncio.ensure_future(anext(self.stream, _END))
+
+    async def cancel(self) -> None:
+        # The pending __anext__ must finish before the generator can be closed.
+        self.first.cancel()
+        await asyncio.gather(self.first, return_exceptions=True)
+        await self.stream.aclose()
+
+
+class HedgedProvider:
+    def __init__(
+        self,
+        primary: LLMProvider,
+        hedge: LLMProvider,
+        hedge_after: float,
+        governor: LLMGovernor | None = None,
+        max_fraction: float = 1.0,
+    ) -> None:
+        self.inner = primary
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.governor = governor
+        self.max_fraction = max_fraction
+        self.model = getattr(primary, "model", type(primary).__name__)
+        self._recent: deque[bool] = deque(maxlen=HEDGE_WINDOW)
+        self.stats = {
+            "streams": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "primary_wins": 0,
+            "both_failed": 0,
+            "skipped_fraction": 0,
+            "skipped_capacity": 0,
+        }
+
+    async def aclose(self) -> None:
+        # The hedge shares the primary's clients (OpenAIProvider.with_model).
+        await self.inner.aclose()
+
+    def generate_claims(
+        self,
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+    ) -> LLMGenerationResult:
+        return self.inner.generate_claims(prompt, evidence_chunks, system_prompt)
+
+    async def async_generate_claims(
+        self,
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+    ) -> LLMGenerationResult:
+        # Only time to first token is hedged; a non-streaming call has no
+        # early signal to hedge on.
+        return await self.inner.async_generate_claims(prompt, evidence_chunks, system_prompt)
+
+    async def async_generate_edits(
+        self,
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+    ) -> LLMEditResult:
+        return await self.inner.async_generate_edits(prompt, evidence_chunks, system_prompt)
+
+    async def async_stream_claims(
+        self,
+        prompt: str,
+        evidence_chunks: list[dict],
+        system_prompt: str,
+        result: StreamResult,
+    ) -> AsyncIterator[str]:
+        self.stats["streams"] += 1
+        attempts = [_Attempt(self.inner, prompt, evidence_chunks, system_prompt)]
+        reserved = False
+        try:
+            done, _ = await asyncio.wait({attempts[0].first}, timeout=self.hedge_after)
+            if not done:
+                reserved = await self._reserve(prompt, evidence_chunks, system_prompt)
+            self._recent.append(reserved)
+            if reserved:
+                self.stats["hedged"] += 1
+                logger.info("No first token after %.2fs, hedging stream request", self.hedge_after)
+                attempts.append(_Attempt(self.hedge, prompt, evidence_chunks, system_prompt))
+            try:
+                winner = await _first_to_respond(attempts)
+            except Exception:
+                if len(attempts) > 1:
+                    self.stats["both_failed"] += 1
+                raise
+            if len(attempts) > 1:
+                self.stats["hedge_wins" if winner is attempts[1] else "primary_wins"] += 1
+            for attempt in attempts:
+                if attempt is not winner:
+                    await attempt.cancel()
+            if reserved and winner is attempts[0]:
+                reserved = False
+                self._release()
+
+            first = winner.first.result()
+            if first is not _END:
+                yield first
+                async for delta in winner.stream:
+                    yield delta
+        except BaseException:
+            # Covers the client going away mid-stream as well as failures.
+            for attempt in attempts:
+                await attempt.cancel()
+            raise
+        finally:
+            if reserved:
+                self._release()
+        result.parsed = winner.result.parsed
+        result.usage = winner.result.usage
+
+    async def _reserve(self, prompt: str, evidence_chunks: list[dict], system_prompt: str) -> bool:
+        # The hedge is a second upstream request, so it needs its own
+        # concurrency slot and TPM budget; when either is short, or too many
+        # recent streams were hedged, the primary is left to finish alone.
+        if sum(self._recent) >= self.max_fraction * (len(self._recent) + 1):
+            self.stats["skipped_fraction"] += 1
+            return False
+        if self.governor is None:
+            return True
+        if not await self.governor.try_admit(estimate_tokens(prompt, evidence_chunks, system_prompt)):
+            self.stats["skipped_capacity"] += 1
+            return False
+        return True
+
+    def _release(self) -> None:
+        if self.governor is not None:
+            self.governor.release()
+
+
+async def _first_to_respond(attempts: list[_Attempt]) -> _Attempt:
+    # A failed attempt only loses if another can still answer.
+    pending = {attempt.first: attempt for attempt in attempts}
+    error: BaseException | None = None
+    while pending:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            attempt = pending.pop(future)
+            if future.exception() is None:
+                return attempt
+            error = error or future.exception()
+    raise error
@@ -0,0 +1,73 @@
+from collections import defaultdict
+from dataclasses import replace
+from typing import Callable
+
+from app.schemas.routing import RouteRule, RouteTask
+from app.services.llm_provider import LLMProvider, LLMUsage, RouteDecision
+
+
+class ModelRouter:
+    # Picks a model per request from the configured rules. Providers for
+    # routed models are built on first use and reused.
+
+    def __init__(self, rules: list[RouteRule], default: LLMProvider, build: Callable[[str], LLMProvider]) -> None:
+        self.rules = rules
+        self.default = default
+        self.model = getattr(default, "model", type(default).__name__)
+        self._build = build
+        self._providers: dict[str, LLMProvider] = {self.model: default}
+        self.stats: dict[str, int] = defaultdict(int)
+
+    def route(
+        self,
+        task: RouteTask,
+        prompt: str,
+        evidence_chunks: list[dict],
+        hint: str | None = None,
+        default: LLMProvider | None = None,
+    ) -> tuple[LLMProvider, RouteDecision]:
+        # The default model is served by the caller's provider when given, so
+        # an injected provider (dependency override) still applies.
+        evidence_chars = sum(len(c["content"]) for c in evidence_chunks)
+        name, model = "default", self.model
+        for i, rule in enumerate(self.rules):
+            if _matches(rule, task, hint, len(prompt), evidence_chars):
+                name, model = rule.name or f"rule{i}", rule.model
+                break
+        self.stats[name] += 1
+        if model == self.model and default is not None:
+            return default, RouteDecision(task, name, model, hint, len(prompt), evidence_chars)
+        if model not in self._providers:
+            self._providers[model] = self._build(model)
+        return self._providers[model], RouteDecision(task, name, model, hint, len(prompt), evidence_chars)
+
+
+def _matches(rule: RouteRule, task: str, hint: str | None, prompt_chars: int, evidence_chars: int) -> bool:
+    if rule.tasks and task not in rule.tasks:
+        return False
+    if (hint not in rule.hints) if hint else bool(rule.hints):
+        return False
+    if rule.max_prompt_chars is not None and prompt_chars > rule.max_prompt_chars:
+        return False
+    if rule.max_evidence_chars is not None and evidence_chars > rule.max_evidence_chars:
+        return False
+    return True
+
+
+def route_llm(
+    router: ModelRouter | None,
+    llm: LLMProvider,
+    task: RouteTask,
+    prompt: str,
+    evidence_chunks: list[dict],
+    hint: str | None = None,
+) -> tuple[LLMProvider, RouteDecision | None]:
+    if router is None:
+        return llm, None
+    return router.route(task, prompt, evidence_chunks, hint, default=llm)
+
+
+def tag_usage(usage: LLMUsage | None, decision: RouteDecision | None) -> LLMUsage | None:
+    if usage is None or decision is None:
+        return usage
+    return replace(usage, route=decision)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# NCBI E-utilities allow 3 requests/second without an API key and 10 with one.
+ANONYMOUS_RATE = 3.0
+API_KEY_RATE = 10.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        # Never waits: fails while another caller holds the bucket or the
+        # tokens are not there yet.
+        tokens = min(tokens, self.capacity)
+        if self._lock.locked():
+            return False
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens < tokens:
+            return False
+        self._tokens -= tokens
+        return True
+
+
+def ncbi_limits() -> httpx.Limits:
+    # The rate limit caps useful concurrency well below httpx's default of
+    # 100 connections; keep a few warm connections to eutils instead.
+    return httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=30.0)
+
+
+class NCBITransport:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        api_key: str = "",
+        requests_per_second: float = 0,
+        tool: str = "",
+        email: str = "",
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self._client = client
+        self._limiter = TokenBucket(requests_per_second or (API_KEY_RATE if api_key else ANONYMOUS_RATE))
+        self._identity = {
+            k: v for k, v in (("api_key", api_key), ("tool", tool), ("email", email)) if v
+        }
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._sleep = sleep
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self.stats = {"requests": 0, "coalesced": 0, "retries": 0}
+
+    async def get(self, url: str, params: dict | None = None) -> httpx.Response:
+        params = {**(params or {}), **self._identity}
+        key = (url, tuple(sorted((k, str(v)) for k, v in params.items())))
+
+        # Singleflight: identical requests already on the wire share one
+        # response instead of spending another slot of the rate limit.
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._get_with_retry(url, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _get_with_retry(self, url: str, params: dict) -> httpx.Response:
+        attempt = 0
+        while True:
+            await self._limiter.acquire()
+            self.stats["requests"] += 1
+            try:
+                resp = await self._client.get(url, params=params)
+            except httpx.TransportError:
+                if attempt >= self._max_retries:
+                    raise
+                delay = self._backoff(attempt, None)
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt >= self._max_retries:
+                    return resp
+                delay = self._backoff(attempt, resp.headers.get("Retry-After"))
+                logger.info("NCBI returned %s, retrying in %.2fs", resp.status_code, delay)
+            attempt += 1
+            self.stats["retries"] += 1
+            await self._sleep(delay)
+
+    def _backoff(self, attempt: int, retry_after: str | None) -> float:
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self._backoff_max)
+            except ValueError:
+                pass
+        # Full jitter keeps concurrent workers from retrying in lockstep.
+        return random.uniform(0, min(self._backoff_max, self._backoff_base * 2 ** attempt))
@@ -1,4 +1,17 @@
+from collections import deque
+from concurrent.futures import Executor
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Iterator
+
 import pymupdf
+from fastapi import Request
+
+# Below this many pages the cost of shipping work to another process
+# outweighs the extraction itself.
+PARALLEL_MIN_PAGES = 32
+PAGES_PER_SHARD = 16
 
 
 def extract_text_from_pdf(pdf_bytes: bytes) -> str:
@@ -9,3 +22,48 @@ def extract_text_from_pdf(pdf_bytes: bytes) -> str:
     if not text.strip():
         raise ValueError("No extractable text in PDF")
     return text
+
+
+def iter_pdf_pages(
+    path: str | Path,
+    executor: Executor | None = None,
+    min_parallel_pages: int = PARALLEL_MIN_PAGES,
+    pages_per_shard: int = PAGES_PER_SHARD,
+    shards_in_flight: int | None = None,
+) -> Iterator[str]:
+    with pymupdf.open(path, filetype="pdf") as doc:
+        if doc.needs_pass:
+            raise ValueError("PDF is password-protected")
+        page_count = doc.page_count
+        if executor is None or page_count < min_parallel_pages:
+            for page in doc:
+                yield page.get_text()
+            return
+
+    # Each worker opens the file itself. Shards come back in document order,
+    # and only about two per worker are in flight, so text waiting to be
+    # consumed stays bounded on large documents.
+    if shards_in_flight is None:
+        shards_in_flight = 2 * getattr(executor, "_max_workers", 1)
+    shards = ((start, min(start + pages_per_shard, page_count)) for start in range(0, page_count, pages_per_shard))
+    submit = partial(executor.submit, _extract_page_range, str(path))
+    futures = deque(submit(*shard) for shard in islice(shards, shards_in_flight))
+    try:
+        while futures:
+            texts = futures.popleft().result()
+            shard = next(shards, None)
+            if shard is not None:
+                futures.append(submit(*shard))
+            yield from texts
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> list[str]:
+    with pymupdf.open(path, filetype="pdf") as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def get_pdf_executor(request: Request) -> Executor | None:
+    return getattr(request.app.state, "pdf_executor", None)
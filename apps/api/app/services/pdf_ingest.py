@@ -0,0 +1,141 @@
+import json
+from concurrent.futures import Executor, as_completed
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+from sqlalchemy.orm import Session
+
+from app.models.reference import Reference
+from app.models.working_set_item import WorkingSetItem
+from app.schemas.references import BatchUploadItem
+from app.services.chunk_store import insert_chunks
+from app.services.chunking import chunk_text_stream
+from app.services.pdf_extraction import iter_pdf_pages
+
+MAX_PDF_BYTES = 50_000_000
+SPOOL_BLOCK_SIZE = 1024 * 1024
+BATCH_COMMIT_FILES = 50
+
+
+class PdfUploadError(Exception):
+    pass
+
+
+class InvalidPdf(PdfUploadError):
+    pass
+
+
+class PdfTooLarge(PdfUploadError):
+    pass
+
+
+def spool_pdf_upload(src: BinaryIO, dest: BinaryIO, max_bytes: int = MAX_PDF_BYTES) -> int:
+    header = src.read(5)
+    if not header.startswith(b"%PDF-"):
+        raise InvalidPdf("Invalid PDF file")
+    dest.write(header)
+    size = len(header)
+
+    while block := src.read(SPOOL_BLOCK_SIZE):
+        size += len(block)
+        if size > max_bytes:
+            raise PdfTooLarge(f"File too large (max {max_bytes // 1_000_000}MB)")
+        dest.write(block)
+
+    dest.flush()
+    return size
+
+
+class _PageCounter:
+    def __init__(self, pages: Iterable[str]) -> None:
+        self._pages = pages
+        self.char_count = 0
+        self.has_text = False
+
+    def __iter__(self) -> Iterator[str]:
+        for text in self._pages:
+            self.char_count += len(text)
+            if not self.has_text and text.strip():
+                self.has_text = True
+            yield text
+
+
+def ingest_pdf(
+    db: Session,
+    reference_id: int,
+    path: str | Path,
+    executor: Executor | None = None,
+) -> tuple[int, int]:
+    pages = _PageCounter(iter_pdf_pages(path, executor))
+    chunk_count = insert_chunks(db, reference_id, chunk_text_stream(pages))
+    if not pages.has_text:
+        raise ValueError("No extractable text in PDF")
+    return pages.char_count, chunk_count
+
+
+def extract_pdf_chunks(path: str) -> tuple[int, list[str]]:
+    pages = _PageCounter(iter_pdf_pages(path))
+    chunks = list(chunk_text_stream(pages))
+    if not pages.has_text:
+        raise ValueError("No extractable text in PDF")
+    return pages.char_count, chunks
+
+
+def ingest_pdf_batch(
+    db: Session,
+    pdfs: list[tuple[str, Path]],
+    executor: Executor | None = None,
+) -> list[BatchUploadItem]:
+    refs = [Reference(title=title, source="pdf_upload", status="processing") for title, _ in pdfs]
+    db.add_all(refs)
+    db.flush()
+    ref_ids = [ref.id for ref in refs]
+    results: list[BatchUploadItem | None] = [None] * len(pdfs)
+
+    # Insert each file as soon as its extraction finishes, committing in
+    # groups rather than once per file.
+    for done, (i, extracted) in enumerate(_extract_batch(pdfs, executor), start=1):
+        ref = refs[i]
+        filename = pdfs[i][0]
+        if isinstance(extracted, Exception):
+            ref.status = "failed"
+            ref.extraction_meta = json.dumps({"error": str(extracted)})
+            results[i] = BatchUploadItem(
+                filename=filename, reference_id=ref_ids[i], status="failed",
+                char_count=0, chunk_count=0, error=str(extracted),
+            )
+        else:
+            char_count, chunks = extracted
+            chunk_count = insert_chunks(db, ref_ids[i], chunks)
+            db.add(WorkingSetItem(reference_id=ref_ids[i]))
+            ref.status = "processed"
+            results[i] = BatchUploadItem(
+                filename=filename, reference_id=ref_ids[i], status="processed",
+                char_count=char_count, chunk_count=chunk_count,
+            )
+        if done % BATCH_COMMIT_FILES == 0:
+            db.commit()
+
+    db.commit()
+    return results
+
+
+def _extract_batch(
+    pdfs: list[tuple[str, Path]],
+    executor: Executor | None,
+) -> Iterator[tuple[int, tuple[int, list[str]] | Exception]]:
+    # PyMuPDF is not thread-safe and extraction is CPU-bound, so without a
+    # process pool the files are extracted one at a time in this thread.
+    if executor is None:
+        for i, (_, path) in enumerate(pdfs):
+            try:
+                yield i, extract_pdf_chunks(str(path))
+            except Exception as e:
+                yield i, e
+        return
+    futures = {executor.submit(extract_pdf_chunks, str(path)): i for i, (_, path) in enumerate(pdfs)}
+    for future in as_completed(futures):
+        try:
+            yield futures[future], future.result()
+        except Exception as e:
+            yield futures[future], e
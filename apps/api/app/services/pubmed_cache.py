@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+SEARCH = "esearch"
+ARTICLE = "article"
+
+
+@dataclass
+class CacheLookup:
+    value: Any
+    stale: bool
+
+
+@dataclass
+class _NamespaceStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+
+    def to_dict(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+
+
+@dataclass
+class _Policy:
+    ttl: float
+    stats: _NamespaceStats = field(default_factory=_NamespaceStats)
+
+
+class PubMedCache:
+    def __init__(
+        self,
+        path: str | Path,
+        memory_entries: int = 2048,
+        search_ttl: float = 600,
+        article_ttl: float = 7 * 24 * 3600,
+        stale_while_revalidate: float = 0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pubmed_cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, fetched_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[tuple[str, str], tuple[Any, float]] = OrderedDict()
+        self._memory_entries = memory_entries
+        self._policies = {SEARCH: _Policy(search_ttl), ARTICLE: _Policy(article_ttl)}
+        self.stale_while_revalidate = stale_while_revalidate
+        self._clock = clock
+
+    def get(self, namespace: str, key: str) -> CacheLookup | None:
+        with self._lock:
+            return self._get(namespace, key)
+
+    def get_many(self, namespace: str, keys: list[str]) -> dict[str, CacheLookup]:
+        with self._lock:
+            found = {key: self._get(namespace, key) for key in keys}
+        return {key: lookup for key, lookup in found.items() if lookup is not None}
+
+    def _get(self, namespace: str, key: str) -> CacheLookup | None:
+        policy = self._policies[namespace]
+        entry = self._memory.get((namespace, key))
+        from_memory = entry is not None
+        if from_memory:
+            self._memory.move_to_end((namespace, key))
+        else:
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM pubmed_cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is not None:
+                entry = (json.loads(row[0]), row[1])
+                self._remember(namespace, key, entry)
+
+        age = self._clock() - entry[1] if entry else None
+        if age is None or age >= policy.ttl + self.stale_while_revalidate:
+            policy.stats.misses += 1
+            return None
+
+        if from_memory:
+            policy.stats.memory_hits += 1
+        else:
+            policy.stats.disk_hits += 1
+        stale = age >= policy.ttl
+        if stale:
+            policy.stats.stale_hits += 1
+        return CacheLookup(value=entry[0], stale=stale)
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        self.set_many(namespace, [(key, value)])
+
+    def set_many(self, namespace: str, items: list[tuple[str, Any]]) -> None:
+        now = self._clock()
+        with self._lock:
+            for key, value in items:
+                self._remember(namespace, key, (value, now))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pubmed_cache (namespace, key, value, fetched_at) VALUES (?, ?, ?, ?)",
+                [(namespace, key, json.dumps(value), now) for key, value in items],
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "stale_while_revalidate": self.stale_while_revalidate,
+                **{namespace: policy.stats.to_dict() for namespace, policy in self._policies.items()},
+            }
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _remember(self, namespace: str, key: str, entry: tuple[Any, float]) -> None:
+        self._memory[(namespace, key)] = entry
+        self._memory.move_to_end((namespace, key))
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+
+def search_key(query: str, max_results: int) -> str:
+    return f"{max_results}:{' '.join(query.lower().split())}"
+
+
+def history_key(query: str, page_size: int) -> str:
+    # A history esearch caches its WebEnv session rather than an id list.
+    return f"history:{search_key(query, page_size)}"
@@ -1,117 +1,363 @@
 from __future__ import annotations
 
+import asyncio
+import io
+import logging
 import xml.etree.ElementTree as ET
+from functools import partial
+from typing import TYPE_CHECKING, BinaryIO, Callable, Coroutine, Iterator
 
 import httpx
 from fastapi import Request
 
+from app.services.ncbi_transport import NCBITransport
+from app.services.pubmed_cache import ARTICLE, SEARCH, PubMedCache, history_key, search_key
+from app.services.pubmed_history import SearchSession, SearchSessionStore
+
+if TYPE_CHECKING:
+    from app.services.pubmed_mirror import PubMedMirror
+
+logger = logging.getLogger(__name__)
+
 BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+EFETCH_BATCH_SIZE = 200
 
 
-def _parse_articles(xml_text: str) -> list[dict]:
+def _parse_articles(xml: str | bytes) -> list[dict]:
     try:
-        root = ET.fromstring(xml_text)
+        return list(iter_parse_articles(xml))
     except ET.ParseError:
         return []
 
-    articles = []
-    for article_el in root.findall(".//PubmedArticle"):
-        citation = article_el.find(".//MedlineCitation")
-        if citation is None:
+
+def iter_parse_articles(source: str | bytes | BinaryIO, label_sections: bool = False) -> Iterator[dict]:
+    for kind, record in iter_pubmed_records(source, label_sections):
+        if kind == "article":
+            yield record
+
+
+def iter_pubmed_records(
+    source: str | bytes | BinaryIO, label_sections: bool = False
+) -> Iterator[tuple[str, dict | str]]:
+    # Yields ("article", dict) per PubmedArticle and ("delete", pmid) per
+    # PMID in a DeleteCitation block (present in baseline update files).
+    if isinstance(source, str):
+        source = source.encode()
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    # Handle each record as its element closes and drop it from the root, so
+    # memory is bounded by one article rather than the whole document.
+    events = ET.iterparse(source, events=("start", "end"))
+    _, root = next(events)
+    for event, elem in events:
+        if event != "end":
             continue
+        if elem.tag == "PubmedArticle":
+            article = parse_article_element(elem, label_sections)
+            if article is not None:
+                yield "article", article
+            root.clear()
+        elif elem.tag == "DeleteCitation":
+            for pmid_el in elem.iterfind("PMID"):
+                if pmid_el.text:
+                    yield "delete", pmid_el.text
+            root.clear()
+
 
-        pmid_el = citation.find("PMID")
-        pmid = pmid_el.text if pmid_el is not None and pmid_el.text else ""
-
-        art = citation.find("Article")
-        title = ""
-        abstract = ""
-        authors: list[str] = []
-        pub_date = ""
-
-        if art is not None:
-            title_el = art.find("ArticleTitle")
-            title = title_el.text if title_el is not None and title_el.text else ""
-
-            abstract_texts = art.findall(".//AbstractText")
-            abstract = " ".join(
-                (at.text or "") for at in abstract_texts
-            ).strip()
-
-            for author in art.findall(".//Author"):
-                last = author.find("LastName")
-                fore = author.find("ForeName")
-                if last is not None and last.text:
-                    name = last.text
-                    if fore is not None and fore.text:
-                        name += " " + fore.text
-                    authors.append(name)
-
-            pub_date_el = art.find(".//PubDate")
-            if pub_date_el is not None:
-                year = pub_date_el.find("Year")
-                month = pub_date_el.find("Month")
-                parts = []
-                if year is not None and year.text:
-                    parts.append(year.text)
-                if month is not None and month.text:
-                    parts.append(month.text)
-                pub_date = " ".join(parts)
-
-        articles.append({
-            "pmid": pmid,
-            "title": title,
-            "authors": authors,
-            "abstract": abstract,
-            "pub_date": pub_date,
-        })
-
-    return articles
+def parse_article_element(article_el: ET.Element, label_sections: bool = False) -> dict | None:
+    citation = article_el.find("MedlineCitation")
+    if citation is None:
+        return None
+
+    pmid = citation.findtext("PMID") or ""
+
+    art = citation.find("Article")
+    title = ""
+    abstract = ""
+    authors: list[str] = []
+    pub_date = ""
+
+    if art is not None:
+        title_el = art.find("ArticleTitle")
+        title = "".join(title_el.itertext()) if title_el is not None else ""
+
+        sections = []
+        for at in art.iterfind("Abstract/AbstractText"):
+            text = "".join(at.itertext()).strip()
+            label = at.get("Label")
+            if label_sections and label and text:
+                text = f"{label}: {text}"
+            sections.append(text)
+        abstract = " ".join(sections).strip()
+
+        for author in art.iterfind("AuthorList/Author"):
+            last = author.findtext("LastName")
+            if last:
+                fore = author.findtext("ForeName")
+                authors.append(f"{last} {fore}" if fore else last)
+
+        pub_date_el = art.find("Journal/JournalIssue/PubDate")
+        if pub_date_el is not None:
+            parts = [t for t in (pub_date_el.findtext("Year"), pub_date_el.findtext("Month")) if t]
+            pub_date = " ".join(parts)
+
+    return {
+        "pmid": pmid,
+        "title": title,
+        "authors": authors,
+        "abstract": abstract,
+        "pub_date": pub_date,
+    }
 
 
 class PubMedClient:
-    def __init__(self, client: httpx.AsyncClient):
+    def __init__(
+        self,
+        client: httpx.AsyncClient | NCBITransport,
+        cache: PubMedCache | None = None,
+        sessions: SearchSessionStore | None = None,
+        mirror: PubMedMirror | None = None,
+    ):
         self._client = client
+        self._cache = cache
+        self._sessions = sessions if sessions is not None else SearchSessionStore()
+        self._mirror = mirror
 
     async def search(self, query: str, max_results: int = 20) -> list[dict]:
+        if self._mirror is not None:
+            results, _ = await self._off_loop(self._mirror.search, query, max_results)
+            return results
         try:
-            esearch_resp = await self._client.get(
-                f"{BASE_URL}/esearch.fcgi",
-                params={
-                    "db": "pubmed",
-                    "term": query,
-                    "retmax": max_results,
-                    "retmode": "json",
-                },
-            )
-            esearch_resp.raise_for_status()
-            data = esearch_resp.json()
-            id_list = data.get("esearchresult", {}).get("idlist", [])
+            id_list = await self._search_ids(query, max_results)
             if not id_list:
                 return []
+            return await self._fetch_articles(id_list)
+        except httpx.HTTPError:
+            return []
+
+    async def search_page(self, query: str, page: int = 1, page_size: int = 20) -> tuple[list[dict], int]:
+        if self._mirror is not None:
+            return await self._off_loop(self._mirror.search, query, page_size, (page - 1) * page_size)
+        try:
+            return await self._search_page(query, page, page_size, retry_expired=True)
+        except httpx.HTTPError:
+            return [], 0
+
+    async def fetch_by_pmid(self, pmid: str) -> dict | None:
+        if self._mirror is not None:
+            articles = await self._off_loop(self._mirror.fetch, [pmid])
+            return articles[0] if articles else None
+        articles = await self._fetch_articles([pmid])
+        return articles[0] if articles else None
+
+    async def fetch_by_pmids(self, pmids: list[str]) -> list[dict]:
+        if self._mirror is not None:
+            return await self._off_loop(self._mirror.fetch, pmids)
+        articles: list[dict] = []
+        for start in range(0, len(pmids), EFETCH_BATCH_SIZE):
+            articles.extend(await self._fetch_articles(pmids[start:start + EFETCH_BATCH_SIZE]))
+        return articles
+
+    async def _off_loop(self, fn: Callable, *args):
+        # Mirror lookups and cache reads/writes are local SQLite I/O; keep
+        # them off the event loop.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(fn, *args))
+
+    async def _search_page(
+        self, query: str, page: int, page_size: int, retry_expired: bool
+    ) -> tuple[list[dict], int]:
+        key = " ".join(query.lower().split())
+        # The retry after an expired WebEnv must not be served the same
+        # WebEnv from the cache.
+        session = self._sessions.get(key) or await self._start_history_session(
+            key, query, page_size, use_cache=retry_expired
+        )
+        retstart = (page - 1) * page_size
+        if retstart >= session.count:
+            return [], session.count
 
-            efetch_resp = await self._client.get(
+        articles = await self._history_page(session, retstart, page_size)
+        if not articles and retry_expired:
+            # NCBI dropped the history set; start a fresh one and retry once.
+            self._sessions.discard(key)
+            return await self._search_page(query, page, page_size, retry_expired=False)
+
+        next_start = retstart + page_size
+        if next_start < session.count:
+            self._start_page_fetch(session, next_start, page_size)
+        return articles, session.count
+
+    async def _start_history_session(
+        self, key: str, query: str, page_size: int, use_cache: bool = True
+    ) -> SearchSession:
+        result = None
+        if self._cache is not None and use_cache:
+            cache_key = history_key(query, page_size)
+            cached = await self._off_loop(self._cache.get, SEARCH, cache_key)
+            if cached is not None:
+                if cached.stale:
+                    self._revalidate((SEARCH, cache_key), self._history_esearch(query, page_size))
+                result = cached.value
+        if result is None:
+            result = await self._history_esearch(query, page_size)
+        return self._sessions.put(key, **result)
+
+    async def _history_esearch(self, query: str, page_size: int) -> dict:
+        resp = await self._client.get(
+            f"{BASE_URL}/esearch.fcgi",
+            params={
+                "db": "pubmed",
+                "term": query,
+                "usehistory": "y",
+                "retmax": page_size,
+                "retmode": "json",
+            },
+        )
+        resp.raise_for_status()
+        result = resp.json().get("esearchresult", {})
+        session = {
+            "webenv": result.get("webenv", ""),
+            "query_key": result.get("querykey", ""),
+            "count": int(result.get("count", 0)),
+            "first_ids": result.get("idlist", []),
+        }
+        if self._cache is not None:
+            await self._off_loop(self._cache.set, SEARCH, history_key(query, page_size), session)
+        return session
+
+    async def _history_page(self, session: SearchSession, retstart: int, page_size: int) -> list[dict]:
+        page = (retstart, page_size)
+        if page in session.pages:
+            return session.pages[page]
+        task = session.inflight.get(page) or self._start_page_fetch(session, retstart, page_size)
+        return await asyncio.shield(task)
+
+    def _start_page_fetch(self, session: SearchSession, retstart: int, page_size: int) -> asyncio.Task:
+        page = (retstart, page_size)
+        task = session.inflight.get(page)
+        if task is None and page not in session.pages:
+            task = asyncio.create_task(self._fetch_history_page(session, retstart, page_size))
+            session.inflight[page] = task
+            task.add_done_callback(partial(_finish_page_fetch, session, page))
+        return task
+
+    async def _fetch_history_page(self, session: SearchSession, retstart: int, page_size: int) -> list[dict]:
+        # The first page's ids came back with esearch, so it can use the
+        # per-article cache; later pages are addressed through the WebEnv.
+        if retstart == 0 and len(session.first_ids) >= min(page_size, session.count):
+            articles = await self._fetch_articles(session.first_ids[:page_size])
+        else:
+            resp = await self._client.get(
                 f"{BASE_URL}/efetch.fcgi",
                 params={
                     "db": "pubmed",
-                    "id": ",".join(id_list),
+                    "WebEnv": session.webenv,
+                    "query_key": session.query_key,
+                    "retstart": retstart,
+                    "retmax": page_size,
                     "retmode": "xml",
                 },
             )
-            efetch_resp.raise_for_status()
-            return _parse_articles(efetch_resp.text)
-        except httpx.HTTPError:
-            return []
+            resp.raise_for_status()
+            articles = _parse_articles(resp.content)
+            await self._cache_articles(articles)
+        if articles:
+            self._sessions.store_page(session, (retstart, page_size), articles)
+        return articles
 
-    async def fetch_by_pmid(self, pmid: str) -> dict | None:
+    async def _search_ids(self, query: str, max_results: int) -> list[str]:
+        if self._cache is None:
+            return await self._esearch(query, max_results)
+
+        key = search_key(query, max_results)
+        cached = await self._off_loop(self._cache.get, SEARCH, key)
+        if cached is not None:
+            if cached.stale:
+                self._revalidate((SEARCH, key), self._esearch(query, max_results))
+            return cached.value
+
+        return await self._esearch(query, max_results)
+
+    async def _esearch(self, query: str, max_results: int) -> list[str]:
+        esearch_resp = await self._client.get(
+            f"{BASE_URL}/esearch.fcgi",
+            params={
+                "db": "pubmed",
+                "term": query,
+                "retmax": max_results,
+                "retmode": "json",
+            },
+        )
+        esearch_resp.raise_for_status()
+        data = esearch_resp.json()
+        id_list = data.get("esearchresult", {}).get("idlist", [])
+        if self._cache is not None:
+            await self._off_loop(self._cache.set, SEARCH, search_key(query, max_results), id_list)
+        return id_list
+
+    async def _fetch_articles(self, id_list: list[str]) -> list[dict]:
+        if self._cache is None:
+            return await self._efetch(id_list)
+
+        cached = await self._off_loop(self._cache.get_many, ARTICLE, id_list)
+        found = {pmid: lookup.value for pmid, lookup in cached.items()}
+        stale = [pmid for pmid in id_list if pmid in cached and cached[pmid].stale]
+
+        missing = [pmid for pmid in id_list if pmid not in found]
+        if missing:
+            for article in await self._efetch(missing):
+                found[article["pmid"]] = article
+        if stale:
+            self._revalidate((ARTICLE, ",".join(stale)), self._efetch(stale))
+
+        return [found[pmid] for pmid in id_list if pmid in found]
+
+    async def _efetch(self, id_list: list[str]) -> list[dict]:
         resp = await self._client.get(
             f"{BASE_URL}/efetch.fcgi",
-            params={"db": "pubmed", "id": pmid, "retmode": "xml"},
+            params={"db": "pubmed", "id": ",".join(id_list), "retmode": "xml"},
         )
         resp.raise_for_status()
-        articles = _parse_articles(resp.text)
-        return articles[0] if articles else None
+        articles = _parse_articles(resp.content)
+        await self._cache_articles(articles)
+        return articles
+
+    async def _cache_articles(self, articles: list[dict]) -> None:
+        if self._cache is not None:
+            await self._off_loop(self._cache.set_many, ARTICLE, [(a["pmid"], a) for a in articles if a["pmid"]])
+
+    def _revalidate(self, key: tuple[str, str], fetch: Coroutine) -> None:
+        # Serve the stale entry now and refresh it in the background; the
+        # registry keeps a strong reference and dedupes concurrent refreshes.
+        if key in _revalidating:
+            fetch.close()
+            return
+        task = asyncio.create_task(fetch)
+        _revalidating[key] = task
+        task.add_done_callback(partial(_finish_revalidation, key))
+
+
+_revalidating: dict[tuple[str, str], asyncio.Task] = {}
+
+
+def _finish_revalidation(key: tuple[str, str], task: asyncio.Task) -> None:
+    _revalidating.pop(key, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("PubMed cache revalidation failed for %s", key, exc_info=task.exception())
+
+
+def _finish_page_fetch(session: SearchSession, page: tuple[int, int], task: asyncio.Task) -> None:
+    session.inflight.pop(page, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("PubMed page fetch failed for %s", page, exc_info=task.exception())
 
 
 def get_pubmed_client(request: Request) -> PubMedClient:
-    return PubMedClient(request.app.state.http_client)
+    return PubMedClient(
+        request.app.state.ncbi_transport,
+        getattr(request.app.state, "pubmed_cache", None),
+        request.app.state.search_sessions,
+        getattr(request.app.state, "pubmed_mirror", None),
+    )
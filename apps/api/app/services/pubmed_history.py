@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable
+
+# NCBI keeps history sets for a few hours of inactivity; expire ours well
+# before that so a stale WebEnv is rarely sent.
+SESSION_TTL = 30 * 60
+
+
+@dataclass
+class SearchSession:
+    webenv: str
+    query_key: str
+    count: int
+    first_ids: list[str]
+    created_at: float
+    pages: OrderedDict[tuple[int, int], list[dict]] = field(default_factory=OrderedDict)
+    inflight: dict[tuple[int, int], asyncio.Task] = field(default_factory=dict)
+
+
+class SearchSessionStore:
+    def __init__(
+        self,
+        max_sessions: int = 256,
+        max_pages_per_session: int = 10,
+        ttl: float = SESSION_TTL,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._sessions: OrderedDict[str, SearchSession] = OrderedDict()
+        self._max_sessions = max_sessions
+        self._max_pages = max_pages_per_session
+        self._ttl = ttl
+        self._clock = clock
+
+    def get(self, key: str) -> SearchSession | None:
+        session = self._sessions.get(key)
+        if session is None:
+            return None
+        if self._clock() - session.created_at >= self._ttl:
+            self.discard(key)
+            return None
+        self._sessions.move_to_end(key)
+        return session
+
+    def put(self, key: str, webenv: str, query_key: str, count: int, first_ids: list[str]) -> SearchSession:
+        session = SearchSession(webenv, query_key, count, first_ids, self._clock())
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self._max_sessions:
+            _, evicted = self._sessions.popitem(last=False)
+            _cancel_inflight(evicted)
+        return session
+
+    def discard(self, key: str) -> None:
+        session = self._sessions.pop(key, None)
+        if session is not None:
+            _cancel_inflight(session)
+
+    def store_page(self, session: SearchSession, page: tuple[int, int], articles: list[dict]) -> None:
+        session.pages[page] = articles
+        session.pages.move_to_end(page)
+        while len(session.pages) > self._max_pages:
+            session.pages.popitem(last=False)
+
+
+def _cancel_inflight(session: SearchSession) -> None:
+    for task in session.inflight.values():
+        task.cancel()
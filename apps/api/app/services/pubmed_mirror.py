@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from app.services.pubmed_client import iter_pubmed_records
+
+INGEST_BATCH_SIZE = 2000
+# bm25 ranking scores every match; past this many matches, fall back to
+# newest-first (rowid order), which FTS5 can stop early on.
+RANKED_SEARCH_MAX_MATCHES = 10000
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS articles (
+        pmid INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        authors TEXT NOT NULL,
+        abstract TEXT NOT NULL,
+        pub_date TEXT NOT NULL
+    )
+    """,
+    "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title, abstract, content=articles, content_rowid=pmid)",
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts(rowid, title, abstract) VALUES (new.pmid, new.title, new.abstract);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, abstract) VALUES ('delete', old.pmid, old.title, old.abstract);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, abstract) VALUES ('delete', old.pmid, old.title, old.abstract);
+        INSERT INTO articles_fts(rowid, title, abstract) VALUES (new.pmid, new.title, new.abstract);
+    END
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ingested_files (
+        name TEXT PRIMARY KEY,
+        articles INTEGER NOT NULL,
+        deleted INTEGER NOT NULL,
+        ingested_at REAL NOT NULL
+    )
+    """,
+]
+
+_UPSERT = """
+    INSERT INTO articles (pmid, title, authors, abstract, pub_date) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(pmid) DO UPDATE SET
+        title = excluded.title, authors = excluded.authors,
+        abstract = excluded.abstract, pub_date = excluded.pub_date
+"""
+
+
+@dataclass
+class IngestStats:
+    file: str
+    articles: int = 0
+    deleted: int = 0
+    seconds: float = 0.0
+    skipped: bool = False
+
+    @property
+    def articles_per_second(self) -> float:
+        return self.articles / self.seconds if self.seconds else 0.0
+
+
+class PubMedMirror:
+    def __init__(self, path: str | Path) -> None:
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def ingest_file(self, path: str | Path, force: bool = False) -> IngestStats:
+        path = Path(path)
+        stats = IngestStats(file=path.name)
+        with self._lock:
+            done = self._conn.execute("SELECT 1 FROM ingested_files WHERE name = ?", (path.name,)).fetchone()
+        if done and not force:
+            stats.skipped = True
+            return stats
+
+        start = time.perf_counter()
+        opener = gzip.open if path.suffix == ".gz" else open
+        upserts: list[tuple] = []
+        deletes: list[tuple] = []
+        with opener(path, "rb") as f, self._lock:
+            # One transaction per file: a crash mid-file leaves it unrecorded,
+            # so the next run ingests it again from the start.
+            for kind, record in iter_pubmed_records(f):
+                if kind == "article":
+                    if not record["pmid"].isdigit():
+                        continue
+                    upserts.append(_article_row(record))
+                    stats.articles += 1
+                    if len(upserts) >= INGEST_BATCH_SIZE:
+                        self._conn.executemany(_UPSERT, upserts)
+                        upserts = []
+                else:
+                    deletes.append((int(record),))
+                    stats.deleted += 1
+            if upserts:
+                self._conn.executemany(_UPSERT, upserts)
+            if deletes:
+                self._conn.executemany("DELETE FROM articles WHERE pmid = ?", deletes)
+            stats.seconds = time.perf_counter() - start
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ingested_files (name, articles, deleted, ingested_at) VALUES (?, ?, ?, ?)",
+                (path.name, stats.articles, stats.deleted, time.time()),
+            )
+            self._conn.commit()
+        return stats
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> tuple[list[dict], int]:
+        match = _fts_query(query)
+        if not match:
+            return [], 0
+        with self._lock:
+            total = self._conn.execute(
+                "SELECT count(*) FROM articles_fts WHERE articles_fts MATCH ?", (match,)
+            ).fetchone()[0]
+            order = "articles_fts.rank" if total <= RANKED_SEARCH_MAX_MATCHES else "articles_fts.rowid DESC"
+            rows = self._conn.execute(
+                f"""
+                SELECT a.pmid, a.title, a.authors, a.abstract, a.pub_date
+                FROM articles_fts JOIN articles a ON a.pmid = articles_fts.rowid
+                WHERE articles_fts MATCH ?
+                ORDER BY {order}
+                LIMIT ? OFFSET ?
+                """,
+                (match, limit, offset),
+            ).fetchall()
+        return [_row_to_article(r) for r in rows], total
+
+    def fetch(self, pmids: list[str]) -> list[dict]:
+        ids = [int(p) for p in pmids if p.isdigit()]
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT pmid, title, authors, abstract, pub_date FROM articles WHERE pmid IN ({placeholders})",
+                ids,
+            ).fetchall()
+        by_pmid = {str(r[0]): _row_to_article(r) for r in rows}
+        return [by_pmid[p] for p in pmids if p in by_pmid]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM articles").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _article_row(article: dict) -> tuple:
+    return (
+        int(article["pmid"]),
+        article["title"],
+        json.dumps(article["authors"]),
+        article["abstract"],
+        article["pub_date"],
+    )
+
+
+def _row_to_article(row: tuple) -> dict:
+    return {
+        "pmid": str(row[0]),
+        "title": row[1],
+        "authors": json.loads(row[2]),
+        "abstract": row[3],
+        "pub_date": row[4],
+    }
+
+
+def _fts_query(query: str) -> str:
+    # Entrez syntax is not supported offline; treat the query as a list of
+    # terms that must all match, quoted so FTS5 operators are inert.
+    terms = re.findall(r"\w+", query.lower())
+    return " ".join(f'"{t}"' for t in terms)
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.config import settings
+
+    parser = argparse.ArgumentParser(prog="python -m app.services.pubmed_mirror")
+    parser.add_argument("--db", default=settings.pubmed_mirror_path or "./data/pubmed_mirror.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Ingest PubMed baseline/update XML files (.xml or .xml.gz)")
+    ingest.add_argument("files", nargs="+", type=Path)
+    ingest.add_argument("--force", action="store_true", help="Re-ingest files already recorded")
+    search = sub.add_parser("search", help="Query the mirror")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    mirror = PubMedMirror(args.db)
+    try:
+        if args.command == "ingest":
+            # Baseline and update files are numbered; applying them in name
+            # order keeps later updates and deletions authoritative.
+            for path in sorted(args.files, key=lambda p: p.name):
+                stats = mirror.ingest_file(path, force=args.force)
+                print(json.dumps({**asdict(stats), "articles_per_second": round(stats.articles_per_second)}))
+        else:
+            start = time.perf_counter()
+            results, total = mirror.search(args.query, limit=args.limit)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(json.dumps({"total": total, "ms": round(elapsed_ms, 1), "results": results}, indent=2))
+    finally:
+        mirror.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
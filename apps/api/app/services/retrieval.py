@@ -4,6 +4,7 @@ from sqlalchemy import text as sql_text
 from sqlalchemy.orm import Session
 
 from app.models.chunk import Chunk
+from app.services.chunk_terms import attach_terms
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +23,37 @@ def retrieve(
 ) -> list[dict]:
     if not reference_ids:
         return []
+    results = _search(db, query, reference_ids, top_k)
+    if results is None:
+        return _fallback(db, reference_ids, top_k)
+    return results
+
+
+def retrieve_many(
+    db: Session, queries: list[str], reference_ids: list[int], top_k: int = 5
+) -> list[list[dict]]:
+    if not reference_ids:
+        return [[] for _ in queries]
+    # Batch jobs share one working set and often repeat prompts: search each
+    # distinct query once and compute the fallback at most once.
+    fallback: list[dict] | None = None
+    by_query: dict[str, list[dict]] = {}
+    for query in dict.fromkeys(queries):
+        results = _search(db, query, reference_ids, top_k)
+        if results is None:
+            if fallback is None:
+                fallback = _fallback(db, reference_ids, top_k)
+            results = fallback
+        by_query[query] = results
+    return [by_query[q] for q in queries]
 
+
+def _search(
+    db: Session, query: str, reference_ids: list[int], top_k: int
+) -> list[dict] | None:
     safe_query = query.replace('"', "")
     if not safe_query.strip():
-        return _fallback(db, reference_ids, top_k)
+        return None
 
     placeholders = ",".join(f":ref_{i}" for i in range(len(reference_ids)))
     params = {f"ref_{i}": rid for i, rid in enumerate(reference_ids)}
@@ -46,12 +74,12 @@ def retrieve(
         results = db.execute(stmt, params).fetchall()
     except Exception:
         logger.warning("FTS query failed, using fallback", exc_info=True)
-        return _fallback(db, reference_ids, top_k)
+        return None
 
     if not results:
-        return _fallback(db, reference_ids, top_k)
+        return None
 
-    return [_chunk_to_dict(r) for r in results]
+    return attach_terms(db, [_chunk_to_dict(r) for r in results])
 
 
 def _fallback(
@@ -64,4 +92,4 @@ def _fallback(
         .limit(top_k)
         .all()
     )
-    return [_chunk_to_dict(c) for c in chunks]
+    return attach_terms(db, [_chunk_to_dict(c) for c in chunks])
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from fastapi import Request
+
+from app.services.chunking import chunk_text
+
+STAGE_TOP_N = 10
+
+
+@dataclass
+class StagedArticle:
+    article: dict
+    chunks: list[str]
+    staged_at: float
+
+
+class SearchStaging:
+    def __init__(
+        self,
+        max_entries: int = 500,
+        ttl: float = 3600,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._entries: OrderedDict[str, StagedArticle] = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        self.stats = {"staged": 0, "hits": 0, "misses": 0}
+
+    async def stage(self, articles: list[dict], top_n: int = STAGE_TOP_N) -> None:
+        now = self._clock()
+        top = [article for article in articles[:top_n] if article["pmid"]]
+        fresh = [article for article in top if self._needs_chunking(article)]
+        # Chunking is CPU work; run it off the event loop and only touch the
+        # entries back on it.
+        chunks = await asyncio.get_running_loop().run_in_executor(None, _chunk_abstracts, fresh) if fresh else []
+        staged = {article["pmid"]: StagedArticle(article, c, now) for article, c in zip(fresh, chunks)}
+        for article in top:
+            pmid = article["pmid"]
+            if pmid in staged:
+                self._entries[pmid] = staged[pmid]
+                self.stats["staged"] += 1
+            elif pmid in self._entries:
+                self._entries[pmid].staged_at = now
+            else:
+                continue
+            self._entries.move_to_end(pmid)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, pmid: str) -> StagedArticle | None:
+        # The entry stays staged until discard(), so an import that fails
+        # before its commit can still use it on retry.
+        staged = self._entries.get(pmid)
+        if staged is not None and self._clock() - staged.staged_at >= self._ttl:
+            del self._entries[pmid]
+            staged = None
+        if staged is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return staged
+
+    def discard(self, pmids: Iterable[str]) -> None:
+        for pmid in pmids:
+            self._entries.pop(pmid, None)
+
+    def _needs_chunking(self, article: dict) -> bool:
+        existing = self._entries.get(article["pmid"])
+        return existing is None or existing.article != article
+
+
+def _chunk_abstracts(articles: list[dict]) -> list[list[str]]:
+    return [chunk_text(article["abstract"]) for article in articles]
+
+
+def get_search_staging(request: Request) -> SearchStaging:
+    return request.app.state.search_staging
@@ -1,18 +1,53 @@
 import asyncio
-import json
+from dataclasses import dataclass, field
 from functools import partial
-from typing import AsyncIterator
+from typing import AsyncIterator, Literal
 
+import anyio
 from sqlalchemy.orm import Session
 
-from app.models.message import Message
-from app.models.message_version import MessageVersion
+from app.schemas.claims import Claim, ClaimStatus
 from app.schemas.generation import GenerateResponse
-from app.schemas.streaming import DeltaEvent, ErrorEvent, StatusEvent, sse_event
-from app.services.generation import SYSTEM_PROMPT
-from app.services.grounding_verifier import verify_claims
-from app.services.llm_provider import LLMProvider, StreamResult
-from app.services.retrieval import retrieve
+from app.schemas.streaming import ClaimEvent, DeltaEvent, ErrorEvent, StatusEvent, sse_event
+from app.services.claim_stream import IncrementalClaimParser
+from app.services.generation import (
+    SYSTEM_PROMPT,
+    persist_generated,
+    retrieve_and_release,
+    variant_prompt,
+    variant_response,
+)
+from app.services.grounding_verifier import verify_claim
+from app.services.llm_provider import LLMClaim, LLMProvider, StreamResult
+from app.services.llm_routing import ModelRouter, route_llm, tag_usage
+
+
+# Completion tokens are estimated from streamed text when a stream is cut
+# off before the provider reports usage.
+CHARS_PER_TOKEN = 4
+
+
+class StreamDisconnects:
+    # Streams abandoned by their client. "discard" drops what was generated;
+    # "persist" saves the claims verified so far as a partial draft.
+
+    def __init__(self, on_disconnect: Literal["discard", "persist"] = "discard") -> None:
+        self.on_disconnect = on_disconnect
+        self.stats = {
+            "disconnects": 0,
+            "discarded": 0,
+            "persisted": 0,
+            "wasted_completion_tokens": 0,
+            "persisted_completion_tokens": 0,
+        }
+
+
+@dataclass
+class _VariantState:
+    result: StreamResult = field(default_factory=StreamResult)
+    streamed: list[LLMClaim] = field(default_factory=list)
+    verified: list[Claim] = field(default_factory=list)
+    streamed_chars: int = 0
 
 
 async def stream_generate_pipeline(
@@ -21,13 +56,20 @@ async def stream_generate_pipeline(
     reference_ids: list[int],
     llm: LLMProvider,
     top_k: int = 5,
+    variants: int = 1,
+    disconnects: StreamDisconnects | None = None,
+    router: ModelRouter | None = None,
+    hint: str | None = None,
 ) -> AsyncIterator[dict]:
+    tasks: list[asyncio.Task] = []
+    states: list[_VariantState] = []
+    persisting = False
     try:
         yield sse_event("status", StatusEvent(stage="retrieving"))
 
         loop = asyncio.get_running_loop()
         chunks = await loop.run_in_executor(
-            None, partial(retrieve, db, prompt, reference_ids, top_k)
+            None, partial(retrieve_and_release, db, prompt, reference_ids, top_k)
         )
 
         if not chunks:
@@ -43,55 +85,137 @@ async def stream_generate_pipeline(
 
         yield sse_event("status", StatusEvent(stage="generating"))
 
-        result = StreamResult()
-        async for delta in llm.async_stream_claims(prompt, chunks, SYSTEM_PROMPT, result):
-            yield sse_event("delta", DeltaEvent(text=delta))
+        llm, decision = route_llm(router, llm, "variants" if variants > 1 else "generate", prompt, chunks, hint)
 
-        parsed = result.parsed
-        if parsed is None:
-            raise ValueError("Stream completed without parsed result")
+        # Variants stream concurrently into one queue; each finished task is
+        # queued after its last event so failures surface as soon as they happen.
+        queue: asyncio.Queue = asyncio.Queue()
+        for k in range(variants):
+            states.append(_VariantState())
+            task = asyncio.ensure_future(
+                _stream_variant(queue, loop, llm, variant_prompt(prompt, k, variants), chunks, k, states[k])
+            )
+            task.add_done_callback(queue.put_nowait)
+            tasks.append(task)
+        finished = 0
+        while finished < variants:
+            item = await queue.get()
+            if isinstance(item, asyncio.Future):
+                item.result()
+                finished += 1
+            else:
+                yield item
 
         yield sse_event("status", StatusEvent(stage="verifying"))
 
-        supported, dropped = await loop.run_in_executor(
-            None, partial(verify_claims, parsed.claims, chunks)
-        )
-
-        message_text = " ".join(c.text for c in supported)
-        warnings: list[str] = [
-            f"Dropped claim: '{c.text}' - {c.warning}" for c in dropped
-        ]
+        generated = []
+        for k, state in enumerate(states):
+            result, streamed, verified = state.result, state.streamed, state.verified
+            parsed = result.parsed
+            if parsed is None:
+                raise ValueError("Stream completed without parsed result")
+            # The final parse is authoritative; claims the incremental parser
+            # missed (or disagreed on) are verified now and re-sent by index.
+            if parsed.claims[:len(streamed)] != streamed:
+                verified = []
+            for claim in parsed.claims[len(verified):]:
+                checked = await _verify_one(loop, claim, chunks)
+                yield sse_event("claim", ClaimEvent(index=len(verified), claim=checked, variant=k))
+                verified.append(checked)
+
+            supported = [c for c in verified if c.status == ClaimStatus.supported]
+            dropped = [c for c in verified if c.status == ClaimStatus.dropped]
+            generated.append((supported, dropped, tag_usage(result.usage, decision)))
 
         yield sse_event("status", StatusEvent(stage="persisting"))
 
-        def _persist():
-            msg = Message(status="draft")
-            db.add(msg)
-            db.flush()
-            version = MessageVersion(
-                message_id=msg.id,
-                version_number=1,
-                prompt_or_instruction=prompt,
-                message_text=message_text,
-                claims_json=json.dumps([c.model_dump() for c in supported]),
-                dropped_claims_json=json.dumps([c.model_dump() for c in dropped]),
-                source="generated",
-            )
-            db.add(version)
-            db.flush()
-            db.commit()
-            return msg.id
-
-        message_id = await loop.run_in_executor(None, _persist)
-
-        response = GenerateResponse(
-            message_id=message_id,
-            message_text=message_text,
-            claims=supported,
-            warnings=warnings,
+        persisting = True
+        message_ids = await loop.run_in_executor(
+            None, partial(persist_generated, db, prompt, generated, len(chunks))
         )
-        yield sse_event("final", response)
+
+        for k, (message_id, (supported, dropped, _)) in enumerate(zip(message_ids, generated)):
+            yield sse_event("final", variant_response(message_id, supported, dropped, k))
         yield sse_event("status", StatusEvent(stage="done"))
 
+    except (asyncio.CancelledError, GeneratorExit):
+        # The client went away: sse-starlette cancels the response task, or
+        # the generator is closed at a yield. Stop paying for upstream tokens
+        # now instead of letting the streams run to completion.
+        if states and not persisting:
+            # anyio re-delivers the cancellation on every await; shield the
+            # cleanup so upstream streams close and any partial draft commits.
+            with anyio.CancelScope(shield=True):
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await _abandon(db, loop, prompt, len(chunks), states, disconnects)
+        raise
     except Exception as e:
         yield sse_event("error", ErrorEvent(message=str(e)))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _abandon(
+    db: Session,
+    loop: asyncio.AbstractEventLoop,
+    prompt: str,
+    chunk_count: int,
+    states: list[_VariantState],
+    disconnects: StreamDisconnects | None,
+) -> None:
+    policy = disconnects.on_disconnect if disconnects is not None else "discard"
+    tokens = sum(s.streamed_chars for s in states) // CHARS_PER_TOKEN
+    # Usage is unknown for a stream cut off before its final chunk.
+    generated = [
+        (
+            [c for c in s.verified if c.status == ClaimStatus.supported],
+            [c for c in s.verified if c.status == ClaimStatus.dropped],
+            None,
+        )
+        for s in states
+        if s.verified
+    ]
+    persisted = policy == "persist" and bool(generated)
+    if persisted:
+        await loop.run_in_executor(
+            None, partial(persist_generated, db, prompt, generated, chunk_count, source="partial")
+        )
+    if disconnects is not None:
+        disconnects.stats["disconnects"] += 1
+        disconnects.stats["persisted" if persisted else "discarded"] += 1
+        disconnects.stats["persisted_completion_tokens" if persisted else "wasted_completion_tokens"] += tokens
+
+
+async def _stream_variant(
+    queue: asyncio.Queue,
+    loop: asyncio.AbstractEventLoop,
+    llm: LLMProvider,
+    prompt: str,
+    chunks: list[dict],
+    variant: int,
+    state: _VariantState,
+) -> None:
+    # Each claim is verified as soon as its object closes in the stream,
+    # so verification overlaps generation instead of following it.
+    parser = IncrementalClaimParser()
+    stream = llm.async_stream_claims(prompt, chunks, SYSTEM_PROMPT, state.result)
+    try:
+        async for delta in stream:
+            state.streamed_chars += len(delta)
+            queue.put_nowait(sse_event("delta", DeltaEvent(text=delta, variant=variant)))
+            for claim in parser.feed(delta):
+                checked = await _verify_one(loop, claim, chunks)
+                queue.put_nowait(
+                    sse_event("claim", ClaimEvent(index=len(state.verified), claim=checked, variant=variant))
+                )
+                state.streamed.append(claim)
+                state.verified.append(checked)
+    finally:
+        await stream.aclose()
+
+
+async def _verify_one(loop: asyncio.AbstractEventLoop, claim: LLMClaim, chunks: list[dict]) -> Claim:
+    return await loop.run_in_executor(None, partial(verify_claim, claim, chunks))
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Literal
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.generation_route import GenerationRoute
+from app.models.generation_usage import GenerationUsage
+from app.models.message_version import MessageVersion
+from app.schemas.claims import Claim
+from app.schemas.usage import ExpensiveGeneration, UsageBucket
+from app.services.llm_provider import LLMUsage
+
+
+def record_usage(
+    db: Session,
+    version: MessageVersion,
+    usage: LLMUsage | None,
+    chunk_count: int,
+    supported: list[Claim],
+    dropped: list[Claim],
+) -> None:
+    if usage is None:
+        return
+    db.add(GenerationUsage(
+        message_version_id=version.id,
+        model=usage.model,
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        cached_tokens=usage.cached_tokens,
+        latency_ms=usage.latency_ms,
+        ttft_ms=usage.ttft_ms,
+        cache_hit=usage.cache_hit,
+        chunk_count=chunk_count,
+        supported_claims=len(supported),
+        dropped_claims=len(dropped),
+    ))
+    if usage.route is not None:
+        route = usage.route
+        db.add(GenerationRoute(
+            message_version_id=version.id,
+            task=route.task,
+            rule=route.rule,
+            model=route.model,
+            hint=route.hint,
+            prompt_chars=route.prompt_chars,
+            evidence_chars=route.evidence_chars,
+        ))
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    # Nearest-rank; SQLite has no percentile aggregate and the row counts
+    # behind a metrics window are small.
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[max(0, math.ceil(q * len(values)) - 1)], 1)
+
+
+def _since(days: int) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def _group_key(row: GenerationUsage, route: GenerationRoute | None, group_by: str) -> str:
+    if group_by == "day":
+        return row.created_at.strftime("%Y-%m-%d")
+    if group_by == "route":
+        return f"{route.task}/{route.rule}/{route.model}" if route else "unrouted"
+    return row.model
+
+
+def usage_summary(db: Session, group_by: Literal["day", "model", "route"], days: int) -> list[UsageBucket]:
+    rows = db.execute(
+        select(GenerationUsage, GenerationRoute)
+        .outerjoin(GenerationRoute, GenerationRoute.message_version_id == GenerationUsage.message_version_id)
+        .where(GenerationUsage.created_at >= _since(days))
+        .order_by(GenerationUsage.created_at)
+    ).all()
+    groups: dict[str, list[GenerationUsage]] = defaultdict(list)
+    for row, route in rows:
+        groups[_group_key(row, route, group_by)].append(row)
+
+    buckets = []
+    for key, group in groups.items():
+        # Cache hits cost nothing upstream, so latency and cost figures
+        # describe real calls only.
+        upstream = [r for r in group if not r.cache_hit]
+        tokens = sum(r.prompt_tokens + r.completion_tokens for r in upstream)
+        supported = sum(r.supported_claims for r in upstream)
+        buckets.append(UsageBucket(
+            key=key,
+            generations=len(group),
+            cache_hits=len(group) - len(upstream),
+            prompt_tokens=sum(r.prompt_tokens for r in upstream),
+            completion_tokens=sum(r.completion_tokens for r in upstream),
+            cached_tokens=sum(r.cached_tokens for r in upstream),
+            supported_claims=sum(r.supported_claims for r in group),
+            tokens_per_supported_claim=round(tokens / supported, 1) if supported else None,
+            latency_ms_p50=_percentile([r.latency_ms for r in upstream], 0.5),
+            latency_ms_p95=_percentile([r.latency_ms for r in upstream], 0.95),
+            ttft_ms_p50=_percentile([r.ttft_ms for r in upstream if r.ttft_ms is not None], 0.5),
+            ttft_ms_p95=_percentile([r.ttft_ms for r in upstream if r.ttft_ms is not None], 0.95),
+        ))
+    return buckets
+
+
+def expensive_generations(db: Session, days: int, limit: int) -> list[ExpensiveGeneration]:
+    total = GenerationUsage.prompt_tokens + GenerationUsage.completion_tokens
+    rows = db.execute(
+        select(GenerationUsage, MessageVersion)
+        .join(MessageVersion, MessageVersion.id == GenerationUsage.message_version_id)
+        .where(GenerationUsage.created_at >= _since(days), GenerationUsage.cache_hit.is_(False))
+        .order_by(total.desc())
+        .limit(limit)
+    ).all()
+    return [
+        ExpensiveGeneration(
+            message_id=version.message_id,
+            version_number=version.version_number,
+            source=version.source,
+            prompt=version.prompt_or_instruction,
+            model=usage.model,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            chunk_count=usage.chunk_count,
+            supported_claims=usage.supported_claims,
+            latency_ms=usage.latency_ms,
+            created_at=usage.created_at,
+        )
+        for usage, version in rows
+    ]
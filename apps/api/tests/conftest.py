@@ -1,11 +1,27 @@
+import os
+import tempfile
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from starlette.testclient import TestClient
 
-from app.database import get_db, init_db
-from app.main import app
+# Settings are read when the app is imported. Point the lifespan at a
+# throwaway database, since it backfills chunk terms and resumes pending
+# generation jobs there, and keep it off .env's API key and the on-disk caches
+# under ./data.
+_test_data = tempfile.TemporaryDirectory()
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_test_data.name}/app.db",
+    "OPENAI_API_KEY": "",
+    "LLM_CACHE_PATH": "",
+    "PUBMED_CACHE_PATH": "",
+    "PUBMED_MIRROR_PATH": "",
+})
+
+from app.database import get_db, init_db  # noqa: E402
+from app.main import app  # noqa: E402
 
 
 @pytest.fixture
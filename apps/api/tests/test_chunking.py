@@ -1,4 +1,4 @@
-from app.services.chunking import chunk_text
+from app.services.chunking import chunk_text, chunk_text_stream
 
 
 def test_empty_string_returns_empty_list():
@@ -26,3 +26,14 @@ def test_text_without_sentence_punctuation():
     result = chunk_text(text.strip(), max_chunk_size=100)
     # Without sentence boundaries, entire text becomes one chunk
     assert len(result) == 1
+
+
+def test_stream_matches_chunk_text_across_piece_boundaries():
+    sentences = [f"Sentence number {i} is here." for i in range(40)]
+    text = "  " + "\n".join(sentences) + " trailing words without stop \n"
+    pieces = [text[i:i + 37] for i in range(0, len(text), 37)]
+    assert list(chunk_text_stream(pieces, max_chunk_size=120)) == chunk_text(text, max_chunk_size=120)
+
+
+def test_stream_of_blank_pieces_is_empty():
+    assert list(chunk_text_stream(["", "  ", "\n"])) == []
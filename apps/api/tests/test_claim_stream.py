@@ -0,0 +1,29 @@
+from app.services.claim_stream import IncrementalClaimParser
+from app.services.llm_provider import LLMCitation, LLMClaim, LLMGenerationResult
+
+RESULT = LLMGenerationResult(claims=[
+    LLMClaim(text='Braces {like} [these] and "quotes" \\ survive.', citations=[LLMCitation(reference_id=1, chunk_id=2)]),
+    LLMClaim(text="Second claim.", citations=[]),
+])
+
+
+def test_claims_emitted_as_each_object_closes():
+    text = RESULT.model_dump_json()
+    first_end = text.index("}]}") + 3
+    parser = IncrementalClaimParser()
+    assert parser.feed(text[:first_end - 1]) == []
+    assert parser.feed(text[first_end - 1:first_end]) == [RESULT.claims[0]]
+    assert parser.feed(text[first_end:]) == [RESULT.claims[1]]
+
+
+def test_any_split_yields_the_same_claims():
+    text = RESULT.model_dump_json(indent=2)
+    for size in (1, 3, 16, len(text)):
+        parser = IncrementalClaimParser()
+        claims = [c for i in range(0, len(text), size) for c in parser.feed(text[i:i + size])]
+        assert claims == RESULT.claims
+
+
+def test_malformed_object_is_skipped():
+    parser = IncrementalClaimParser()
+    assert parser.feed('{"claims":[{"text":"x"}, {"text":"y","citations":[]}]}') == [LLMClaim(text="y", citations=[])]
@@ -1,3 +1,7 @@
+import asyncio
+
+import anyio
+import httpx
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -7,12 +11,17 @@ from starlette.testclient import TestClient
 from app.database import Base, get_db, init_db
 from app.main import app
 from app.models.chunk import Chunk
+from app.models.message_version import MessageVersion
 from app.models.reference import Reference
 from app.models.working_set_item import WorkingSetItem
 from app.routers.messages import get_llm_provider
+from app.schemas.claims import Citation, Claim, ClaimStatus
+from app.services.editing import merge_edits
 from app.services.llm_provider import (
     LLMCitation,
     LLMClaim,
+    LLMClaimEdit,
+    LLMEditResult,
     LLMGenerationResult,
     MockProvider,
 )
@@ -121,6 +130,28 @@ def test_direct_edit(mock_llm_client):
     assert versions[1]["source"] == "edited"
 
 
+@pytest.mark.parametrize(
+    ("message_text", "warning"),
+    [
+        (
+            "Evidence about diabetes treatment from the test text.",
+            "Edited text is supported by the previous version's evidence but is stored without citations.",
+        ),
+        (
+            "Statins reduce cardiovascular events.",
+            "Edited text could not be grounded against previous version's evidence. Review for accuracy.",
+        ),
+    ],
+)
+def test_direct_edit_is_checked_against_previous_evidence(mock_llm_client, message_text, warning):
+    generated = mock_llm_client.post(
+        "/messages/generate", json={"prompt": "Write about diabetes", "reference_ids": [1]}
+    ).json()
+    resp = mock_llm_client.put(f"/messages/{generated['message_id']}", json={"message_text": message_text})
+    assert resp.status_code == 200
+    assert resp.json()["warnings"] == [warning]
+
+
 def test_finalized_message_rejects_refine(mock_llm_client):
     client = mock_llm_client
 
@@ -139,3 +170,264 @@ def test_finalized_message_rejects_refine(mock_llm_client):
         json={"instruction": "Make it shorter", "reference_ids": [1]},
     )
     assert resp.status_code == 409
+
+
+class SlowProvider(MockProvider):
+    def __init__(self, fixed_result: LLMGenerationResult, delay: float) -> None:
+        super().__init__(fixed_result)
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def async_generate_claims(self, prompt, evidence_chunks, system_prompt):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return self.fixed_result
+
+
+def test_generate_concurrency_exceeds_threadpool(tmp_path):
+    # A file database gives each session its own connection, as in production.
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+    init_db(test_engine)
+    TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    session = TestSession()
+    session.add(Reference(id=1, title="Test Reference", source="test"))
+    session.flush()
+    session.add(Chunk(id=1, reference_id=1, content="Test evidence text about diabetes treatment.", chunk_index=0))
+    session.commit()
+    session.close()
+
+    def override_get_db():
+        db = TestSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    provider = SlowProvider(
+        LLMGenerationResult(
+            claims=[
+                LLMClaim(
+                    text="Test evidence text about diabetes treatment.",
+                    citations=[LLMCitation(reference_id=1, chunk_id=1)],
+                )
+            ]
+        ),
+        delay=0.5,
+    )
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_llm_provider] = lambda: provider
+
+    async def run():
+        threadpool_size = anyio.to_thread.current_default_thread_limiter().total_tokens
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[
+                client.post("/messages/generate", json={"prompt": "diabetes treatment", "reference_ids": [1]})
+                for _ in range(threadpool_size + 20)
+            ]), threadpool_size
+
+    try:
+        responses, threadpool_size = asyncio.run(run())
+    finally:
+        app.dependency_overrides.clear()
+        test_engine.dispose()
+
+    assert all(r.status_code == 200 for r in responses)
+    assert provider.peak > threadpool_size
+
+
+@pytest.fixture
+def file_db_session(tmp_path):
+    # A file database gives each session its own connection, as in production.
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+    init_db(test_engine)
+    TestSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    with TestSession() as session:
+        session.add(Reference(id=1, title="Test Reference", source="test"))
+        session.flush()
+        session.add(Chunk(id=1, reference_id=1, content="Test evidence text about diabetes treatment.", chunk_index=0))
+        session.commit()
+
+    def override_get_db():
+        db = TestSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestSession
+    app.dependency_overrides.clear()
+    test_engine.dispose()
+
+
+class PausingProvider(MockProvider):
+    # Holds refine calls until released, so other requests run in between.
+    def __init__(self, fixed_result: LLMGenerationResult) -> None:
+        super().__init__(fixed_result)
+        self.release = asyncio.Event()
+        self.waiting = 0
+
+    async def async_generate_claims(self, prompt, evidence_chunks, system_prompt):
+        if "REFINEMENT INSTRUCTION" in prompt:
+            self.waiting += 1
+            await self.release.wait()
+        return self.fixed_result
+
+
+def _refine_race(during_refine, refines: int = 1) -> list[httpx.Response]:
+    provider = PausingProvider(
+        LLMGenerationResult(claims=[
+            LLMClaim(
+                text="Test evidence text about diabetes treatment.",
+                citations=[LLMCitation(reference_id=1, chunk_id=1)],
+            )
+        ])
+    )
+    app.dependency_overrides[get_llm_provider] = lambda: provider
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            message_id = (await client.post(
+                "/messages/generate", json={"prompt": "diabetes treatment", "reference_ids": [1]}
+            )).json()["message_id"]
+            pending = [
+                asyncio.create_task(client.post(
+                    f"/messages/{message_id}/refine",
+                    json={"instruction": "Make it shorter", "reference_ids": [1]},
+                ))
+                for _ in range(refines)
+            ]
+            while provider.waiting < refines:
+                await asyncio.sleep(0.01)
+            await during_refine(client, message_id)
+            provider.release.set()
+            return await asyncio.gather(*pending)
+
+    return asyncio.run(run())
+
+
+def test_message_finalized_mid_refine_gets_no_new_version(file_db_session):
+    async def finalize(client, message_id):
+        resp = await client.patch(f"/messages/{message_id}", json={"status": "finalized"})
+        assert resp.status_code == 200
+
+    [resp] = _refine_race(finalize)
+    assert resp.status_code == 409
+    with file_db_session() as db:
+        assert db.query(MessageVersion).count() == 1
+
+
+def test_concurrent_refines_get_distinct_versions(file_db_session):
+    async def nothing(client, message_id):
+        pass
+
+    responses = _refine_race(nothing, refines=3)
+    assert all(r.status_code == 200 for r in responses)
+    assert sorted(r.json()["version_number"] for r in responses) == [2, 3, 4]
+
+
+def test_merge_edits_applies_ops_in_place():
+    previous = [
+        Claim(text=f"claim {i}", citations=[Citation(reference_id=1, chunk_id=i)], status=ClaimStatus.supported)
+        for i in (1, 2, 3)
+    ]
+    edits = [
+        LLMClaimEdit(op="replace", claim_id=2, text="claim two", citations=[LLMCitation(reference_id=1, chunk_id=2)]),
+        LLMClaimEdit(op="delete", claim_id=3, text="", citations=[]),
+        LLMClaimEdit(op="insert", claim_id=0, text="lead", citations=[]),
+        LLMClaimEdit(op="insert", claim_id=1, text="after one", citations=[]),
+        LLMClaimEdit(op="keep", claim_id=1, text="", citations=[]),
+        LLMClaimEdit(op="delete", claim_id=9, text="", citations=[]),
+    ]
+    merged, warnings = merge_edits(previous, edits)
+    assert [c.text for c in merged] == ["lead", "claim 1", "after one", "claim two"]
+    assert merged[1] is previous[0]
+    assert warnings == ["Ignored delete edit for unknown claim 9"]
+
+
+def test_refine_with_edits_keeps_unchanged_claims(mock_llm_client):
+    generated = mock_llm_client.post(
+        "/messages/generate", json={"prompt": "diabetes treatment", "reference_ids": [1]}
+    ).json()
+
+    class EditsProvider(MockProvider):
+        async def async_generate_edits(self, prompt, evidence_chunks, system_prompt):
+            self.prompt = prompt
+            return self.fixed_edits
+
+    provider = EditsProvider(
+        LLMGenerationResult(claims=[]),
+        LLMEditResult(edits=[
+            LLMClaimEdit(
+                op="insert", claim_id=1, text="Diabetes treatment evidence text.",
+                citations=[LLMCitation(reference_id=1, chunk_id=1)],
+            ),
+            LLMClaimEdit(op="insert", claim_id=1, text="Unsupported aside.", citations=[]),
+        ]),
+    )
+    app.dependency_overrides[get_llm_provider] = lambda: provider
+    resp = mock_llm_client.post(
+        f"/messages/{generated['message_id']}/refine",
+        json={"instruction": "add a closing line", "reference_ids": [1], "mode": "edits"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert "[1] Test evidence text about diabetes treatment. (cites chunk_id=1)" in provider.prompt
+    assert [c["text"] for c in data["claims"]] == [
+        "Test evidence text about diabetes treatment.",
+        "Diabetes treatment evidence text.",
+    ]
+    assert data["claims"][0]["citations"] == generated["claims"][0]["citations"]
+    assert data["warnings"] == ["Dropped claim: 'Unsupported aside.' - No citations provided"]
+
+
+def test_refine_with_edits_respects_narrowed_references(mock_llm_client):
+    db = next(app.dependency_overrides[get_db]())
+    db.add(Reference(id=2, title="Second Reference", source="test"))
+    db.add(Chunk(id=2, reference_id=2, content="Metformin lowers fasting glucose in adults.", chunk_index=0))
+    db.commit()
+    db.close()
+
+    metformin = LLMClaim(
+        text="Metformin lowers fasting glucose in adults.",
+        citations=[LLMCitation(reference_id=2, chunk_id=2)],
+    )
+    app.dependency_overrides[get_llm_provider] = lambda: MockProvider(
+        LLMGenerationResult(claims=[
+            LLMClaim(
+                text="Test evidence text about diabetes treatment.",
+                citations=[LLMCitation(reference_id=1, chunk_id=1)],
+            ),
+            metformin,
+        ])
+    )
+    generated = mock_llm_client.post(
+        "/messages/generate", json={"prompt": "overview", "reference_ids": [1, 2]}
+    ).json()
+    assert len(generated["claims"]) == 2
+
+    class EditsProvider(MockProvider):
+        async def async_generate_edits(self, prompt, evidence_chunks, system_prompt):
+            self.chunk_ids = [c["id"] for c in evidence_chunks]
+            return self.fixed_edits
+
+    # The inserted claim cites the deselected reference's chunk.
+    provider = EditsProvider(
+        LLMGenerationResult(claims=[]),
+        LLMEditResult(edits=[LLMClaimEdit(op="insert", claim_id=0, **metformin.model_dump())]),
+    )
+    app.dependency_overrides[get_llm_provider] = lambda: provider
+    resp = mock_llm_client.post(
+        f"/messages/{generated['message_id']}/refine",
+        json={"instruction": "focus on the first study", "reference_ids": [1], "mode": "edits"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert provider.chunk_ids == [1]
+    assert [c["citations"][0]["reference_id"] for c in data["claims"]] == [1]
+    assert [w.startswith("Dropped claim: 'Metformin") for w in data["warnings"]] == [True, True]
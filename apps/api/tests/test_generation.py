@@ -1,13 +1,22 @@
+import asyncio
+
+import httpx
+import openai
+
+from app.config import Settings
 from app.models.chunk import Chunk
 from app.models.message import Message
 from app.models.message_version import MessageVersion
 from app.models.reference import Reference
+from app.services.editing import get_message
 from app.services.generation import generate_message
 from app.services.llm_provider import (
     LLMCitation,
     LLMClaim,
     LLMGenerationResult,
     MockProvider,
+    OpenAIProvider,
+    build_llm_provider,
 )
 
 
@@ -25,10 +34,20 @@ def _seed_reference_with_chunks(db) -> tuple[int, int]:
     return ref.id, chunk.id
 
 
+class RecordingProvider(MockProvider):
+    def __init__(self, fixed_result: LLMGenerationResult) -> None:
+        super().__init__(fixed_result)
+        self.prompts: list[str] = []
+
+    async def async_generate_claims(self, prompt, evidence_chunks, system_prompt):
+        self.prompts.append(prompt)
+        return self.fixed_result
+
+
 class TestGenerateMessage:
     def test_generate_with_no_evidence_returns_warning(self, db):
         provider = MockProvider(LLMGenerationResult(claims=[]))
-        result = generate_message(db, "test prompt", [99999], provider)
+        result = asyncio.run(generate_message(db, "test prompt", [99999], provider))
         assert result.message_id is None
         assert result.claims == []
         assert any("Insufficient evidence" in w for w in result.warnings)
@@ -45,7 +64,7 @@ class TestGenerateMessage:
                 ]
             )
         )
-        result = generate_message(db, "diabetes", [ref_id], provider)
+        result = asyncio.run(generate_message(db, "diabetes", [ref_id], provider))
         assert result.message_id is not None
         assert result.message_text != ""
         assert len(result.claims) == 1
@@ -54,3 +73,53 @@ class TestGenerateMessage:
         version = db.query(MessageVersion).filter_by(message_id=msg.id).first()
         assert version is not None
 
+    def test_variants_share_one_retrieval_and_are_linked(self, db):
+        ref_id, chunk_id = _seed_reference_with_chunks(db)
+        provider = RecordingProvider(
+            LLMGenerationResult(claims=[
+                LLMClaim(
+                    text="diabetes treatment uses insulin therapy",
+                    citations=[LLMCitation(reference_id=ref_id, chunk_id=chunk_id)],
+                )
+            ])
+        )
+        result = asyncio.run(generate_message(db, "diabetes", [ref_id], provider, variants=3))
+
+        assert len(set(provider.prompts)) == 3
+        assert provider.prompts[0] == "diabetes"
+        assert [v.variant for v in result.variants] == [0, 1, 2]
+        assert result.message_id == result.variants[0].message_id
+        ids = [v.message_id for v in result.variants]
+        assert len(set(ids)) == 3
+        assert get_message(db, ids[1]).sibling_ids == [ids[0], ids[2]]
+        assert get_message(db, ids[0]).versions[0].prompt_or_instruction == "diabetes"
+
+    def test_single_generation_has_no_siblings(self, db):
+        ref_id, _ = _seed_reference_with_chunks(db)
+        result = asyncio.run(generate_message(db, "diabetes", [ref_id], MockProvider(LLMGenerationResult(claims=[]))))
+        assert result.variants == []
+        assert get_message(db, result.message_id).sibling_ids == []
+
+
+class TestBuildLLMProvider:
+    def test_without_api_key_uses_mock(self):
+        provider = build_llm_provider(Settings(openai_api_key=""))
+        assert isinstance(provider, MockProvider)
+
+    def test_openai_provider_uses_configured_pool(self, monkeypatch):
+        passed: list[httpx.Limits] = []
+        default_client = openai.DefaultAsyncHttpxClient
+
+        def recording_client(**kwargs):
+            passed.append(kwargs["limits"])
+            return default_client(**kwargs)
+
+        monkeypatch.setattr(openai, "DefaultAsyncHttpxClient", recording_client)
+        provider = build_llm_provider(
+            Settings(openai_api_key="sk-test", openai_base_url="http://127.0.0.1:8100/v1", openai_max_connections=7)
+        )
+        assert isinstance(provider, OpenAIProvider)
+        assert str(provider.async_client.base_url) == "http://127.0.0.1:8100/v1/"
+        assert passed == [provider.limits]
+        assert provider.limits.max_connections == 7
+        asyncio.run(provider.aclose())
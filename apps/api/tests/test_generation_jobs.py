@@ -0,0 +1,222 @@
+import asyncio
+import json
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.testclient import TestClient
+
+from app.database import get_db, init_db
+from app.main import app
+from app.models.chunk import Chunk
+from app.models.generation_job import GenerationJob, GenerationJobItem
+from app.models.generation_route import GenerationRoute
+from app.models.message import Message
+from app.models.reference import Reference
+from app.schemas.routing import RouteRule
+from app.services.generation_jobs import GenerationJobRunner, create_job, get_generation_jobs
+from app.services.llm_governor import LLMOverloaded
+from app.services.llm_provider import LLMCitation, LLMClaim, LLMGenerationResult, LLMUsage, MockProvider
+from app.services.llm_routing import ModelRouter
+
+CLAIM_TEXT = "Test evidence text about diabetes treatment."
+
+
+class CountingProvider(MockProvider):
+    def __init__(self, fail_on: str | None = None) -> None:
+        super().__init__(
+            LLMGenerationResult(
+                claims=[LLMClaim(text=CLAIM_TEXT, citations=[LLMCitation(reference_id=1, chunk_id=1)])]
+            )
+        )
+        self.prompts: list[str] = []
+        self.fail_on = fail_on
+
+    async def async_generate_claims(self, prompt, evidence_chunks, system_prompt):
+        self.prompts.append(prompt)
+        if prompt == self.fail_on:
+            raise ValueError("upstream failed")
+        return self.fixed_result
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    init_db(engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with factory() as db:
+        db.add(Reference(id=1, title="Test Reference", source="test"))
+        db.flush()
+        db.add(Chunk(id=1, reference_id=1, content=CLAIM_TEXT, chunk_index=0))
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def jobs_client(session_factory):
+    provider = CountingProvider(fail_on="fail me")
+    runner = GenerationJobRunner(session_factory, provider, concurrency=2, group_size=2)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_generation_jobs] = lambda: runner
+    with TestClient(app) as c:
+        yield c, provider
+    app.dependency_overrides.clear()
+
+
+def _wait_for_job(client: TestClient, job_id: int) -> dict:
+    for _ in range(200):
+        status = client.get(f"/generation-jobs/{job_id}").json()
+        if status["status"] in ("completed", "failed"):
+            return status
+        time.sleep(0.02)
+    raise AssertionError("job did not finish")
+
+
+def test_batch_job_generates_all_prompts(jobs_client):
+    client, provider = jobs_client
+    prompts = ["diabetes treatment", "diabetes outcomes", "fail me", "diabetes treatment", "insulin"]
+    resp = client.post("/generation-jobs", json={"prompts": prompts, "reference_ids": [1]})
+    assert resp.status_code == 202
+    job_id = resp.json()["id"]
+
+    status = _wait_for_job(client, job_id)
+    assert status["status"] == "completed"
+    assert status["total"] == 5
+    assert status["completed"] == 4
+    assert status["failed"] == 1
+
+    results = client.get(f"/generation-jobs/{job_id}/results").json()
+    assert [r["position"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[2]["status"] == "failed"
+    assert results[2]["error"] == "upstream failed"
+    done = [r for r in results if r["status"] == "done"]
+    assert all(r["message_id"] is not None and r["message_text"] == CLAIM_TEXT for r in done)
+    assert len({r["message_id"] for r in done}) == 4
+
+
+def test_results_stream_replays_and_finishes(jobs_client):
+    client, _ = jobs_client
+    job_id = client.post(
+        "/generation-jobs", json={"prompts": ["diabetes treatment", "insulin", "glucose"], "reference_ids": [1]}
+    ).json()["id"]
+
+    resp = client.get(f"/generation-jobs/{job_id}/results/stream")
+    events = [line for line in resp.text.splitlines() if line.startswith("event:")]
+    data = [json.loads(line[len("data:"):]) for line in resp.text.splitlines() if line.startswith("data:")]
+    assert events.count("event: result") == 3
+    assert events[-1] == "event: status"
+    assert data[-1]["status"] == "completed"
+    assert sorted(d["position"] for d in data[:-1]) == [0, 1, 2]
+
+
+def test_unknown_job_returns_404(jobs_client):
+    client, _ = jobs_client
+    assert client.get("/generation-jobs/999").status_code == 404
+
+
+def test_resume_skips_completed_items(session_factory):
+    with session_factory() as db:
+        job_id = create_job(db, ["first", "second", "third"], [1], 5).id
+        first = db.query(GenerationJobItem).filter_by(job_id=job_id, position=0).one()
+        first.status = "done"
+        job = db.get(GenerationJob, job_id)
+        job.status = "running"
+        job.completed = 1
+        db.commit()
+
+    provider = CountingProvider()
+    runner = GenerationJobRunner(session_factory, provider)
+
+    async def run():
+        assert await runner.resume() == [job_id]
+        while runner.is_running(job_id):
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert sorted(provider.prompts) == ["second", "third"]
+    with session_factory() as db:
+        job = db.get(GenerationJob, job_id)
+        assert job.status == "completed"
+        assert job.completed == 3
+        assert db.query(Message).count() == 2
+
+
+def test_overloaded_items_are_requeued_and_retried(session_factory):
+    class OverloadedOnceProvider(CountingProvider):
+        async def async_generate_claims(self, prompt, evidence_chunks, system_prompt):
+            if prompt == "busy" and "busy" not in self.prompts:
+                self.prompts.append(prompt)
+                raise LLMOverloaded(retry_after=0.05)
+            return await super().async_generate_claims(prompt, evidence_chunks, system_prompt)
+
+    with session_factory() as db:
+        job_id = create_job(db, ["diabetes treatment", "busy"], [1], 5).id
+
+    provider = OverloadedOnceProvider()
+    runner = GenerationJobRunner(session_factory, provider)
+
+    async def run():
+        runner.start(job_id)
+        while runner.is_running(job_id):
+            await asyncio.sleep(0.01)
+        with session_factory() as db:
+            job = db.get(GenerationJob, job_id)
+            busy = db.query(GenerationJobItem).filter_by(job_id=job_id, prompt="busy").one()
+            first_run = (job.status, job.completed, job.failed, busy.status)
+        # The retry is scheduled after the overload's retry_after.
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            with session_factory() as db:
+                if db.get(GenerationJob, job_id).status == "completed":
+                    break
+        return first_run
+
+    assert asyncio.run(run()) == ("queued", 1, 0, "pending")
+    assert provider.prompts.count("busy") == 2
+    with session_factory() as db:
+        job = db.get(GenerationJob, job_id)
+        assert (job.status, job.completed, job.failed) == ("completed", 2, 0)
+
+
+def test_job_items_are_routed(session_factory):
+    class ModelProvider(CountingProvider):
+        def __init__(self, model: str) -> None:
+            super().__init__()
+            self.model = model
+
+        async def async_generate_claims(self, prompt, evidence_chunks, system_prompt):
+            result = await super().async_generate_claims(prompt, evidence_chunks, system_prompt)
+            return result.model_copy().with_usage(LLMUsage(model=self.model))
+
+    small = ModelProvider("small")
+    default = ModelProvider("large")
+    rules = [RouteRule(name="short", model="small", max_prompt_chars=5)]
+    router = ModelRouter(rules, ModelProvider("large"), lambda model: small)
+    with session_factory() as db:
+        job_id = create_job(db, ["short", "a much longer prompt"], [1], 5).id
+
+    runner = GenerationJobRunner(session_factory, default, router=router)
+
+    async def run():
+        runner.start(job_id)
+        while runner.is_running(job_id):
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert (small.prompts, default.prompts) == (["short"], ["a much longer prompt"])
+    with session_factory() as db:
+        routes = db.query(GenerationRoute).order_by(GenerationRoute.rule).all()
+        assert [(r.task, r.rule, r.model) for r in routes] == [
+            ("generate", "default", "large"),
+            ("generate", "short", "small"),
+        ]
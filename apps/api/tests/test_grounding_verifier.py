@@ -1,4 +1,5 @@
 from app.schemas.claims import ClaimStatus
+from app.services.chunk_terms import term_ids, terms
 from app.services.grounding_verifier import verify_claims
 from app.services.llm_provider import LLMClaim, LLMCitation
 
@@ -43,3 +44,97 @@ class TestVerifyClaims:
         assert len(dropped) == 1
         assert dropped[0].status == ClaimStatus.dropped
 
+    def test_punctuation_does_not_block_overlap(self):
+        chunks = [_chunk(1, 1, "Once-weekly dosing reduced HbA1c (by 1.5%), versus placebo.")]
+        claims = [
+            LLMClaim(
+                text="Once-weekly dosing reduced HbA1c by 1.5% versus placebo",
+                citations=[LLMCitation(reference_id=1, chunk_id=1)],
+            )
+        ]
+        supported, _ = verify_claims(claims, chunks, overlap_threshold=1.0)
+        assert len(supported) == 1
+
+    def test_stored_term_ids_match_content_and_scalar_scores(self):
+        contents = [
+            "insulin therapy lowers fasting glucose in type 2 diabetes",
+            "adverse events were mild, transient and dose-dependent",
+            "weight loss was observed across all dosing arms",
+        ]
+        chunks = [_chunk(i, 1, text) for i, text in enumerate(contents, 1)]
+        stored = [{**c, "term_ids": term_ids(c["content"]), "content": ""} for c in chunks]
+        claims = [
+            LLMClaim(text=text, citations=[LLMCitation(reference_id=1, chunk_id=i) for i in (1, 2, 3)])
+            for text in [
+                "Insulin therapy lowers glucose.",
+                "Adverse events were mild.",
+                "Weight loss across dosing arms, with mild adverse events.",
+                "Unrelated geology results.",
+                "",
+            ]
+        ]
+
+        def scalar(claim: LLMClaim) -> list[int]:
+            # Per-citation reference scoring the batched masks must reproduce.
+            words = terms(claim.text)
+            return [
+                cit.chunk_id for cit in claim.citations
+                if words and len(words & terms(contents[cit.chunk_id - 1])) / len(words) >= 0.3
+            ]
+
+        for available in (chunks, stored):
+            supported, dropped = verify_claims(claims, available)
+            by_text = {c.text: [cit.chunk_id for cit in c.citations] for c in supported + dropped}
+            assert by_text == {c.text: scalar(c) for c in claims}
+
+
+class TestCitationRepair:
+    CHUNKS = [
+        _chunk(1, 1, "Semaglutide reduced HbA1c by 1.8 percentage points versus placebo over 40 weeks."),
+        _chunk(2, 2, "Tirzepatide reduced body weight by 11.2 kg versus insulin degludec over 52 weeks."),
+    ]
+
+    def test_miscited_claim_repaired_to_supporting_chunk(self):
+        claims = [
+            LLMClaim(
+                text="Tirzepatide reduced body weight by 11.2 kg compared with insulin degludec.",
+                citations=[LLMCitation(reference_id=1, chunk_id=1)],
+            )
+        ]
+        supported, dropped = verify_claims(claims, self.CHUNKS)
+        assert dropped == []
+        [citation] = supported[0].citations
+        assert (citation.reference_id, citation.chunk_id, citation.repaired) == (2, 2, True)
+
+    def test_valid_citation_not_marked_repaired(self):
+        claims = [
+            LLMClaim(
+                text="Semaglutide reduced HbA1c by 1.8 percentage points.",
+                citations=[LLMCitation(reference_id=1, chunk_id=1)],
+            )
+        ]
+        supported, _ = verify_claims(claims, self.CHUNKS)
+        assert supported[0].citations[0].repaired is False
+
+    def test_repair_disabled_drops_claim(self):
+        claims = [
+            LLMClaim(
+                text="Tirzepatide reduced body weight by 11.2 kg compared with insulin degludec.",
+                citations=[LLMCitation(reference_id=9, chunk_id=999)],
+            )
+        ]
+        supported, dropped = verify_claims(claims, self.CHUNKS, repair=False)
+        assert supported == []
+        assert len(dropped) == 1
+
+    def test_claim_with_unmatched_number_not_repaired(self):
+        # Same wording as chunk 2, but the effect size is not in any chunk.
+        claims = [
+            LLMClaim(
+                text="Tirzepatide reduced body weight by 7.4 kg versus insulin degludec over 52 weeks.",
+                citations=[LLMCitation(reference_id=9, chunk_id=999)],
+            )
+        ]
+        supported, dropped = verify_claims(claims, self.CHUNKS)
+        assert supported == []
+        assert len(dropped) == 1
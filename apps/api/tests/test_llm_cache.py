@@ -0,0 +1,237 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.llm_cache import CachingProvider, LLMResponseCache
+from app.services.llm_provider import LLMCitation, LLMClaim, LLMGenerationResult, LLMUsage, StreamResult
+
+CHUNKS = [{"id": 1, "reference_id": 1, "content": "insulin lowers glucose"}]
+RESULT = LLMGenerationResult(
+    claims=[LLMClaim(text="insulin lowers glucose", citations=[LLMCitation(reference_id=1, chunk_id=1)])]
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingProvider:
+    model = "test-model"
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.calls = 0
+        self.delay = delay
+        self.fail = False
+
+    async def aclose(self) -> None:
+        pass
+
+    def generate_claims(self, prompt, evidence_chunks, system_prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ValueError("upstream failed")
+        return RESULT
+
+    async def async_generate_claims(self, prompt, evidence_chunks, system_prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return RESULT
+
+    async def async_stream_claims(self, prompt, evidence_chunks, system_prompt, result):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        yield '{"claims":'
+        yield "[...]}"
+        result.parsed = RESULT
+
+
+async def _collect(provider, prompt="insulin") -> tuple[list[str], StreamResult]:
+    result = StreamResult()
+    deltas = [d async for d in provider.async_stream_claims(prompt, CHUNKS, "system", result)]
+    return deltas, result
+
+
+class TestLLMResponseCache:
+    def test_memory_and_disk_tiers(self, tmp_path):
+        path = tmp_path / "llm.db"
+        cache = LLMResponseCache(path)
+        cache.set("k", RESULT)
+        assert cache.get("k") == RESULT
+        cache.close()
+
+        reopened = LLMResponseCache(path)
+        assert reopened.get("k") == RESULT
+        assert reopened.stats["disk_hits"] == 1
+        assert reopened.get("k") == RESULT
+        assert reopened.stats["memory_hits"] == 1
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = LLMResponseCache(":memory:", ttl=60, clock=clock)
+        cache.set("k", RESULT)
+        clock.now += 59
+        assert cache.get("k") is not None
+        clock.now += 1
+        assert cache.get("k") is None
+        assert cache.purge_expired() == 1
+
+    def test_lru_evicts_oldest_from_memory(self):
+        cache = LLMResponseCache(":memory:", memory_entries=1)
+        cache.set("a", RESULT)
+        cache.set("b", RESULT)
+        assert cache.get("a") == RESULT
+        assert cache.stats["disk_hits"] == 1
+
+
+class TestCachingProvider:
+    def test_repeated_request_served_from_cache(self):
+        inner = CountingProvider()
+        provider = CachingProvider(inner, LLMResponseCache(":memory:"))
+        assert provider.generate_claims("insulin", CHUNKS, "system").claims == RESULT.claims
+        assert provider.generate_claims("insulin", CHUNKS, "system").claims == RESULT.claims
+        assert inner.calls == 1
+        provider.generate_claims("insulin", CHUNKS, "other system prompt")
+        assert inner.calls == 2
+
+    def test_concurrent_identical_requests_share_one_call(self):
+        inner = CountingProvider(delay=0.1)
+        provider = CachingProvider(inner, LLMResponseCache(":memory:"))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: provider.generate_claims("insulin", CHUNKS, "system"), range(8)))
+        assert [r.claims for r in results] == [RESULT.claims] * 8
+        assert inner.calls == 1
+        assert provider.cache.stats["joined"] >= 1
+
+    def test_concurrent_async_requests_share_one_call(self):
+        inner = CountingProvider(delay=0.05)
+        provider = CachingProvider(inner, LLMResponseCache(":memory:"))
+
+        async def run():
+            return await asyncio.gather(
+                *[provider.async_generate_claims("insulin", CHUNKS, "system") for _ in range(5)]
+            )
+
+        assert [r.claims for r in asyncio.run(run())] == [RESULT.claims] * 5
+        assert inner.calls == 1
+
+    def test_errors_propagate_and_are_not_cached(self):
+        inner = CountingProvider()
+        inner.fail = True
+        provider = CachingProvider(inner, LLMResponseCache(":memory:"))
+        with pytest.raises(ValueError):
+            provider.generate_claims("insulin", CHUNKS, "system")
+        inner.fail = False
+        assert provider.generate_claims("insulin", CHUNKS, "system").claims == RESULT.claims
+        assert inner.calls == 2
+
+    def test_stream_hit_replays_cached_result(self):
+        inner = CountingProvider()
+        provider = CachingProvider(inner, LLMResponseCache(":memory:"))
+
+        async def run():
+            first = await _collect(provider)
+            second = await _collect(provider)
+            return first, second
+
+        (first_deltas, first), (second_deltas, second) = asyncio.run(run())
+        assert inner.calls == 1
+        assert first_deltas == ['{"claims":', "[...]}"]
+        assert "".join(second_deltas) == RESULT.model_dump_json()
+        assert first.parsed.claims == second.parsed.claims == RESULT.claims
+
+    def test_concurrent_streams_join_leader(self):
+        inner = CountingProvider(delay=0.05)
+        provider = CachingProvider(inner, LLMResponseCache(":memory:"))
+
+        async def run():
+            return await asyncio.gather(*[_collect(provider) for _ in range(5)])
+
+        outcomes = asyncio.run(run())
+        assert inner.calls == 1
+        assert all(result.parsed.claims == RESULT.claims for _, result in outcomes)
+
+    def test_abandoned_leader_stream_lets_follower_retry(self):
+        inner = CountingProvider(delay=0.05)
+        provider = CachingProvider(inner, LLMResponseCache(":memory:"))
+
+        async def run():
+            leader = provider.async_stream_claims("insulin", CHUNKS, "system", StreamResult())
+            await leader.__anext__()
+            follower = asyncio.create_task(_collect(provider))
+            await asyncio.sleep(0)
+            await leader.aclose()
+            return await follower
+
+        _, result = asyncio.run(run())
+        assert result.parsed.claims == RESULT.claims
+        assert inner.calls == 2
+
+    def test_stream_answered_by_another_model_is_not_cached(self):
+        class HedgeWinsProvider(CountingProvider):
+            async def async_stream_claims(self, prompt, evidence_chunks, system_prompt, result):
+                async for delta in super().async_stream_claims(prompt, evidence_chunks, system_prompt, result):
+                    yield delta
+                result.usage = LLMUsage(model="hedge-model")
+
+        inner = HedgeWinsProvider(delay=0.05)
+        provider = CachingProvider(inner, LLMResponseCache(":memory:"))
+
+        async def run():
+            concurrent = await asyncio.gather(_collect(provider), _collect(provider))
+            return concurrent + [await _collect(provider)]
+
+        outcomes = asyncio.run(run())
+        # The joined caller retried, and the later one missed the cache.
+        assert inner.calls == 3
+        assert all(result.usage.model == "hedge-model" for _, result in outcomes)
+        assert provider.cache.stats["joined"] == 1
+
+    def test_sync_caller_joins_streaming_leader(self):
+        inner = CountingProvider(delay=0.1)
+        provider = CachingProvider(inner, LLMResponseCache(":memory:"))
+        results = []
+
+        async def run():
+            stream = asyncio.create_task(_collect(provider))
+            await asyncio.sleep(0.01)
+            thread = threading.Thread(
+                target=lambda: results.append(provider.generate_claims("insulin", CHUNKS, "system"))
+            )
+            thread.start()
+            await stream
+            await asyncio.to_thread(thread.join)
+
+        asyncio.run(run())
+        assert [r.claims for r in results] == [RESULT.claims]
+        assert inner.calls == 1
+
+    def test_async_cache_io_runs_off_the_event_loop(self):
+        threads: set[int] = set()
+
+        class RecordingCache(LLMResponseCache):
+            def get(self, key):
+                threads.add(threading.get_ident())
+                return super().get(key)
+
+            def set(self, key, result):
+                threads.add(threading.get_ident())
+                super().set(key, result)
+
+        provider = CachingProvider(CountingProvider(), RecordingCache(":memory:"))
+
+        async def run():
+            await provider.async_generate_claims("insulin", CHUNKS, "system")
+            await _collect(provider, prompt="glucose")
+            await _collect(provider, prompt="glucose")
+
+        asyncio.run(run())
+        assert threads
+        assert threading.get_ident() not in threads
@@ -0,0 +1,216 @@
+import asyncio
+import time
+from typing import Callable
+
+import httpx
+import openai
+import pytest
+from starlette.testclient import TestClient
+
+from app.database import get_db
+from app.main import app
+from app.models.chunk import Chunk
+from app.models.reference import Reference
+from app.routers.messages import get_llm_provider
+from app.services.llm_governor import GovernedProvider, LLMGovernor, LLMOverloaded
+from app.services.llm_provider import LLMGenerationResult, StreamResult
+
+RESULT = LLMGenerationResult(claims=[])
+
+
+def _rate_limit_error(retry_after: str = "0") -> openai.RateLimitError:
+    response = httpx.Response(
+        429, headers={"retry-after": retry_after}, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    )
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def _status_error(status: int) -> openai.APIStatusError:
+    response = httpx.Response(status, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    return openai.APIStatusError("upstream error", response=response, body=None)
+
+
+class ScriptedProvider:
+    model = "test-model"
+
+    def __init__(
+        self, failures: int = 0, delay: float = 0.0, error: Callable[[], Exception] = _rate_limit_error
+    ) -> None:
+        self.failures = failures
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def aclose(self) -> None:
+        pass
+
+    def generate_claims(self, prompt, evidence_chunks, system_prompt):
+        return RESULT
+
+    async def async_generate_claims(self, prompt, evidence_chunks, system_prompt):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.calls <= self.failures:
+                raise self.error()
+            return RESULT
+        finally:
+            self.active -= 1
+
+    async def async_stream_claims(self, prompt, evidence_chunks, system_prompt, result):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error()
+        yield '{"claims":[]}'
+        result.parsed = RESULT
+
+
+async def _no_sleep(_: float) -> None:
+    pass
+
+
+class TestLLMGovernor:
+    def test_concurrency_is_bounded(self):
+        inner = ScriptedProvider(delay=0.02)
+        provider = GovernedProvider(inner, LLMGovernor(max_concurrency=2))
+
+        async def run():
+            await asyncio.gather(*[provider.async_generate_claims("p", [], "s") for _ in range(8)])
+
+        asyncio.run(run())
+        assert inner.peak == 2
+        assert provider.governor.stats["admitted"] == 8
+        assert provider.governor.stats["max_queued"] >= 6
+
+    def test_full_queue_sheds_load(self):
+        governor = LLMGovernor(max_concurrency=1, max_queue=1)
+        provider = GovernedProvider(ScriptedProvider(delay=0.1), governor)
+
+        async def run():
+            return await asyncio.gather(
+                *[provider.async_generate_claims("p", [], "s") for _ in range(3)], return_exceptions=True
+            )
+
+        outcomes = asyncio.run(run())
+        rejected = [o for o in outcomes if isinstance(o, LLMOverloaded)]
+        assert len(rejected) == 1
+        assert rejected[0].retry_after >= 1
+        assert governor.stats["rejected"] == 1
+
+    def test_queue_timeout_raises_overloaded(self):
+        governor = LLMGovernor(max_concurrency=1, queue_timeout=0.05)
+        provider = GovernedProvider(ScriptedProvider(delay=0.2), governor)
+
+        async def run():
+            return await asyncio.gather(
+                *[provider.async_generate_claims("p", [], "s") for _ in range(2)], return_exceptions=True
+            )
+
+        outcomes = asyncio.run(run())
+        assert outcomes[0] == RESULT
+        assert isinstance(outcomes[1], LLMOverloaded)
+        assert governor.stats["timed_out"] == 1
+
+    def test_token_budget_delays_admission(self):
+        governor = LLMGovernor(tokens_per_minute=600)
+
+        async def run():
+            async with governor.admit(600):
+                pass
+            start = time.monotonic()
+            async with governor.admit(3):
+                pass
+            return time.monotonic() - start
+
+        assert asyncio.run(run()) >= 0.25
+
+    def test_rate_limit_is_retried(self):
+        inner = ScriptedProvider(failures=2)
+        provider = GovernedProvider(inner, LLMGovernor(), max_retries=3, sleep=_no_sleep)
+        assert asyncio.run(provider.async_generate_claims("p", [], "s")) == RESULT
+        assert inner.calls == 3
+        assert provider.governor.stats["retries"] == 2
+
+    def test_exhausted_retries_raise_overloaded(self):
+        inner = ScriptedProvider(failures=5)
+        provider = GovernedProvider(inner, LLMGovernor(), max_retries=1, sleep=_no_sleep)
+        with pytest.raises(LLMOverloaded):
+            asyncio.run(provider.async_generate_claims("p", [], "s"))
+        assert inner.calls == 2
+        assert provider.governor.stats["in_flight"] == 0
+
+    def test_stream_refused_before_output_is_retried(self):
+        inner = ScriptedProvider(failures=1)
+        provider = GovernedProvider(inner, LLMGovernor(), sleep=_no_sleep)
+
+        async def run():
+            result = StreamResult()
+            deltas = [d async for d in provider.async_stream_claims("p", [], "s", result)]
+            return deltas, result
+
+        deltas, result = asyncio.run(run())
+        assert deltas == ['{"claims":[]}']
+        assert result.parsed == RESULT
+        assert inner.calls == 2
+
+    @pytest.mark.parametrize("error", [
+        lambda: _status_error(502),
+        lambda: openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1")),
+        lambda: openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1")),
+    ])
+    def test_transient_upstream_errors_are_retried(self, error):
+        inner = ScriptedProvider(failures=2, error=error)
+        provider = GovernedProvider(inner, LLMGovernor(), max_retries=3, sleep=_no_sleep)
+        assert asyncio.run(provider.async_generate_claims("p", [], "s")) == RESULT
+        assert inner.calls == 3
+        assert provider.governor.stats["upstream_errors"] == 2
+        assert provider.governor.stats["retries"] == 2
+
+    def test_client_errors_and_exhausted_transient_retries_are_raised(self):
+        inner = ScriptedProvider(failures=1, error=lambda: _status_error(400))
+        provider = GovernedProvider(inner, LLMGovernor(), sleep=_no_sleep)
+        with pytest.raises(openai.APIStatusError):
+            asyncio.run(provider.async_generate_claims("p", [], "s"))
+        assert inner.calls == 1
+
+        inner = ScriptedProvider(failures=5, error=lambda: _status_error(500))
+        provider = GovernedProvider(inner, LLMGovernor(), max_retries=1, sleep=_no_sleep)
+        with pytest.raises(openai.APIStatusError) as exc:
+            asyncio.run(provider.async_generate_claims("p", [], "s"))
+        assert exc.value.status_code == 500
+        assert inner.calls == 2
+        assert provider.governor.stats["in_flight"] == 0
+
+    def test_stream_server_error_before_output_is_retried(self):
+        inner = ScriptedProvider(failures=1, error=lambda: _status_error(503))
+        provider = GovernedProvider(inner, LLMGovernor(), sleep=_no_sleep)
+
+        async def run():
+            result = StreamResult()
+            return [d async for d in provider.async_stream_claims("p", [], "s", result)], result
+
+        deltas, result = asyncio.run(run())
+        assert deltas == ['{"claims":[]}']
+        assert result.parsed == RESULT
+        assert inner.calls == 2
+
+
+def test_overloaded_generate_returns_503_with_retry_after(client: TestClient):
+    class OverloadedProvider(ScriptedProvider):
+        async def async_generate_claims(self, prompt, evidence_chunks, system_prompt):
+            raise LLMOverloaded(retry_after=7.2)
+
+    db = next(app.dependency_overrides[get_db]())
+    db.add(Reference(id=1, title="Test", source="test"))
+    db.add(Chunk(reference_id=1, content="insulin lowers glucose", chunk_index=0))
+    db.commit()
+    db.close()
+
+    app.dependency_overrides[get_llm_provider] = lambda: OverloadedProvider()
+    resp = client.post("/messages/generate", json={"prompt": "insulin", "reference_ids": [1]})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "8"
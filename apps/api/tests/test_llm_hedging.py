@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_governor import GovernedProvider, LLMGovernor
+from app.services.llm_hedging import HedgedProvider
+from app.services.llm_provider import LLMGenerationResult, LLMUsage, StreamResult
+
+
+class DelayedProvider:
+    # Streams fixed deltas after an injected time to first token.
+
+    def __init__(self, model: str, ttft: float, fail: Exception | None = None) -> None:
+        self.model = model
+        self.ttft = ttft
+        self.fail = fail
+        self.started = 0
+        self.closed = 0
+
+    async def async_stream_claims(self, prompt, evidence_chunks, system_prompt, result: StreamResult):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.ttft)
+            if self.fail is not None:
+                raise self.fail
+            for delta in ('{"claims":', "[]}"):
+                yield f"{self.model}:{delta}"
+            result.usage = LLMUsage(model=self.model)
+            result.parsed = LLMGenerationResult(claims=[])
+        finally:
+            self.closed += 1
+
+    async def aclose(self) -> None:
+        pass
+
+
+def _collect(provider: HedgedProvider, limit: int | None = None) -> tuple[list[str], StreamResult]:
+    async def run():
+        result = StreamResult()
+        deltas = []
+        stream = provider.async_stream_claims("p", [], "s", result)
+        async for delta in stream:
+            deltas.append(delta)
+            if limit is not None and len(deltas) >= limit:
+                await stream.aclose()
+                break
+        return deltas, result
+
+    return asyncio.run(run())
+
+
+def test_fast_primary_is_not_hedged():
+    primary, hedge = DelayedProvider("primary", 0), DelayedProvider("hedge", 0)
+    provider = HedgedProvider(primary, hedge, hedge_after=0.2)
+    deltas, result = _collect(provider)
+    assert deltas == ['primary:{"claims":', "primary:[]}"]
+    assert result.usage.model == "primary"
+    assert hedge.started == 0
+    assert provider.stats["hedged"] == 0
+
+
+def test_slow_first_token_is_hedged_and_loser_cancelled():
+    primary, hedge = DelayedProvider("primary", 1.0), DelayedProvider("hedge", 0.01)
+    provider = HedgedProvider(primary, hedge, hedge_after=0.05)
+    deltas, result = _collect(provider)
+    assert all(d.startswith("hedge:") for d in deltas)
+    assert result.parsed is not None and result.usage.model == "hedge"
+    assert primary.closed == 1
+    assert provider.stats == {
+        "streams": 1,
+        "hedged": 1,
+        "hedge_wins": 1,
+        "primary_wins": 0,
+        "both_failed": 0,
+        "skipped_fraction": 0,
+        "skipped_capacity": 0,
+    }
+
+
+def test_primary_can_still_win_after_hedging():
+    primary, hedge = DelayedProvider("primary", 0.08), DelayedProvider("hedge", 1.0)
+    provider = HedgedProvider(primary, hedge, hedge_after=0.05)
+    deltas, _ = _collect(provider)
+    assert all(d.startswith("primary:") for d in deltas)
+    assert hedge.closed == 1
+    assert provider.stats["primary_wins"] == 1
+
+
+def test_hedge_covers_a_failed_primary():
+    primary = DelayedProvider("primary", 0.08, fail=RuntimeError("upstream reset"))
+    hedge = DelayedProvider("hedge", 0.1)
+    deltas, _ = _collect(HedgedProvider(primary, hedge, hedge_after=0.05))
+    assert deltas[0].startswith("hedge:")
+
+
+def test_both_failing_raises():
+    primary = DelayedProvider("primary", 0.08, fail=RuntimeError("primary down"))
+    hedge = DelayedProvider("hedge", 0.1, fail=RuntimeError("hedge down"))
+    provider = HedgedProvider(primary, hedge, hedge_after=0.05)
+    with pytest.raises(RuntimeError, match="primary down"):
+        _collect(provider)
+    assert provider.stats["both_failed"] == 1
+
+
+def test_consumer_closing_early_closes_every_attempt():
+    primary, hedge = DelayedProvider("primary", 0.08), DelayedProvider("hedge", 1.0)
+    deltas, result = _collect(HedgedProvider(primary, hedge, hedge_after=0.05), limit=1)
+    assert len(deltas) == 1
+    assert result.parsed is None
+    assert (primary.closed, hedge.closed) == (1, 1)
+
+
+def _governed(governor: LLMGovernor, hedging: HedgedProvider) -> GovernedProvider:
+    return GovernedProvider(hedging, governor, max_retries=0)
+
+
+@pytest.mark.parametrize("governor_args", [{"max_concurrency": 1}, {"max_concurrency": 2, "tokens_per_minute": 1000}])
+def test_hedge_is_skipped_without_a_free_slot_or_budget(governor_args):
+    governor = LLMGovernor(**governor_args)
+    primary, hedge = DelayedProvider("primary", 0.1), DelayedProvider("hedge", 0)
+    hedging = HedgedProvider(primary, hedge, hedge_after=0.05, governor=governor)
+    deltas, _ = _collect(_governed(governor, hedging))
+    assert all(d.startswith("primary:") for d in deltas)
+    assert hedge.started == 0
+    assert hedging.stats["hedged"] == 0
+    assert hedging.stats["skipped_capacity"] == 1
+    assert governor.stats["admitted"] == 1
+
+
+def test_hedge_holds_its_own_slot_until_the_stream_ends():
+    governor = LLMGovernor(max_concurrency=2)
+    primary, hedge = DelayedProvider("primary", 1.0), DelayedProvider("hedge", 0.01)
+    hedging = HedgedProvider(primary, hedge, hedge_after=0.05, governor=governor)
+    in_flight = []
+
+    async def run():
+        async for _ in _governed(governor, hedging).async_stream_claims("p", [], "s", StreamResult()):
+            in_flight.append(governor.stats["in_flight"])
+
+    asyncio.run(run())
+    assert in_flight == [2, 2]
+    assert governor.stats["admitted"] == 2
+    assert governor.stats["in_flight"] == 0
+    assert not governor._semaphore.locked()
+
+
+def test_hedged_share_of_recent_streams_is_capped():
+    primary, hedge = DelayedProvider("primary", 0.08), DelayedProvider("hedge", 1.0)
+    provider = HedgedProvider(primary, hedge, hedge_after=0.05, max_fraction=0.5)
+    for _ in range(3):
+        _collect(provider)
+    assert hedge.started == 2
+    assert provider.stats["hedged"] == 2
+    assert provider.stats["skipped_fraction"] == 1
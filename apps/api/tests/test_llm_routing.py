@@ -0,0 +1,89 @@
+import asyncio
+
+from app.models.chunk import Chunk
+from app.models.generation_route import GenerationRoute
+from app.models.reference import Reference
+from app.schemas.routing import RouteRule
+from app.services.generation import generate_message
+from app.services.llm_provider import LLMCitation, LLMClaim, LLMGenerationResult, LLMUsage, MockProvider
+from app.services.llm_routing import ModelRouter
+from app.services.usage import usage_summary
+
+CHUNKS = [{"id": 1, "reference_id": 1, "content": "x" * 100}]
+CLAIMS = [LLMClaim(text="insulin therapy lowers glucose", citations=[LLMCitation(reference_id=1, chunk_id=1)])]
+
+
+class UsageProvider(MockProvider):
+    # Reports usage under its model name, as OpenAIProvider does.
+
+    def __init__(self, model: str, claims: list[LLMClaim] | None = None) -> None:
+        super().__init__(LLMGenerationResult(claims=claims or []))
+        self.model = model
+        self.calls = 0
+
+    async def async_generate_claims(self, prompt, evidence_chunks, system_prompt):
+        self.calls += 1
+        result = self.fixed_result.model_copy()
+        return result.with_usage(LLMUsage(model=self.model, prompt_tokens=len(prompt), completion_tokens=5))
+
+
+def _router(rules: list[RouteRule]) -> tuple[ModelRouter, dict[str, UsageProvider]]:
+    built: dict[str, UsageProvider] = {}
+
+    def build(model: str) -> UsageProvider:
+        built[model] = UsageProvider(model, CLAIMS)
+        return built[model]
+
+    return ModelRouter(rules, UsageProvider("large", CLAIMS), build), built
+
+
+def test_first_matching_rule_wins():
+    router, _ = _router([
+        RouteRule(name="short-refine", model="small", tasks=["refine", "refine_edits"], max_prompt_chars=50),
+        RouteRule(model="medium", max_evidence_chars=500),
+    ])
+    assert router.route("refine", "make it shorter", CHUNKS)[1].rule == "short-refine"
+    assert router.route("generate", "make it shorter", CHUNKS)[1].model == "medium"
+    decision = router.route("generate", "p", CHUNKS * 10)[1]
+    assert (decision.rule, decision.model, decision.evidence_chars) == ("default", "large", 1000)
+    assert dict(router.stats) == {"short-refine": 1, "rule1": 1, "default": 1}
+
+
+def test_hints_only_match_rules_that_name_them():
+    router, built = _router([
+        RouteRule(model="small", hints=["fast"]),
+        RouteRule(model="medium", tasks=["variants"]),
+    ])
+    assert router.route("generate", "p", CHUNKS)[1].model == "large"
+    assert router.route("generate", "p", CHUNKS, hint="fast")[1].model == "small"
+    assert router.route("variants", "p", CHUNKS, hint="quality")[1].model == "large"
+    assert router.route("variants", "p", CHUNKS)[1].model == "medium"
+
+    provider, _ = router.route("generate", "p", CHUNKS, hint="fast")
+    assert provider is built["small"]
+    assert sorted(built) == ["medium", "small"]
+
+
+def test_routed_generation_records_decision_with_usage(db):
+    db.add(Reference(id=1, title="T", source="test"))
+    db.flush()
+    db.add(Chunk(id=1, reference_id=1, chunk_index=0, content="insulin therapy lowers glucose"))
+    db.commit()
+    router, built = _router([RouteRule(name="fast", model="small", hints=["fast"])])
+
+    # The default route uses the provider the endpoint was given.
+    injected = UsageProvider("large", CLAIMS)
+    asyncio.run(generate_message(db, "insulin glucose", [1], injected, router=router, hint="fast"))
+    asyncio.run(generate_message(db, "insulin glucose", [1], injected, router=router, variants=2))
+
+    assert built["small"].calls == 1 and injected.calls == 2 and router.default.calls == 0
+    routes = db.query(GenerationRoute).order_by(GenerationRoute.id).all()
+    assert [(r.task, r.rule, r.model, r.hint) for r in routes] == [
+        ("generate", "fast", "small", "fast"),
+        ("variants", "default", "large", None),
+        ("variants", "default", "large", None),
+    ]
+    buckets = {b.key: b for b in usage_summary(db, "route", 1)}
+    assert buckets["generate/fast/small"].generations == 1
+    assert buckets["variants/default/large"].generations == 2
+    assert buckets["variants/default/large"].supported_claims == 2
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import httpx
+
+from app.services.ncbi_transport import NCBITransport, TokenBucket
+
+URL = "https://eutils.test/entrez/eutils/esearch.fcgi"
+
+
+class _Sleeps:
+    def __init__(self) -> None:
+        self.delays: list[float] = []
+
+    async def __call__(self, delay: float) -> None:
+        self.delays.append(delay)
+
+
+def test_retries_429_and_5xx_with_backoff():
+    statuses = iter([429, 503, 200])
+    seen: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(next(statuses), json={})
+
+    sleeps = _Sleeps()
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            transport = NCBITransport(http, requests_per_second=1000, sleep=sleeps)
+            return await transport.get(URL, params={"term": "x"}), transport
+
+    resp, transport = asyncio.run(run())
+    assert resp.status_code == 200
+    assert len(seen) == 3
+    assert len(sleeps.delays) == 2
+    assert all(0 <= d <= 1.0 for d in sleeps.delays)
+    assert transport.stats["retries"] == 2
+
+
+def test_gives_up_after_max_retries_and_honours_retry_after():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(429, headers={"Retry-After": "2"})
+
+    sleeps = _Sleeps()
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            transport = NCBITransport(http, requests_per_second=1000, max_retries=2, sleep=sleeps)
+            return await transport.get(URL)
+
+    resp = asyncio.run(run())
+    assert resp.status_code == 429
+    assert sleeps.delays == [2.0, 2.0]
+
+
+def test_coalesces_identical_inflight_requests_and_adds_api_key():
+    seen: list[httpx.Request] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"ok": True})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            transport = NCBITransport(http, api_key="secret", requests_per_second=1000)
+            same = [transport.get(URL, params={"term": "statins"}) for _ in range(5)]
+            other = transport.get(URL, params={"term": "insulin"})
+            return await asyncio.gather(*same, other), transport
+
+    responses, transport = asyncio.run(run())
+    assert all(r.json() == {"ok": True} for r in responses)
+    assert len(seen) == 2
+    assert all(r.url.params["api_key"] == "secret" for r in seen)
+    assert transport.stats["coalesced"] == 4
+
+
+def test_token_bucket_spaces_requests_at_configured_rate():
+    async def run():
+        bucket = TokenBucket(rate=50)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 5 / 50 * 0.9
@@ -0,0 +1,68 @@
+import asyncio
+import importlib.util
+from pathlib import Path
+
+import httpx
+import openai
+import pytest
+
+from app.services.llm_provider import OpenAIProvider, StreamResult
+
+STANDIN_PATH = Path(__file__).resolve().parents[3] / "scripts" / "openai_standin.py"
+CHUNKS = [
+    {"id": 7, "reference_id": 3, "content": "Once-weekly dosing reduced HbA1c. Secondary sentence."},
+    {"id": 8, "reference_id": 3, "content": "Adverse events were mild."},
+]
+
+
+@pytest.fixture(scope="module")
+def standin():
+    spec = importlib.util.spec_from_file_location("openai_standin", STANDIN_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _provider(app) -> OpenAIProvider:
+    # The real client and parsing path, served in-process by the stand-in.
+    provider = OpenAIProvider(api_key="standin", model="standin-model")
+    provider.async_client = openai.AsyncOpenAI(
+        api_key="standin",
+        base_url="http://standin/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+    )
+    return provider
+
+
+def test_structured_completion_cites_supplied_chunks(standin):
+    result = asyncio.run(_provider(standin.create_app()).async_generate_claims("dosing", CHUNKS, "system"))
+    assert [c.text for c in result.claims] == ["Once-weekly dosing reduced HbA1c.", "Adverse events were mild."]
+    assert [(c.citations[0].reference_id, c.citations[0].chunk_id) for c in result.claims] == [(3, 7), (3, 8)]
+    assert result.usage.prompt_tokens > 0
+
+
+def test_stream_honours_ttft_and_reports_usage(standin):
+    app = standin.create_app(profile=standin.Profile(ttft_ms=50, tokens_per_second=2000))
+
+    async def run():
+        result = StreamResult()
+        deltas = [d async for d in _provider(app).async_stream_claims("dosing", CHUNKS, "system", result)]
+        return deltas, result
+
+    deltas, result = asyncio.run(run())
+    assert len(deltas) > 1
+    assert len(result.parsed.claims) == 2
+    assert result.usage.ttft_ms >= 50
+    assert result.usage.completion_tokens > 0
+
+
+def test_failure_profile_returns_openai_errors(standin):
+    provider = _provider(standin.create_app(profile=standin.Profile(rate_limit_rate=1.0, retry_after_s=2)))
+    with pytest.raises(openai.RateLimitError) as exc_info:
+        asyncio.run(provider.async_generate_claims("dosing", CHUNKS, "system"))
+    assert exc_info.value.response.headers["retry-after"] == "2"
+
+    provider = _provider(standin.create_app(profile=standin.Profile(error_rate=1.0)))
+    with pytest.raises(openai.InternalServerError):
+        asyncio.run(provider.async_generate_claims("dosing", CHUNKS, "system"))
@@ -1,7 +1,19 @@
+import io
+import os
+import tempfile
+import tracemalloc
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+
 import pymupdf
 import pytest
 
-from app.services.pdf_extraction import extract_text_from_pdf
+from app.models.chunk import Chunk
+from app.models.reference import Reference
+from app.routers import references
+from app.services.chunking import chunk_text
+from app.services.pdf_extraction import extract_text_from_pdf, iter_pdf_pages
+from app.services.pdf_ingest import SPOOL_BLOCK_SIZE, InvalidPdf, PdfTooLarge, ingest_pdf, spool_pdf_upload
 
 
 def _make_pdf(text: str | None = None) -> bytes:
@@ -24,6 +36,118 @@ class TestExtractTextFromPdf:
             extract_text_from_pdf(pdf_bytes)
 
 
+def _make_large_pdf(path, pages: int, blob_bytes: int) -> None:
+    with pymupdf.open() as doc:
+        for i in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Page {i} reports reduced HbA1c in the treatment arm.")
+        # Incompressible payload so the file is genuinely large on disk.
+        doc.embfile_add("payload.bin", os.urandom(blob_bytes))
+        doc.save(path)
+
+
+class _RefusingExecutor:
+    def submit(self, *args, **kwargs):
+        raise AssertionError("small documents must be extracted serially")
+
+
+class _CountingExecutor:
+    # Runs each shard inline on submit and counts submissions.
+
+    _max_workers = 2
+
+    def __init__(self) -> None:
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+class TestIterPdfPages:
+    def test_parallel_extraction_preserves_page_order(self, tmp_path):
+        path = tmp_path / "many.pdf"
+        _make_large_pdf(path, pages=40, blob_bytes=10)
+        serial = list(iter_pdf_pages(path))
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            parallel = list(iter_pdf_pages(path, executor, min_parallel_pages=8, pages_per_shard=3))
+
+        assert parallel == serial
+        assert "Page 39 " in parallel[-1]
+
+    def test_small_documents_stay_serial(self, tmp_path):
+        path = tmp_path / "few.pdf"
+        _make_large_pdf(path, pages=3, blob_bytes=10)
+        assert len(list(iter_pdf_pages(path, _RefusingExecutor()))) == 3
+
+    def test_only_a_window_of_shards_is_in_flight(self, tmp_path):
+        path = tmp_path / "many.pdf"
+        _make_large_pdf(path, pages=40, blob_bytes=10)
+        executor = _CountingExecutor()
+        pages = iter_pdf_pages(path, executor, min_parallel_pages=8, pages_per_shard=2)
+
+        assert "Page 0 " in next(pages)
+        # Two shards per worker, plus the one submitted as the first came back.
+        assert executor.submitted == 5
+        assert len(list(pages)) == 39
+        assert executor.submitted == 20
+
+
+class TestSpoolPdfUpload:
+    def test_rejects_missing_pdf_header(self):
+        with pytest.raises(InvalidPdf):
+            spool_pdf_upload(io.BytesIO(b"hello world"), io.BytesIO())
+
+    def test_rejects_oversized_upload_while_streaming(self):
+        dest = io.BytesIO()
+        src = io.BytesIO(b"%PDF-" + b"x" * (3 * SPOOL_BLOCK_SIZE))
+        with pytest.raises(PdfTooLarge):
+            spool_pdf_upload(src, dest, max_bytes=SPOOL_BLOCK_SIZE)
+        assert dest.tell() <= SPOOL_BLOCK_SIZE
+
+
+class TestIngestPdf:
+    def test_peak_memory_is_bounded_by_block_size_not_file_size(self, db, tmp_path):
+        src_path = tmp_path / "large.pdf"
+        _make_large_pdf(src_path, pages=200, blob_bytes=20_000_000)
+        assert src_path.stat().st_size > 20_000_000
+
+        ref = Reference(title="Large", source="pdf_upload")
+        db.add(ref)
+        db.flush()
+
+        tracemalloc.start()
+        try:
+            with open(src_path, "rb") as src, tempfile.NamedTemporaryFile(suffix=".pdf") as spooled:
+                spool_pdf_upload(src, spooled)
+                char_count, chunk_count = ingest_pdf(db, ref.id, spooled.name)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert chunk_count > 0
+        assert char_count > 0
+        assert peak < 4 * SPOOL_BLOCK_SIZE
+
+    def test_matches_in_memory_extraction(self, db, tmp_path):
+        path = tmp_path / "doc.pdf"
+        _make_large_pdf(path, pages=5, blob_bytes=10)
+        ref = Reference(title="Doc", source="pdf_upload")
+        db.add(ref)
+        db.flush()
+
+        char_count, chunk_count = ingest_pdf(db, ref.id, path)
+
+        text = extract_text_from_pdf(path.read_bytes())
+        assert char_count == len(text)
+        stored = [c.content for c in db.query(Chunk).filter_by(reference_id=ref.id).order_by(Chunk.chunk_index)]
+        assert stored == chunk_text(text)
+        assert chunk_count == len(stored)
+
+
 class TestUploadEndpoint:
     def test_upload_valid_pdf(self, client):
         pdf_bytes = _make_pdf("Sample research content for chunking.")
@@ -38,3 +162,77 @@ class TestUploadEndpoint:
         assert data["chunk_count"] > 0
         assert "reference_id" in data
 
+    def test_upload_rejects_non_pdf_bytes(self, client):
+        resp = client.post(
+            "/references/upload",
+            files={"file": ("paper.pdf", b"not a pdf", "application/pdf")},
+        )
+        assert resp.status_code == 400
+
+    def test_upload_without_text_marks_reference_failed(self, client):
+        resp = client.post(
+            "/references/upload",
+            files={"file": ("empty.pdf", _make_pdf(), "application/pdf")},
+        )
+        assert resp.status_code == 201
+        data = resp.json()
+        assert data["status"] == "failed"
+        assert data["chunk_count"] == 0
+
+
+class TestBatchUploadEndpoint:
+    def test_batch_of_files_returns_per_file_results(self, client):
+        resp = client.post(
+            "/references/upload/batch",
+            files=[
+                ("files", ("a.pdf", _make_pdf("First paper about statins."), "application/pdf")),
+                ("files", ("empty.pdf", _make_pdf(), "application/pdf")),
+                ("files", ("b.pdf", _make_pdf("Second paper about insulin."), "application/pdf")),
+            ],
+        )
+        assert resp.status_code == 201
+        data = resp.json()
+        assert [r["filename"] for r in data["results"]] == ["a.pdf", "empty.pdf", "b.pdf"]
+        assert [r["status"] for r in data["results"]] == ["processed", "failed", "processed"]
+        assert "No extractable text" in data["results"][1]["error"]
+        assert data["processed"] == 2
+        assert data["failed"] == 1
+
+        refs = client.get("/references/").json()["references"]
+        assert {r["title"] for r in refs} == {"a.pdf", "b.pdf"}
+
+    def test_zip_archive_is_expanded(self, client):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("dossier/one.pdf", _make_pdf("Archive member one."))
+            zf.writestr("dossier/two.pdf", _make_pdf("Archive member two."))
+            zf.writestr("dossier/broken.pdf", b"not a pdf")
+            zf.writestr("dossier/readme.txt", b"ignored")
+        resp = client.post(
+            "/references/upload/batch",
+            files=[("files", ("dossier.zip", archive.getvalue(), "application/zip"))],
+        )
+        assert resp.status_code == 201
+        results = {r["filename"]: r for r in resp.json()["results"]}
+        assert set(results) == {"one.pdf", "two.pdf", "broken.pdf"}
+        assert results["one.pdf"]["chunk_count"] > 0
+        assert results["broken.pdf"]["status"] == "failed"
+        assert results["broken.pdf"]["reference_id"] is None
+
+    def test_oversized_archive_is_rejected_before_spooling_it(self, client, monkeypatch):
+        spooled = []
+        spool = references._spool_batch_member
+        monkeypatch.setattr(references, "MAX_BATCH_FILES", 2)
+        monkeypatch.setattr(
+            references, "_spool_batch_member", lambda *args: spooled.append(args[0]) or spool(*args)
+        )
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            for i in range(10):
+                zf.writestr(f"{i}.pdf", _make_pdf(f"Member {i}."))
+        resp = client.post(
+            "/references/upload/batch",
+            files=[("files", ("many.zip", archive.getvalue(), "application/zip"))],
+        )
+        assert resp.status_code == 413
+        assert spooled == ["0.pdf", "1.pdf"]
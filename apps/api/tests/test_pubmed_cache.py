@@ -0,0 +1,142 @@
+import asyncio
+import threading
+
+import httpx
+
+from app.services.pubmed_cache import ARTICLE, SEARCH, PubMedCache
+from app.services.pubmed_client import PubMedClient
+
+EFETCH_XML = """<PubmedArticleSet>
+  <PubmedArticle>
+    <MedlineCitation>
+      <PMID>111</PMID>
+      <Article><ArticleTitle>First</ArticleTitle></Article>
+    </MedlineCitation>
+  </PubmedArticle>
+  <PubmedArticle>
+    <MedlineCitation>
+      <PMID>222</PMID>
+      <Article><ArticleTitle>Second</ArticleTitle></Article>
+    </MedlineCitation>
+  </PubmedArticle>
+</PubmedArticleSet>"""
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _mock_ncbi(calls: list[str]) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path.rsplit("/", 1)[-1])
+        if request.url.path.endswith("esearch.fcgi"):
+            return httpx.Response(200, json={"esearchresult": {"idlist": ["111", "222"]}})
+        return httpx.Response(200, text=EFETCH_XML)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestPubMedCache:
+    def test_entries_expire_after_ttl(self, tmp_path):
+        clock = FakeClock()
+        cache = PubMedCache(tmp_path / "cache.db", search_ttl=10, clock=clock)
+        cache.set(SEARCH, "q", ["1"])
+        assert cache.get(SEARCH, "q").value == ["1"]
+        clock.now += 11
+        assert cache.get(SEARCH, "q") is None
+
+    def test_stale_window_serves_stale_entries(self, tmp_path):
+        clock = FakeClock()
+        cache = PubMedCache(tmp_path / "cache.db", search_ttl=10, stale_while_revalidate=60, clock=clock)
+        cache.set(SEARCH, "q", ["1"])
+        clock.now += 30
+        lookup = cache.get(SEARCH, "q")
+        assert lookup.value == ["1"]
+        assert lookup.stale
+        assert cache.stats()[SEARCH]["stale_hits"] == 1
+
+    def test_disk_tier_survives_restart_and_lru_evicts(self, tmp_path):
+        path = tmp_path / "cache.db"
+        cache = PubMedCache(path, memory_entries=1)
+        cache.set(ARTICLE, "1", {"pmid": "1"})
+        cache.set(ARTICLE, "2", {"pmid": "2"})
+        assert cache.stats()["memory_entries"] == 1
+        cache.close()
+
+        reopened = PubMedCache(path)
+        assert reopened.get(ARTICLE, "1").value == {"pmid": "1"}
+        stats = reopened.stats()[ARTICLE]
+        assert stats["disk_hits"] == 1
+        assert stats["hit_rate"] == 1.0
+
+
+class ThreadRecordingCache(PubMedCache):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.threads: set[int] = set()
+
+    def get_many(self, *args):
+        self.threads.add(threading.get_ident())
+        return super().get_many(*args)
+
+    def set_many(self, *args):
+        self.threads.add(threading.get_ident())
+        return super().set_many(*args)
+
+
+class TestCachedPubMedClient:
+    def test_repeated_search_skips_ncbi(self, tmp_path):
+        calls: list[str] = []
+        cache = PubMedCache(tmp_path / "cache.db")
+
+        async def run():
+            async with _mock_ncbi(calls) as http:
+                client = PubMedClient(http, cache)
+                first = await client.search("statins")
+                second = await client.search("  Statins ")
+                article = await client.fetch_by_pmid("222")
+            return first, second, article
+
+        first, second, article = asyncio.run(run())
+        assert calls == ["esearch.fcgi", "efetch.fcgi"]
+        assert [a["pmid"] for a in first] == ["111", "222"]
+        assert second == first
+        assert article["title"] == "Second"
+        assert cache.stats()[SEARCH]["hits"] == 1
+
+    def test_stale_search_is_served_and_refreshed_in_background(self, tmp_path):
+        calls: list[str] = []
+        clock = FakeClock()
+        cache = PubMedCache(tmp_path / "cache.db", search_ttl=10, stale_while_revalidate=600, clock=clock)
+
+        async def run():
+            async with _mock_ncbi(calls) as http:
+                client = PubMedClient(http, cache)
+                await client.search("statins")
+                clock.now += 60
+                results = await client.search("statins")
+                await asyncio.sleep(0.01)
+            return results
+
+        results = asyncio.run(run())
+        assert len(results) == 2
+        assert calls == ["esearch.fcgi", "efetch.fcgi", "esearch.fcgi"]
+        assert not cache.get(SEARCH, "20:statins").stale
+
+    def test_cache_io_runs_off_the_event_loop(self, tmp_path):
+        calls: list[str] = []
+        cache = ThreadRecordingCache(tmp_path / "cache.db")
+
+        async def run():
+            async with _mock_ncbi(calls) as http:
+                client = PubMedClient(http, cache)
+                await client.search("statins")
+                await client.fetch_by_pmid("111")
+
+        asyncio.run(run())
+        assert cache.threads
+        assert threading.get_ident() not in cache.threads
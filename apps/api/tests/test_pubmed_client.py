@@ -1,4 +1,11 @@
-from app.services.pubmed_client import _parse_articles
+import asyncio
+import io
+
+import httpx
+
+from app.main import app
+from app.services.pubmed_cache import SEARCH, PubMedCache, history_key
+from app.services.pubmed_client import PubMedClient, _parse_articles, get_pubmed_client, iter_parse_articles
 
 SAMPLE_XML = """<PubmedArticleSet>
   <PubmedArticle>
@@ -75,9 +82,181 @@ def test_parse_missing_fields():
     assert art["pub_date"] == ""
 
 
+def test_iter_parse_labels_sections_and_keeps_inline_markup():
+    xml = STRUCTURED_ABSTRACT_XML.replace(
+        "Results text.", "HbA1c fell by 1.2<sup>%</sup> (<i>p</i> &lt; 0.01)."
+    )
+    (art,) = iter_parse_articles(xml, label_sections=True)
+    assert art["abstract"] == (
+        "BACKGROUND: Background text. METHODS: Methods text. "
+        "RESULTS: HbA1c fell by 1.2% (p < 0.01)."
+    )
+
+
+def test_iter_parse_streams_from_file_object():
+    body = "".join(
+        f"<PubmedArticle><MedlineCitation><PMID>{i}</PMID><Article><ArticleTitle>T{i}</ArticleTitle>"
+        f"</Article></MedlineCitation></PubmedArticle>"
+        for i in range(50)
+    )
+    stream = io.BytesIO(f"<PubmedArticleSet>{body}</PubmedArticleSet>".encode())
+    articles = iter_parse_articles(stream)
+    first = next(articles)
+    assert first["pmid"] == "0"
+    assert [a["title"] for a in articles][-1] == "T49"
+
+
 def test_parse_empty_xml():
     assert _parse_articles("<PubmedArticleSet></PubmedArticleSet>") == []
 
 
 def test_parse_invalid_xml():
     assert _parse_articles("not xml at all") == []
+
+
+def _article_xml(pmid: str) -> str:
+    return f"""<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article>
+        <ArticleTitle>Article {pmid}</ArticleTitle>
+        <Abstract><AbstractText>Abstract for {pmid}. It has two sentences.</AbstractText></Abstract>
+    </Article></MedlineCitation></PubmedArticle>"""
+
+
+class TestBulkImport:
+    def test_bulk_import_batches_efetch_and_reports_per_pmid(self, client):
+        efetch_batches: list[list[str]] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            ids = request.url.params["id"].split(",")
+            efetch_batches.append(ids)
+            found = [i for i in ids if i != "404"]
+            return httpx.Response(200, text="<PubmedArticleSet>" + "".join(map(_article_xml, found)) + "</PubmedArticleSet>")
+
+        http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        app.dependency_overrides[get_pubmed_client] = lambda: PubMedClient(http)
+
+        first = client.post("/references/from-pubmed/bulk", json={"pmids": ["1", "2"]})
+        assert first.status_code == 201
+        assert first.json()["imported"] == 2
+
+        pmids = ["1", "2", "404"] + [str(n) for n in range(1000, 1250)] + ["1"]
+        resp = client.post("/references/from-pubmed/bulk", json={"pmids": pmids})
+        assert resp.status_code == 201
+        data = resp.json()
+
+        results = {r["pmid"]: r for r in data["results"]}
+        assert len(data["results"]) == 253
+        assert results["1"]["status"] == "existing"
+        assert results["404"]["status"] == "not_found"
+        assert results["1000"]["status"] == "imported"
+        assert results["1000"]["chunk_count"] == 1
+        assert data["imported"] == 250
+        assert data["existing"] == 2
+        assert data["not_found"] == 1
+        assert data["failed"] == 0
+        # Existing PMIDs are never refetched; the rest go out in batches of <= 200.
+        assert [len(b) for b in efetch_batches[1:]] == [200, 51]
+
+        refs = client.get("/references/").json()["references"]
+        assert len(refs) == 252
+
+
+class TestPagedSearch:
+    @staticmethod
+    def _history_handler(calls: list[dict], total: int = 45):
+        def handler(request: httpx.Request) -> httpx.Response:
+            params = dict(request.url.params)
+            calls.append(params)
+            if request.url.path.endswith("esearch.fcgi"):
+                ids = [str(n) for n in range(min(int(params["retmax"]), total))]
+                return httpx.Response(200, json={"esearchresult": {
+                    "count": str(total), "webenv": "MCID_1", "querykey": "1", "idlist": ids,
+                }})
+            if "WebEnv" in params:
+                start = int(params["retstart"])
+                ids = [str(n) for n in range(start, min(start + int(params["retmax"]), total))]
+            else:
+                ids = params["id"].split(",")
+            return httpx.Response(200, text="<PubmedArticleSet>" + "".join(map(_article_xml, ids)) + "</PubmedArticleSet>")
+
+        return handler
+
+    def test_pages_come_from_one_esearch_and_are_prefetched(self):
+        calls: list[dict] = []
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(self._history_handler(calls))) as http:
+                client = PubMedClient(http)
+                page1 = await client.search_page("statins", 1, 20)
+                await asyncio.sleep(0.01)
+                calls_after_page1 = len(calls)
+                page2 = await client.search_page("statins", 2, 20)
+                await asyncio.sleep(0.01)
+                page3 = await client.search_page("statins", 3, 20)
+                beyond = await client.search_page("statins", 4, 20)
+            return page1, page2, page3, beyond, calls_after_page1
+
+        page1, page2, page3, beyond, calls_after_page1 = asyncio.run(run())
+        assert [a["pmid"] for a in page1[0]] == [str(n) for n in range(20)]
+        assert page1[1] == 45
+        assert [a["pmid"] for a in page2[0]][0] == "20"
+        assert [a["pmid"] for a in page3[0]] == [str(n) for n in range(40, 45)]
+        assert beyond == ([], 45)
+
+        esearches = [c for c in calls if "term" in c]
+        assert len(esearches) == 1
+        assert esearches[0]["usehistory"] == "y"
+        # Page 1 plus the prefetch of page 2; page 2 itself then needs no request.
+        assert calls_after_page1 == 3
+        assert [c["retstart"] for c in calls if "WebEnv" in c] == ["20", "40"]
+
+    def test_history_esearch_is_cached_across_session_stores(self, tmp_path):
+        calls: list[dict] = []
+        cache = PubMedCache(tmp_path / "cache.db")
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(self._history_handler(calls))) as http:
+                # A fresh session store per client, as after a restart.
+                first = await PubMedClient(http, cache).search_page("statins", 1, 20)
+                second = await PubMedClient(http, cache).search_page("  Statins", 1, 20)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert second == first
+        assert len([c for c in calls if "term" in c]) == 1
+        assert cache.stats()[SEARCH]["hits"] == 1
+
+    def test_expired_webenv_retry_bypasses_the_cache(self, tmp_path):
+        calls: list[dict] = []
+        cache = PubMedCache(tmp_path / "cache.db")
+        cache.set(SEARCH, history_key("statins", 20), {
+            "webenv": "EXPIRED", "query_key": "1", "count": 45, "first_ids": [],
+        })
+        handler = self._history_handler(calls)
+
+        def expiring(request: httpx.Request) -> httpx.Response:
+            if request.url.params.get("WebEnv") == "EXPIRED":
+                calls.append(dict(request.url.params))
+                return httpx.Response(200, text="<PubmedArticleSet></PubmedArticleSet>")
+            return handler(request)
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(expiring)) as http:
+                return await PubMedClient(http, cache).search_page("statins", 2, 20)
+
+        articles, total = asyncio.run(run())
+        assert [a["pmid"] for a in articles][0] == "20"
+        assert total == 45
+        assert len([c for c in calls if "term" in c]) == 1
+        assert cache.get(SEARCH, history_key("statins", 20)).value["webenv"] == "MCID_1"
+
+    def test_search_endpoint_accepts_page_parameters(self, client):
+        calls: list[dict] = []
+        http = httpx.AsyncClient(transport=httpx.MockTransport(self._history_handler(calls, total=7)))
+        app.dependency_overrides[get_pubmed_client] = lambda: PubMedClient(http)
+
+        resp = client.get("/search", params={"query": "statins", "page": 2, "page_size": 5})
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["total"] == 7
+        assert data["page"] == 2
+        assert [r["pmid"] for r in data["results"]] == ["5", "6"]
@@ -0,0 +1,69 @@
+import asyncio
+import gzip
+
+from app.services.pubmed_client import PubMedClient
+from app.services.pubmed_mirror import PubMedMirror
+
+
+def _article(pmid: int, title: str, abstract: str) -> str:
+    return (
+        f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article>"
+        f"<ArticleTitle>{title}</ArticleTitle>"
+        f"<Abstract><AbstractText>{abstract}</AbstractText></Abstract>"
+        f"<AuthorList><Author><LastName>Smith</LastName><ForeName>Ann</ForeName></Author></AuthorList>"
+        f"</Article></MedlineCitation></PubmedArticle>"
+    )
+
+
+def _write(path, body: str) -> None:
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(f"<PubmedArticleSet>{body}</PubmedArticleSet>")
+
+
+def test_ingest_search_and_incremental_updates(tmp_path):
+    baseline = tmp_path / "pubmed24n0001.xml.gz"
+    _write(baseline, "".join([
+        _article(1, "Statins in heart failure", "Statin therapy reduced mortality."),
+        _article(2, "Insulin pumps", "Continuous insulin infusion improved HbA1c."),
+        _article(3, "Statin adherence", "Adherence to statin therapy was low."),
+    ]))
+    update = tmp_path / "pubmed24n0002.xml.gz"
+    _write(update, _article(2, "Insulin pumps revisited", "Updated abstract.")
+           + "<DeleteCitation><PMID>3</PMID></DeleteCitation>")
+
+    mirror = PubMedMirror(tmp_path / "mirror.db")
+    stats = mirror.ingest_file(baseline)
+    assert stats.articles == 3
+
+    results, total = mirror.search("statin therapy")
+    assert total == 2
+    assert {r["pmid"] for r in results} == {"1", "3"}
+
+    assert mirror.ingest_file(baseline).skipped
+    stats = mirror.ingest_file(update)
+    assert (stats.articles, stats.deleted) == (1, 1)
+
+    assert mirror.count() == 2
+    assert mirror.fetch(["2"])[0]["title"] == "Insulin pumps revisited"
+    assert mirror.search("adherence") == ([], 0)
+
+
+def test_client_answers_from_mirror_without_network(tmp_path):
+    path = tmp_path / "pubmed24n0001.xml.gz"
+    _write(path, "".join(_article(n, f"Trial {n} of metformin", "Metformin lowered glucose.") for n in range(1, 26)))
+    mirror = PubMedMirror(tmp_path / "mirror.db")
+    mirror.ingest_file(path)
+
+    client = PubMedClient(client=None, mirror=mirror)
+
+    async def run():
+        page, total = await client.search_page("metformin glucose", page=2, page_size=10)
+        article = await client.fetch_by_pmid("7")
+        missing = await client.fetch_by_pmid("999")
+        return page, total, article, missing
+
+    page, total, article, missing = asyncio.run(run())
+    assert total == 25
+    assert len(page) == 10
+    assert article["authors"] == ["Smith Ann"]
+    assert missing is None
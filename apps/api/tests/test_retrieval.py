@@ -1,6 +1,9 @@
 from app.models.chunk import Chunk
+from app.models.chunk_terms import ChunkTerms
 from app.models.reference import Reference
-from app.services.retrieval import retrieve
+from app.services.chunk_store import insert_chunks
+from app.services.chunk_terms import backfill_chunk_terms, load_chunk_terms, term_ids
+from app.services.retrieval import retrieve, retrieve_many
 
 
 def _seed_reference(db, title="Test Ref", source="pubmed", chunks=None):
@@ -66,3 +69,38 @@ def test_retrieve_handles_special_characters(db):
     # Should not raise
     results = retrieve(db, 'test "query" with (parens)', [ref.id], top_k=3)
     assert isinstance(results, list)
+
+
+def test_retrieve_many_searches_each_distinct_query(db):
+    ref = _seed_reference(db, chunks=["diabetes treatment with insulin therapy", "geology overview"])
+
+    results = retrieve_many(db, ["diabetes", "no match here", "diabetes"], [ref.id], top_k=3)
+
+    assert len(results) == 3
+    assert results[0] == results[2] == retrieve(db, "diabetes", [ref.id], top_k=3)
+    assert results[1] == retrieve(db, "no match here", [ref.id], top_k=3)
+    assert retrieve_many(db, ["diabetes"], []) == [[]]
+
+
+def test_ingested_chunks_carry_term_ids(db):
+    ref = _seed_reference(db)
+    insert_chunks(db, ref.id, ["Diabetes treatment, with insulin.", "Unrelated geology."])
+    db.commit()
+
+    results = retrieve(db, "diabetes treatment", [ref.id], top_k=1)
+    assert list(results[0]["term_ids"]) == term_ids("diabetes treatment with insulin")
+
+
+def test_chunk_terms_follow_chunk_changes_and_backfill(db):
+    ref = _seed_reference(db, chunks=["first chunk text", "second chunk text"])
+    first, second = db.query(Chunk).order_by(Chunk.id).all()
+    assert backfill_chunk_terms(db) == 2
+    assert backfill_chunk_terms(db) == 0
+
+    first.content = "rewritten chunk text"
+    db.delete(second)
+    db.commit()
+    assert db.query(ChunkTerms).count() == 0
+
+    assert backfill_chunk_terms(db) == 1
+    assert list(load_chunk_terms(db, [first.id])[first.id]) == term_ids("rewritten chunk text")
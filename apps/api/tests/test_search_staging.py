@@ -0,0 +1,92 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.main import app
+from app.routers import references
+from app.services.pubmed_client import PubMedClient, get_pubmed_client
+from app.services.search_staging import SearchStaging
+
+
+def _article(pmid: str) -> dict:
+    return {
+        "pmid": pmid,
+        "title": f"Article {pmid}",
+        "authors": ["Smith Ann"],
+        "abstract": "First sentence. Second sentence.",
+        "pub_date": "2024",
+    }
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_stage_prechunks_top_results_and_bounds_size():
+    staging = SearchStaging(max_entries=3)
+    asyncio.run(staging.stage([_article(str(n)) for n in range(20)], top_n=5))
+
+    assert staging.get("0") is None
+    staged = staging.get("4")
+    assert staged.chunks == ["First sentence. Second sentence."]
+    staging.discard(["4"])
+    assert staging.get("4") is None
+
+
+def test_staged_entries_expire():
+    clock = FakeClock()
+    staging = SearchStaging(ttl=60, clock=clock)
+    asyncio.run(staging.stage([_article("1")]))
+    clock.now = 61
+    assert staging.get("1") is None
+
+
+def test_import_after_search_makes_no_ncbi_call(client):
+    requests: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path.rsplit("/", 1)[-1])
+        if request.url.path.endswith("esearch.fcgi"):
+            return httpx.Response(200, json={"esearchresult": {
+                "count": "1", "webenv": "W", "querykey": "1", "idlist": ["777"],
+            }})
+        return httpx.Response(200, text=(
+            "<PubmedArticleSet><PubmedArticle><MedlineCitation><PMID>777</PMID><Article>"
+            "<ArticleTitle>Staged</ArticleTitle>"
+            "<Abstract><AbstractText>Staged abstract text.</AbstractText></Abstract>"
+            "</Article></MedlineCitation></PubmedArticle></PubmedArticleSet>"
+        ))
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    app.dependency_overrides[get_pubmed_client] = lambda: PubMedClient(http)
+
+    assert client.get("/search", params={"query": "staged"}).status_code == 200
+    calls_after_search = len(requests)
+
+    resp = client.post("/references/from-pubmed", json={"pmid": "777"})
+    assert resp.status_code == 201
+    assert resp.json()["chunk_count"] == 1
+    assert len(requests) == calls_after_search
+    assert client.get("/metrics/search-staging").json()["hits"] == 1
+
+
+def test_failed_import_keeps_the_staged_entry(client, monkeypatch):
+    staging = app.state.search_staging
+    asyncio.run(staging.stage([_article("888")]))
+
+    def failing_insert(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(references, "_add_pubmed_reference", failing_insert)
+    with pytest.raises(RuntimeError):
+        client.post("/references/from-pubmed", json={"pmid": "888"})
+    assert staging.get("888") is not None
+
+    monkeypatch.undo()
+    assert client.post("/references/from-pubmed", json={"pmid": "888"}).status_code == 201
+    assert staging.get("888") is None
@@ -1,5 +1,7 @@
+import asyncio
 import json
 
+import anyio
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -9,6 +11,7 @@ from starlette.testclient import TestClient
 from app.database import Base, get_db, init_db
 from app.main import app
 from app.models.chunk import Chunk
+from app.models.message_version import MessageVersion
 from app.models.reference import Reference
 from app.models.working_set_item import WorkingSetItem
 from app.routers.messages import get_llm_provider
@@ -18,6 +21,7 @@ from app.services.llm_provider import (
     LLMGenerationResult,
     MockProvider,
 )
+from app.services.stream_generation import StreamDisconnects, stream_generate_pipeline
 
 
 def parse_sse_events(text: str) -> list[dict]:
@@ -187,3 +191,141 @@ def test_stream_full_pipeline(stream_client_with_evidence):
     assert get_response.json()["id"] == msg_id
 
 
+def test_stream_emits_claim_events_for_fallback_parse(stream_client_with_evidence):
+    # MockProvider's deltas are not valid JSON, so claims come from the final parse.
+    client, _ = stream_client_with_evidence
+    events = parse_sse_events(
+        client.post("/messages/generate/stream", json={"prompt": "diabetes treatment", "reference_ids": [1]}).text
+    )
+    claim_events = [json.loads(e["data"]) for e in events if e["event"] == "claim"]
+    assert [c["index"] for c in claim_events] == [0]
+    assert claim_events[0]["claim"]["status"] == "supported"
+
+
+class JSONStreamProvider(MockProvider):
+    async def async_stream_claims(self, prompt, evidence_chunks, system_prompt, result):
+        text = self.fixed_result.model_dump_json()
+        for i in range(0, len(text), 7):
+            yield text[i:i + 7]
+        result.parsed = self.fixed_result
+
+
+def test_claims_are_verified_while_streaming(stream_client_with_evidence):
+    client, _ = stream_client_with_evidence
+    provider = JSONStreamProvider(
+        LLMGenerationResult(claims=[
+            LLMClaim(text="Test evidence text about diabetes treatment.", citations=[LLMCitation(reference_id=1, chunk_id=1)]),
+            LLMClaim(text="Unrelated {braced} \"quoted\" statement.", citations=[LLMCitation(reference_id=1, chunk_id=1)]),
+        ])
+    )
+    app.dependency_overrides[get_llm_provider] = lambda: provider
+    events = parse_sse_events(
+        client.post("/messages/generate/stream", json={"prompt": "diabetes treatment", "reference_ids": [1]}).text
+    )
+    types = [e["event"] for e in events]
+    claim_positions = [i for i, t in enumerate(types) if t == "claim"]
+    last_delta = max(i for i, t in enumerate(types) if t == "delta")
+    assert len(claim_positions) == 2
+    assert claim_positions[0] < last_delta
+
+    claims = [json.loads(events[i]["data"]) for i in claim_positions]
+    assert [c["claim"]["status"] for c in claims] == ["supported", "dropped"]
+    final = json.loads(next(e["data"] for e in events if e["event"] == "final"))
+    assert len(final["claims"]) == 1
+    assert len(final["warnings"]) == 1
+
+
+def test_stream_variants_are_tagged_and_persisted(stream_client_with_evidence):
+    client, _ = stream_client_with_evidence
+    events = parse_sse_events(
+        client.post(
+            "/messages/generate/stream",
+            json={"prompt": "diabetes treatment", "reference_ids": [1], "variants": 2},
+        ).text
+    )
+    deltas = [json.loads(e["data"]) for e in events if e["event"] == "delta"]
+    assert {d["variant"] for d in deltas} == {0, 1}
+    finals = [json.loads(e["data"]) for e in events if e["event"] == "final"]
+    assert [f["variant"] for f in finals] == [0, 1]
+    assert events[-1]["event"] == "status" and json.loads(events[-1]["data"])["stage"] == "done"
+
+    detail = client.get(f"/messages/{finals[0]['message_id']}").json()
+    assert detail["sibling_ids"] == [finals[1]["message_id"]]
+
+
+def test_stream_rejects_too_many_variants(stream_client_with_evidence):
+    client, _ = stream_client_with_evidence
+    response = client.post(
+        "/messages/generate/stream",
+        json={"prompt": "diabetes treatment", "reference_ids": [1], "variants": 99},
+    )
+    assert response.status_code == 422
+
+
+class SlowStreamProvider(MockProvider):
+    # Streams the result as JSON a few characters at a time.
+
+    def __init__(self, fixed_result: LLMGenerationResult, delay: float) -> None:
+        super().__init__(fixed_result)
+        self.delay = delay
+        self.deltas_sent = 0
+        self.closed = False
+
+    async def async_stream_claims(self, prompt, evidence_chunks, system_prompt, result):
+        text = self.fixed_result.model_dump_json()
+        try:
+            for i in range(0, len(text), 7):
+                await asyncio.sleep(self.delay)
+                self.deltas_sent += 1
+                yield text[i:i + 7]
+            result.parsed = self.fixed_result
+        finally:
+            self.closed = True
+
+
+def _disconnect_after_first_claim(db, provider, disconnects) -> list[dict]:
+    # Cancels the consumer the way sse-starlette does on http.disconnect.
+    async def run():
+        events = []
+        with anyio.CancelScope() as scope:
+            async for event in stream_generate_pipeline(db, "diabetes", [1], provider, disconnects=disconnects):
+                events.append(event)
+                if event["event"] == "claim":
+                    scope.cancel()
+        return events
+
+    return asyncio.run(run())
+
+
+def _slow_provider() -> SlowStreamProvider:
+    claim = LLMClaim(
+        text="Test evidence text about diabetes treatment.",
+        citations=[LLMCitation(reference_id=1, chunk_id=1)],
+    )
+    return SlowStreamProvider(LLMGenerationResult(claims=[claim] * 20), delay=0.005)
+
+
+@pytest.mark.parametrize("policy", ["discard", "persist"])
+def test_disconnect_closes_upstream_stream(stream_client_with_evidence, policy):
+    _, TestSession = stream_client_with_evidence
+    provider = _slow_provider()
+    total_deltas = -(-len(provider.fixed_result.model_dump_json()) // 7)
+    disconnects = StreamDisconnects(policy)
+
+    with TestSession() as db:
+        events = _disconnect_after_first_claim(db, provider, disconnects)
+
+    assert provider.closed
+    assert provider.deltas_sent < total_deltas / 2
+    assert not any(e["event"] in ("final", "error") for e in events)
+    with TestSession() as db:
+        versions = db.query(MessageVersion).all()
+    stats = disconnects.stats
+    assert stats["disconnects"] == 1
+    if policy == "discard":
+        assert versions == []
+        assert stats["discarded"] == 1 and stats["wasted_completion_tokens"] > 0
+    else:
+        assert [v.source for v in versions] == ["partial"]
+        assert len(json.loads(versions[0].claims_json)) == 1
+        assert stats["persisted"] == 1 and stats["persisted_completion_tokens"] > 0
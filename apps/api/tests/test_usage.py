@@ -0,0 +1,182 @@
+import asyncio
+import json
+
+import httpx
+import openai
+from sqlalchemy.orm import sessionmaker
+from starlette.testclient import TestClient
+
+from app.database import get_db
+from app.main import app
+from app.models.chunk import Chunk
+from app.models.generation_usage import GenerationUsage
+from app.models.message_version import MessageVersion
+from app.models.reference import Reference
+from app.services.generation import generate_message
+from app.services.llm_cache import CachingProvider, LLMResponseCache
+from app.services.llm_provider import (
+    LLMCitation,
+    LLMClaim,
+    LLMGenerationResult,
+    LLMUsage,
+    MockProvider,
+    OpenAIProvider,
+    StreamResult,
+)
+from app.services.usage import _percentile
+
+CONTENT = json.dumps({"claims": [{"text": "Insulin lowers glucose.", "citations": [{"reference_id": 1, "chunk_id": 1}]}]})
+USAGE = {"prompt_tokens": 120, "completion_tokens": 30, "total_tokens": 150, "prompt_tokens_details": {"cached_tokens": 64}}
+
+
+def _completions_handler(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    base = {"id": "chatcmpl-1", "created": 0, "model": body["model"]}
+    if not body.get("stream"):
+        return httpx.Response(200, json={
+            **base,
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": CONTENT}, "finish_reason": "stop"}],
+            "usage": USAGE,
+        })
+
+    def chunk(payload: dict) -> str:
+        return "data: " + json.dumps({**base, "object": "chat.completion.chunk", **payload}) + "\n\n"
+
+    events = [chunk({"choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]})]
+    events += [
+        chunk({"choices": [{"index": 0, "delta": {"content": CONTENT[i:i + 16]}, "finish_reason": None}]})
+        for i in range(0, len(CONTENT), 16)
+    ]
+    events.append(chunk({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+    if body.get("stream_options", {}).get("include_usage"):
+        events.append(chunk({"choices": [], "usage": USAGE}))
+    events.append("data: [DONE]\n\n")
+    return httpx.Response(200, text="".join(events), headers={"content-type": "text/event-stream"})
+
+
+def _openai_provider() -> OpenAIProvider:
+    provider = OpenAIProvider(api_key="test", model="test-model")
+    provider.async_client = openai.AsyncOpenAI(
+        api_key="test",
+        base_url="http://llm.test/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(_completions_handler)),
+    )
+    return provider
+
+
+class UsageProvider(MockProvider):
+    def __init__(self, result: LLMGenerationResult, usage: LLMUsage) -> None:
+        super().__init__(result)
+        self.usage = usage
+
+    async def async_generate_claims(self, prompt, evidence_chunks, system_prompt):
+        return self.fixed_result.model_copy().with_usage(self.usage)
+
+
+class TestProviderUsage:
+    def test_completion_usage_is_kept(self):
+        result = asyncio.run(_openai_provider().async_generate_claims("insulin", [], "system"))
+        assert result.claims[0].text == "Insulin lowers glucose."
+        assert result.usage.model == "test-model"
+        assert (result.usage.prompt_tokens, result.usage.completion_tokens, result.usage.cached_tokens) == (120, 30, 64)
+        assert result.usage.latency_ms > 0
+        assert result.usage.ttft_ms is None
+
+    def test_stream_records_time_to_first_token(self):
+        async def run():
+            result = StreamResult()
+            deltas = [d async for d in _openai_provider().async_stream_claims("insulin", [], "system", result)]
+            return deltas, result
+
+        deltas, result = asyncio.run(run())
+        assert "".join(deltas) == CONTENT
+        assert result.usage.prompt_tokens == 120
+        assert 0 <= result.usage.ttft_ms <= result.usage.latency_ms
+        assert result.parsed.usage is result.usage
+
+    def test_cache_hit_is_not_charged(self):
+        result = LLMGenerationResult(claims=[])
+        provider = CachingProvider(
+            UsageProvider(result, LLMUsage(model="m", prompt_tokens=10)), LLMResponseCache(":memory:")
+        )
+
+        async def run():
+            first = await provider.async_generate_claims("p", [], "s")
+            second = await provider.async_generate_claims("p", [], "s")
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first.usage.prompt_tokens == 10 and not first.usage.cache_hit
+        assert second.usage.cache_hit and second.usage.prompt_tokens == 0
+        assert first.claims == second.claims
+
+
+def test_generate_persists_usage_per_version(db):
+    ref = Reference(title="Test", source="pubmed")
+    db.add(ref)
+    db.flush()
+    chunk = Chunk(reference_id=ref.id, content="diabetes treatment insulin therapy", chunk_index=0)
+    db.add(chunk)
+    db.flush()
+    provider = UsageProvider(
+        LLMGenerationResult(claims=[
+            LLMClaim(text="diabetes treatment uses insulin therapy", citations=[LLMCitation(reference_id=ref.id, chunk_id=chunk.id)])
+        ]),
+        LLMUsage(model="test-model", prompt_tokens=200, completion_tokens=40, latency_ms=350.0),
+    )
+
+    response = asyncio.run(generate_message(db, "diabetes", [ref.id], provider))
+    version = db.query(MessageVersion).filter_by(message_id=response.message_id).one()
+    usage = db.query(GenerationUsage).filter_by(message_version_id=version.id).one()
+    assert (usage.model, usage.prompt_tokens, usage.completion_tokens) == ("test-model", 200, 40)
+    assert (usage.chunk_count, usage.supported_claims, usage.dropped_claims) == (1, 1, 0)
+
+
+def test_percentile_nearest_rank():
+    assert _percentile([], 0.5) is None
+    assert _percentile([40.0, 10.0, 30.0, 20.0], 0.5) == 20.0
+    assert _percentile([float(i) for i in range(1, 101)], 0.95) == 95.0
+
+
+def test_usage_endpoints_aggregate(engine):
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Session() as db:
+        for i, (model, tokens, latency, cache_hit) in enumerate([
+            ("mini", 100, 100.0, False),
+            ("mini", 300, 300.0, False),
+            ("mini", 0, 0.0, True),
+            ("large", 1000, 900.0, False),
+        ]):
+            version = MessageVersion(
+                message_id=i + 1, version_number=1, prompt_or_instruction=f"prompt {i}", message_text="",
+                claims_json="[]", dropped_claims_json="[]", source="generated",
+            )
+            db.add(version)
+            db.flush()
+            db.add(GenerationUsage(
+                message_version_id=version.id, model=model, prompt_tokens=tokens, completion_tokens=0,
+                latency_ms=latency, cache_hit=cache_hit, supported_claims=2,
+            ))
+        db.commit()
+
+    def override_get_db():
+        with Session() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        with TestClient(app) as client:
+            by_model = {b["key"]: b for b in client.get("/metrics/llm-usage", params={"group_by": "model"}).json()}
+            expensive = client.get("/metrics/llm-usage/expensive", params={"limit": 2}).json()
+            by_day = client.get("/metrics/llm-usage").json()
+    finally:
+        app.dependency_overrides.clear()
+
+    mini = by_model["mini"]
+    assert (mini["generations"], mini["cache_hits"], mini["prompt_tokens"]) == (3, 1, 400)
+    assert mini["tokens_per_supported_claim"] == 100.0
+    assert (mini["latency_ms_p50"], mini["latency_ms_p95"]) == (100.0, 300.0)
+    assert by_model["large"]["tokens_per_supported_claim"] == 500.0
+    assert [e["prompt"] for e in expensive] == ["prompt 3", "prompt 1"]
+    assert len(by_day) == 1 and by_day[0]["generations"] == 4
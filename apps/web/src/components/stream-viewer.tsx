@@ -2,7 +2,7 @@
 
 import { useEffect, useRef, useState } from "react";
 import { streamGenerate } from "@/lib/api";
-import type { GenerateRequest, GenerateResponse } from "@/lib/api";
+import type { Claim, GenerateRequest, GenerateResponse } from "@/lib/api";
 
 const STAGES = ["Retrieving", "Generating", "Verifying", "Persisting", "Done"] as const;
 const STAGE_KEYS = ["retrieving", "generating", "verifying", "persisting", "done"] as const;
@@ -37,6 +37,7 @@ interface StreamViewerProps {
 export default function StreamViewer({ request, onComplete }: StreamViewerProps) {
   const [stage, setStage] = useState<string>("retrieving");
   const [rawJson, setRawJson] = useState("");
+  const [claims, setClaims] = useState<Claim[]>([]);
   const [error, setError] = useState<string | null>(null);
   const started = useRef(false);
 
@@ -56,6 +57,13 @@ export default function StreamViewer({ request, onComplete }: StreamViewerProps)
             case "delta":
               setRawJson((prev) => prev + (data.text as string));
               break;
+            case "claim":
+              setClaims((prev) => {
+                const next = [...prev];
+                next[data.index as number] = data.claim as Claim;
+                return next;
+              });
+              break;
             case "final":
               setStage("done");
               onComplete(data as unknown as GenerateResponse);
@@ -117,6 +125,23 @@ export default function StreamViewer({ request, onComplete }: StreamViewerProps)
           )}
         </div>
       )}
+
+      {claims.length > 0 && stage !== "done" && (
+        <ul className="space-y-2">
+          {claims.filter(Boolean).map((claim, i) => (
+            <li
+              key={i}
+              className={`rounded-lg border px-4 py-2 text-sm ${
+                claim.status === "supported"
+                  ? "border-emerald-100 bg-emerald-50 text-[var(--text-primary)]"
+                  : "border-amber-100 bg-amber-50 text-[var(--text-tertiary)] line-through"
+              }`}
+            >
+              {claim.text}
+            </li>
+          ))}
+        </ul>
+      )}
     </div>
   );
 }
@@ -38,6 +38,7 @@ export interface UploadResponse {
 export interface Citation {
   reference_id: number;
   chunk_id: number;
+  repaired?: boolean;
 }
 
 export type ClaimStatus = "supported" | "dropped";
@@ -53,6 +54,8 @@ export interface GenerateRequest {
   prompt: string;
   reference_ids: number[];
   top_k?: number;
+  variants?: number;
+  model_hint?: string;
 }
 
 export interface GenerateResponse {
@@ -60,6 +63,8 @@ export interface GenerateResponse {
   message_text: string;
   claims: Claim[];
   warnings: string[];
+  variant?: number;
+  variants?: GenerateResponse[];
 }
 
 export interface MessageVersionSchema {
@@ -87,6 +92,7 @@ export interface MessageDetail {
   created_at: string;
   updated_at: string;
   versions: MessageVersionSchema[];
+  sibling_ids?: number[];
 }
 
 export interface RefineResponse {
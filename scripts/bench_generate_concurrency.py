@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Concurrent /messages/generate load test against the OpenAI stand-in.
+
+Runs the API in-process (httpx ASGI transport) with OPENAI_BASE_URL pointed at
+scripts/openai_standin.py, which holds each completion for --latency-ms.
+Requires the API package to be importable (pip install -e apps/api).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+
+async def run_load(requests: int) -> tuple[float, list[int]]:
+    import anyio
+
+    from app.database import SessionLocal
+    from app.main import app
+    from app.models.chunk import Chunk
+    from app.models.reference import Reference
+
+    async with app.router.lifespan_context(app):
+        db = SessionLocal()
+        db.add(Reference(id=1, title="Load test", source="test"))
+        db.flush()
+        db.add(Chunk(reference_id=1, chunk_index=0, content="Once-weekly dosing reduced HbA1c by 1.4 percentage points."))
+        db.commit()
+        db.close()
+
+        print(f"threadpool size: {anyio.to_thread.current_default_thread_limiter().total_tokens}", file=sys.stderr)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=300) as client:
+            start = time.perf_counter()
+            # Distinct prompts so the response cache cannot collapse requests.
+            responses = await asyncio.gather(*[
+                client.post("/messages/generate", json={"prompt": f"HbA1c dosing {i}", "reference_ids": [1]})
+                for i in range(requests)
+            ])
+            elapsed = time.perf_counter() - start
+    return elapsed, [r.status_code for r in responses]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test concurrent message generation")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=2000)
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{Path(tmp.name) / 'app.db'}",
+        "OPENAI_API_KEY": "standin",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.port}/v1",
+        "OPENAI_MAX_CONNECTIONS": str(args.requests),
+        "LLM_CACHE_PATH": "",
+        "PUBMED_CACHE_PATH": "",
+    })
+    # Settings are read at import time, so the app is imported only after the
+    # environment above is in place.
+    from bench_llm_pool import start_standin
+
+    proc = start_standin(args.port, args.latency_ms)
+    try:
+        elapsed, statuses = asyncio.run(run_load(args.requests))
+    finally:
+        proc.terminate()
+        proc.wait()
+        tmp.cleanup()
+
+    print(json.dumps({
+        "requests": args.requests,
+        "model_latency_ms": args.latency_ms,
+        "ok": statuses.count(200),
+        "wall_s": round(elapsed, 2),
+        "effective_concurrency": round(args.requests * args.latency_ms / 1000 / elapsed, 1),
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
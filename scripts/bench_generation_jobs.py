@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Batch generation benchmark. Compares N /messages/generate calls with one /generation-jobs job.
+
+Runs the API in-process against scripts/openai_standin.py. Both modes use the
+same LLM concurrency (--concurrency), so the difference is per-request
+overhead: retrieval, verification and one commit per message.
+Requires the API package to be importable (pip install -e apps/api).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+
+async def run_modes(prompts: list[str], concurrency: int) -> dict:
+    from app.database import SessionLocal
+    from app.main import app
+    from app.models.chunk import Chunk
+    from app.models.reference import Reference
+
+    async with app.router.lifespan_context(app):
+        db = SessionLocal()
+        db.add(Reference(id=1, title="Bench", source="test"))
+        db.flush()
+        for i in range(40):
+            db.add(Chunk(reference_id=1, chunk_index=i, content=f"Once-weekly dosing {i} reduced HbA1c in trial arm {i}."))
+        db.commit()
+        db.close()
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=600) as client:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def generate(prompt: str) -> int:
+                async with semaphore:
+                    resp = await client.post("/messages/generate", json={"prompt": prompt, "reference_ids": [1]})
+                    return resp.status_code
+
+            start = time.perf_counter()
+            statuses = await asyncio.gather(*[generate(f"{p} single") for p in prompts])
+            single_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            job = (await client.post(
+                "/generation-jobs", json={"prompts": [f"{p} batch" for p in prompts], "reference_ids": [1]}
+            )).json()
+            while job["status"] not in ("completed", "failed"):
+                await asyncio.sleep(0.05)
+                job = (await client.get(f"/generation-jobs/{job['id']}")).json()
+            batch_s = time.perf_counter() - start
+
+    return {
+        "individual_calls": {"ok": statuses.count(200), "wall_s": round(single_s, 2)},
+        "batch_job": {"completed": job["completed"], "failed": job["failed"], "wall_s": round(batch_s, 2)},
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark batch generation jobs")
+    parser.add_argument("--prompts", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--port", type=int, default=8102)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{Path(tmp.name) / 'app.db'}",
+        "OPENAI_API_KEY": "standin",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.port}/v1",
+        "LLM_CACHE_PATH": "",
+        "PUBMED_CACHE_PATH": "",
+        "GENERATION_JOB_CONCURRENCY": str(args.concurrency),
+    })
+    # Settings are read at import time, so the app is imported only after the
+    # environment above is in place.
+    from bench_llm_pool import start_standin
+
+    proc = start_standin(args.port, args.latency_ms)
+    prompts = [f"HbA1c dosing variant {i}" for i in range(args.prompts)]
+    try:
+        report = asyncio.run(run_modes(prompts, args.concurrency))
+    finally:
+        proc.terminate()
+        proc.wait()
+        tmp.cleanup()
+
+    print(json.dumps({"prompts": args.prompts, "concurrency": args.concurrency, "latency_ms": args.latency_ms, **report}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
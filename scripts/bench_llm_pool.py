@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""LLM client pooling benchmark. Compares a provider built per request with one shared provider.
+
+Starts scripts/openai_standin.py locally and points OpenAIProvider at it.
+Requires the API package to be importable (pip install -e apps/api).
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from app.services.generation import SYSTEM_PROMPT
+from app.services.llm_provider import OpenAIProvider
+
+STANDIN = Path(__file__).with_name("openai_standin.py")
+CHUNKS = [
+    {"id": 1, "reference_id": 1, "content": "Once-weekly dosing reduced HbA1c by 1.4 percentage points."},
+    {"id": 2, "reference_id": 1, "content": "Gastrointestinal adverse events were mostly mild."},
+]
+
+
+def start_standin(port: int, latency_ms: float, extra_args: list[str] | None = None) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, str(STANDIN), "--port", str(port), "--latency-ms", str(latency_ms), *(extra_args or [])],
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=0.5)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("stand-in server did not start")
+
+
+def _summary(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "mean_ms": round(statistics.mean(samples), 2),
+        "p50_ms": round(ordered[len(ordered) // 2], 2),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1], 2),
+    }
+
+
+def bench_per_request(base_url: str, requests: int) -> list[float]:
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        provider = OpenAIProvider(api_key="standin", base_url=base_url)
+        provider.generate_claims("diabetes", CHUNKS, SYSTEM_PROMPT)
+        samples.append((time.perf_counter() - start) * 1000)
+        asyncio.run(provider.aclose())
+    return samples
+
+
+def bench_shared(base_url: str, requests: int) -> list[float]:
+    provider = OpenAIProvider(api_key="standin", base_url=base_url)
+    provider.generate_claims("warm-up", CHUNKS, SYSTEM_PROMPT)
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        provider.generate_claims("diabetes", CHUNKS, SYSTEM_PROMPT)
+        samples.append((time.perf_counter() - start) * 1000)
+    asyncio.run(provider.aclose())
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark per-request vs shared LLM provider")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated model latency")
+    args = parser.parse_args()
+
+    proc = start_standin(args.port, args.latency_ms)
+    try:
+        base_url = f"http://127.0.0.1:{args.port}/v1"
+        per_request = _summary(bench_per_request(base_url, args.requests))
+        shared = _summary(bench_shared(base_url, args.requests))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print(json.dumps({
+        "requests": args.requests,
+        "per_request_provider": per_request,
+        "shared_provider": shared,
+        "saved_per_request_ms": round(per_request["mean_ms"] - shared["mean_ms"], 2),
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
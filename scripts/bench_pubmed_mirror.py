@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Offline PubMed mirror benchmark. Reports ingest throughput and search latency on a synthetic corpus.
+
+Requires the API package to be importable (pip install -e apps/api).
+"""
+
+import argparse
+import gzip
+import itertools
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from app.services.pubmed_mirror import PubMedMirror
+
+QUERIES = ["statin", "insulin therapy", "metformin glucose", "heart failure mortality", "word17 word230"]
+TOPIC_WORDS = ["statin", "insulin", "therapy", "metformin", "glucose", "heart", "failure", "mortality", "trial"]
+
+
+def make_baseline_files(directory: Path, files: int, articles_per_file: int, seed: int = 7) -> list[Path]:
+    rng = random.Random(seed)
+    # Zipf-ish vocabulary so common terms have long posting lists, as in PubMed.
+    vocab = TOPIC_WORDS + [f"word{i}" for i in range(20000)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 10) for rank in range(len(vocab))))
+    paths = []
+    pmid = 1
+    for n in range(files):
+        path = directory / f"pubmed00n{n + 1:04d}.xml.gz"
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=1) as f:
+            f.write("<PubmedArticleSet>\n")
+            for _ in range(articles_per_file):
+                title = " ".join(rng.choices(vocab, cum_weights=cum_weights, k=10))
+                abstract = " ".join(rng.choices(vocab, cum_weights=cum_weights, k=150))
+                f.write(
+                    f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article>"
+                    f"<Journal><JournalIssue><PubDate><Year>2020</Year></PubDate></JournalIssue></Journal>"
+                    f"<ArticleTitle>{escape(title)}</ArticleTitle>"
+                    f"<Abstract><AbstractText>{escape(abstract)}.</AbstractText></Abstract>"
+                    f"<AuthorList><Author><LastName>Author</LastName><ForeName>A</ForeName></Author></AuthorList>"
+                    f"</Article></MedlineCitation></PubmedArticle>\n"
+                )
+                pmid += 1
+            f.write("</PubmedArticleSet>\n")
+        paths.append(path)
+    return paths
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the offline PubMed mirror")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--articles-per-file", type=int, default=100000)
+    parser.add_argument("--searches", type=int, default=20, help="Repetitions per query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        paths = make_baseline_files(tmp_dir, args.files, args.articles_per_file)
+        mirror = PubMedMirror(tmp_dir / "mirror.db")
+
+        start = time.perf_counter()
+        ingested = sum(mirror.ingest_file(p).articles for p in paths)
+        ingest_s = time.perf_counter() - start
+
+        latencies = {}
+        for query in QUERIES:
+            samples = []
+            for _ in range(args.searches):
+                t = time.perf_counter()
+                _, total = mirror.search(query, limit=20)
+                samples.append((time.perf_counter() - t) * 1000)
+            latencies[query] = {
+                "matches": total,
+                "p50_ms": round(statistics.median(samples), 1),
+                "max_ms": round(max(samples), 1),
+            }
+        db_mb = (tmp_dir / "mirror.db").stat().st_size / 1e6
+        mirror.close()
+
+    print(json.dumps({
+        "articles": ingested,
+        "ingest_s": round(ingest_s, 1),
+        "ingest_articles_per_s": round(ingested / ingest_s),
+        "db_mb": round(db_mb),
+        "search": latencies,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""PubMed XML parser benchmark. Compares tree-building parsing with the streaming iterparse parser.
+
+Requires the API package to be importable (pip install -e apps/api).
+"""
+
+import argparse
+import gzip
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from app.services.pubmed_client import iter_parse_articles
+
+ARTICLE = """<PubmedArticle><MedlineCitation Status="MEDLINE" Owner="NLM"><PMID Version="1">{pmid}</PMID>
+<Article PubModel="Print"><Journal><JournalIssue CitedMedium="Internet"><Volume>12</Volume>
+<PubDate><Year>2023</Year><Month>Mar</Month></PubDate></JournalIssue><Title>Journal of Trials</Title></Journal>
+<ArticleTitle>Efficacy of agent {pmid} in type 2 diabetes: a <i>randomized</i> trial</ArticleTitle>
+<Abstract>
+<AbstractText Label="BACKGROUND" NlmCategory="BACKGROUND">Glycemic control remains suboptimal in many patients.</AbstractText>
+<AbstractText Label="METHODS" NlmCategory="METHODS">We randomized 1,200 adults to agent {pmid} or placebo for 26 weeks.</AbstractText>
+<AbstractText Label="RESULTS" NlmCategory="RESULTS">HbA1c decreased by 1.4 percentage points (95% CI 1.2 to 1.6; P&lt;0.001).</AbstractText>
+<AbstractText Label="CONCLUSIONS" NlmCategory="CONCLUSIONS">Agent {pmid} improved glycemic control with acceptable tolerability.</AbstractText>
+</Abstract>
+<AuthorList CompleteYN="Y">{authors}</AuthorList>
+<Language>eng</Language></Article>
+<MeshHeadingList><MeshHeading><DescriptorName UI="D003924">Diabetes Mellitus, Type 2</DescriptorName></MeshHeading></MeshHeadingList>
+</MedlineCitation><PubmedData><History><PubMedPubDate PubStatus="pubmed"><Year>2023</Year></PubMedPubDate></History>
+<PublicationStatus>ppublish</PublicationStatus></PubmedData></PubmedArticle>
+"""
+AUTHOR = "<Author ValidYN=\"Y\"><LastName>Author{n}</LastName><ForeName>Test</ForeName><Initials>T</Initials></Author>"
+
+
+def make_fixture(path: Path, articles: int) -> None:
+    authors = "".join(AUTHOR.format(n=n) for n in range(8))
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" ?>\n<PubmedArticleSet>\n')
+        for pmid in range(1, articles + 1):
+            f.write(ARTICLE.format(pmid=pmid, authors=authors))
+        f.write("</PubmedArticleSet>\n")
+
+
+def parse_tree(xml_text: str) -> list[dict]:
+    # The previous implementation: full tree plus descendant scans per article.
+    root = ET.fromstring(xml_text)
+    articles = []
+    for article_el in root.findall(".//PubmedArticle"):
+        citation = article_el.find(".//MedlineCitation")
+        art = citation.find("Article")
+        title_el = art.find("ArticleTitle")
+        abstract = " ".join((at.text or "") for at in art.findall(".//AbstractText")).strip()
+        authors = []
+        for author in art.findall(".//Author"):
+            last = author.find("LastName")
+            fore = author.find("ForeName")
+            if last is not None and last.text:
+                authors.append(last.text + (" " + fore.text if fore is not None and fore.text else ""))
+        pub_date_el = art.find(".//PubDate")
+        year = pub_date_el.find("Year") if pub_date_el is not None else None
+        articles.append({
+            "pmid": citation.find("PMID").text,
+            "title": title_el.text if title_el is not None else "",
+            "authors": authors,
+            "abstract": abstract,
+            "pub_date": year.text if year is not None else "",
+        })
+    return articles
+
+
+def _measure(fn) -> tuple[int, float, int]:
+    start = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - start
+
+    # Separate run: tracemalloc slows allocation-heavy code considerably.
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def benchmark(path: Path) -> dict:
+    def tree():
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return len(parse_tree(f.read()))
+
+    def streaming():
+        with gzip.open(path, "rb") as f:
+            return sum(1 for _ in iter_parse_articles(f))
+
+    report = {"fixture": path.name, "fixture_mb": round(path.stat().st_size / 1e6, 2)}
+    for name, fn in (("tree", tree), ("iterparse", streaming)):
+        count, elapsed, peak = _measure(fn)
+        report[name] = {
+            "articles": count,
+            "articles_per_s": round(count / elapsed),
+            "peak_mb": round(peak / 1e6, 1),
+        }
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark PubMed efetch XML parsing")
+    parser.add_argument("fixture", nargs="?", type=Path, help="Recorded efetch/baseline XML (.xml.gz)")
+    parser.add_argument("--articles", type=int, default=20000, help="Size of the generated fixture")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.fixture
+        if path is None:
+            path = Path(tmp) / f"efetch_{args.articles}.xml.gz"
+            make_fixture(path, args.articles)
+        report = benchmark(path)
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
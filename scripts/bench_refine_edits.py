@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Refinement benchmark. Compares full regeneration with edit-only refinement.
+
+Runs the API in-process against scripts/openai_standin.py with a paced output
+token rate, generates one message of --claims claims, then refines it
+--refines times in each mode ("full" and "edits"). Reports mean latency and
+tokens per refine from the generation_usage table.
+Requires the API package to be importable (pip install -e apps/api).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+
+async def run_modes(refines: int, claims: int) -> dict:
+    from sqlalchemy import select
+
+    from app.database import SessionLocal
+    from app.main import app
+    from app.models.chunk import Chunk
+    from app.models.generation_usage import GenerationUsage
+    from app.models.message_version import MessageVersion
+    from app.models.reference import Reference
+
+    async with app.router.lifespan_context(app):
+        db = SessionLocal()
+        db.add(Reference(id=1, title="Bench", source="test"))
+        db.flush()
+        for i in range(claims):
+            db.add(Chunk(
+                reference_id=1,
+                chunk_index=i,
+                content=f"In trial arm {i}, once-weekly dosing reduced HbA1c by {i}.{i} percentage points versus placebo.",
+            ))
+        db.commit()
+        db.close()
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=600) as client:
+            message = (await client.post(
+                "/messages/generate",
+                json={"prompt": "once-weekly dosing HbA1c trial arm", "reference_ids": [1], "top_k": claims},
+            )).json()
+
+            report = {"claims_in_message": len(message["claims"])}
+            for mode in ("full", "edits"):
+                latencies = []
+                for i in range(refines):
+                    start = time.perf_counter()
+                    resp = await client.post(f"/messages/{message['message_id']}/refine", json={
+                        "instruction": f"tighten the wording of the dosing arm claim ({mode} {i})",
+                        "reference_ids": [1],
+                        "top_k": claims,
+                        "mode": mode,
+                    })
+                    resp.raise_for_status()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                report[mode] = {"mean_ms": round(statistics.mean(latencies), 1)}
+
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(MessageVersion.prompt_or_instruction, GenerationUsage)
+                .join(GenerationUsage, GenerationUsage.message_version_id == MessageVersion.id)
+                .where(MessageVersion.source == "refined")
+            ).all()
+        for mode in ("full", "edits"):
+            usage = [u for instruction, u in rows if f"({mode} " in instruction]
+            report[mode]["prompt_tokens"] = round(statistics.mean(u.prompt_tokens for u in usage))
+            report[mode]["completion_tokens"] = round(statistics.mean(u.completion_tokens for u in usage))
+            report[mode]["llm_latency_ms"] = round(statistics.mean(u.latency_ms for u in usage), 1)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark full vs edit-only refinement")
+    parser.add_argument("--refines", type=int, default=10)
+    parser.add_argument("--claims", type=int, default=8, help="Claims in the message being refined")
+    parser.add_argument("--tokens-per-second", type=float, default=80, help="Simulated output token rate")
+    parser.add_argument("--ttft-ms", type=float, default=300)
+    parser.add_argument("--port", type=int, default=8104)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{Path(tmp.name) / 'app.db'}",
+        "OPENAI_API_KEY": "standin",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.port}/v1",
+        "LLM_CACHE_PATH": "",
+        "PUBMED_CACHE_PATH": "",
+    })
+    # Settings are read at import time, so the app is imported only after the
+    # environment above is in place.
+    from bench_llm_pool import start_standin
+
+    proc = start_standin(args.port, 0, [
+        "--ttft-ms", str(args.ttft_ms),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--max-claims", str(args.claims),
+    ])
+    try:
+        report = asyncio.run(run_modes(args.refines, args.claims))
+    finally:
+        proc.terminate()
+        proc.wait()
+        tmp.cleanup()
+
+    print(json.dumps({"refines_per_mode": args.refines, "tokens_per_second": args.tokens_per_second, **report}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Citation repair evaluation. Counts the regenerations that repair avoids.
+
+Builds a seeded eval set of messages. Each message has --chunks retrieved
+trial-result chunks and --claims claims paraphrased from them. Citations are
+then corrupted the way models miscite: another retrieved chunk, a neighbouring
+id, or an id that was never retrieved. Some messages also get an unsupported
+claim, paraphrased from a chunk outside the retrieved set but in the same
+vocabulary. Every message is verified with and without repair.
+
+A message needs a retry when any claim is dropped. The report gives retries in
+each mode, citations repaired, repairs that picked a chunk other than the
+claim's source, and unsupported claims that repair wrongly kept.
+Requires the API package to be importable (pip install -e apps/api).
+"""
+
+import argparse
+import json
+import random
+import sys
+
+from app.services.grounding_verifier import verify_claims
+from app.services.llm_provider import LLMCitation, LLMClaim
+
+DRUGS = [
+    "semaglutide", "tirzepatide", "dulaglutide", "liraglutide", "exenatide",
+    "empagliflozin", "dapagliflozin", "canagliflozin", "sitagliptin", "insulin glargine",
+]
+ENDPOINTS = [
+    ("HbA1c", "percentage points"), ("body weight", "kg"), ("fasting plasma glucose", "mmol/L"),
+    ("systolic blood pressure", "mmHg"), ("LDL cholesterol", "mg/dL"), ("triglycerides", "mg/dL"),
+]
+COMPARATORS = ["placebo", "metformin", "sitagliptin", "insulin degludec", "standard care"]
+POPULATIONS = ["adults with type 2 diabetes", "patients with obesity", "patients with chronic kidney disease"]
+SAFETY = [
+    "Nausea was the most common adverse event and was mostly mild.",
+    "Discontinuation due to adverse events was uncommon.",
+    "Rates of severe hypoglycaemia were low and similar between groups.",
+]
+
+
+def _finding(rng: random.Random) -> dict:
+    endpoint, unit = rng.choice(ENDPOINTS)
+    return {
+        "drug": rng.choice(DRUGS),
+        "endpoint": endpoint,
+        "unit": unit,
+        "change": f"{rng.uniform(0.3, 9.0):.1f}",
+        "comparator": rng.choice(COMPARATORS),
+        "weeks": rng.choice([24, 26, 40, 52, 68, 72]),
+        "population": rng.choice(POPULATIONS),
+    }
+
+
+def _chunk_text(f: dict, rng: random.Random) -> str:
+    return (
+        f"In {f['population']}, once-weekly {f['drug']} reduced {f['endpoint']} by {f['change']} {f['unit']} "
+        f"versus {f['comparator']} over {f['weeks']} weeks. {rng.choice(SAFETY)}"
+    )
+
+
+def _claim_text(f: dict, rng: random.Random) -> str:
+    templates = [
+        "{drug} lowered {endpoint} by {change} {unit} compared with {comparator} at week {weeks}.",
+        "Compared with {comparator}, {drug} reduced {endpoint} by {change} {unit} after {weeks} weeks.",
+        "At {weeks} weeks, {endpoint} fell by {change} {unit} with {drug} relative to {comparator}.",
+    ]
+    return rng.choice(templates).format(**f).capitalize()
+
+
+def build_eval_set(args: argparse.Namespace) -> list[dict]:
+    rng = random.Random(args.seed)
+    messages = []
+    next_id = 1
+    for _ in range(args.messages):
+        findings = [_finding(rng) for _ in range(args.chunks + 1)]
+        chunks = []
+        for f in findings[:args.chunks]:
+            chunks.append({"id": next_id, "reference_id": next_id // 10 + 1, "content": _chunk_text(f, rng)})
+            next_id += 1
+        ids = [c["id"] for c in chunks]
+
+        claims = []
+        for source in rng.sample(range(args.chunks), args.claims):
+            cited = ids[source]
+            if rng.random() < args.miscite_rate:
+                kind = rng.random()
+                if kind < 0.6:
+                    cited = rng.choice([i for i in ids if i != ids[source]])
+                elif kind < 0.8:
+                    cited = ids[source] + rng.choice([-1, 1])
+                else:
+                    cited = 10_000_000 + rng.randrange(1000)
+            claims.append({"text": _claim_text(findings[source], rng), "cited": cited, "source": ids[source]})
+        if rng.random() < args.unsupported_rate:
+            # Paraphrased from a finding that was not retrieved.
+            claims.append({"text": _claim_text(findings[-1], rng), "cited": rng.choice(ids), "source": None})
+        messages.append({"chunks": chunks, "claims": claims})
+    return messages
+
+
+def evaluate(messages: list[dict], repair: bool) -> dict:
+    report = {"retries": 0, "dropped_claims": 0, "repaired": 0, "wrong_repairs": 0, "unsupported_kept": 0}
+    for message in messages:
+        claims = [
+            LLMClaim(text=c["text"], citations=[LLMCitation(reference_id=1, chunk_id=c["cited"])])
+            for c in message["claims"]
+        ]
+        supported, dropped = verify_claims(claims, message["chunks"], repair=repair)
+        report["dropped_claims"] += len(dropped)
+        report["retries"] += bool(dropped)
+        source = {c["text"]: c["source"] for c in message["claims"]}
+        for claim in supported:
+            for citation in claim.citations:
+                if citation.repaired:
+                    report["repaired"] += 1
+                    report["wrong_repairs"] += citation.chunk_id != source[claim.text]
+            report["unsupported_kept"] += source[claim.text] is None
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Evaluate citation repair on a seeded miscitation set")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--chunks", type=int, default=8, help="Retrieved chunks per message")
+    parser.add_argument("--claims", type=int, default=4, help="Supported claims per message")
+    parser.add_argument("--miscite-rate", type=float, default=0.1, help="Fraction of claims with a corrupted citation")
+    parser.add_argument("--unsupported-rate", type=float, default=0.1, help="Fraction of messages with an unsupported claim")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    messages = build_eval_set(args)
+    without = evaluate(messages, repair=False)
+    with_repair = evaluate(messages, repair=True)
+    print(json.dumps({
+        "messages": len(messages),
+        "claims": sum(len(m["claims"]) for m in messages),
+        "without_repair": without,
+        "with_repair": with_repair,
+        "retries_avoided": without["retries"] - with_repair["retries"],
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Local OpenAI-compatible stand-in for benchmarks and soak tests.
+
+Serves /v1/chat/completions (structured output, streaming and non-streaming)
+with claims citing the supplied chunks. A profile injects time to first token,
+token rate, server errors and 429s so the real OpenAIProvider path can be
+exercised without an API key. GET /stats returns request counters.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHUNK_LINE = re.compile(r"^- chunk_id=(\d+) reference_id=(\d+): (.*)$", re.MULTILINE)
+PREVIOUS_CLAIM_LINE = re.compile(r"^\[(\d+)\] ", re.MULTILINE)
+STREAM_CHUNK_CHARS = 16
+
+
+@dataclass
+class Profile:
+    ttft_ms: float = 0.0
+    slow_rate: float = 0.0
+    slow_ttft_ms: float = 0.0
+    tokens_per_second: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after_s: float = 1.0
+    max_claims: int = 3
+    seed: int | None = None
+
+
+def build_claims(user_message: str, max_claims: int = 3) -> dict:
+    claims = []
+    for chunk_id, reference_id, content in CHUNK_LINE.findall(user_message)[:max_claims]:
+        sentence = re.split(r"(?<=[.!?])\s+", content.strip())[0]
+        claims.append({
+            "text": sentence,
+            "citations": [{"reference_id": int(reference_id), "chunk_id": int(chunk_id)}],
+        })
+    return {"claims": claims}
+
+
+def build_edits(user_message: str) -> dict:
+    # Refinement in edit mode: rewrite the last previous claim from the first chunk.
+    previous = PREVIOUS_CLAIM_LINE.findall(user_message)
+    replacement = build_claims(user_message, max_claims=1)["claims"]
+    if not previous or not replacement:
+        return {"edits": []}
+    return {"edits": [{"op": "replace", "claim_id": int(previous[-1]), **replacement[0]}]}
+
+
+def _error(status: int, message: str, error_type: str, headers: dict | None = None) -> JSONResponse:
+    return JSONResponse(
+        {"error": {"message": message, "type": error_type, "param": None, "code": None}},
+        status_code=status,
+        headers=headers,
+    )
+
+
+def create_app(latency_ms: float = 0.0, profile: Profile | None = None) -> FastAPI:
+    # latency_ms is the fixed delay older benchmarks pass; it is the TTFT.
+    profile = profile or Profile(ttft_ms=latency_ms)
+    rng = random.Random(profile.seed)
+    stats = {"requests": 0, "completed": 0, "rate_limited": 0, "errors": 0, "slow": 0}
+    app = FastAPI(title="OpenAI stand-in")
+
+    def ttft_s() -> float:
+        if profile.slow_rate and rng.random() < profile.slow_rate:
+            stats["slow"] += 1
+            return profile.slow_ttft_ms / 1000
+        return profile.ttft_ms / 1000
+
+    def token_delay_s(tokens: int) -> float:
+        return tokens / profile.tokens_per_second if profile.tokens_per_second else 0.0
+
+    @app.get("/stats")
+    async def get_stats() -> dict:
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        stats["requests"] += 1
+        body = await request.json()
+
+        roll = rng.random()
+        if roll < profile.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return _error(
+                429, "Rate limit reached", "requests", {"retry-after": str(profile.retry_after_s)}
+            )
+        if roll < profile.rate_limit_rate + profile.error_rate:
+            stats["errors"] += 1
+            return _error(500, "The server had an error while processing your request", "server_error")
+
+        user_message = next((m["content"] for m in reversed(body["messages"]) if m["role"] == "user"), "")
+        schema_name = ((body.get("response_format") or {}).get("json_schema") or {}).get("name")
+        if schema_name == "LLMEditResult":
+            content = json.dumps(build_edits(user_message))
+        else:
+            content = json.dumps(build_claims(user_message, profile.max_claims))
+        model = body.get("model", "standin")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        usage = {
+            "prompt_tokens": sum(len(m["content"]) for m in body["messages"]) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": 0,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        first_token_delay = ttft_s()
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_delay + token_delay_s(usage["completion_tokens"]))
+            stats["completed"] += 1
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content, "refusal": None},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        def chunk(delta: dict, finish_reason: str | None = None) -> str:
+            return "data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }) + "\n\n"
+
+        async def events():
+            # Headers go out immediately; the first token follows the TTFT.
+            if first_token_delay:
+                await asyncio.sleep(first_token_delay)
+            yield chunk({"role": "assistant", "content": ""})
+            pause = token_delay_s(STREAM_CHUNK_CHARS // 4)
+            for i in range(0, len(content), STREAM_CHUNK_CHARS):
+                if pause and i:
+                    await asyncio.sleep(pause)
+                yield chunk({"content": content[i:i + STREAM_CHUNK_CHARS]})
+            yield chunk({}, "stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield "data: " + json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": usage,
+                }) + "\n\n"
+            yield "data: [DONE]\n\n"
+            stats["completed"] += 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the OpenAI stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Time to first token (alias of --ttft-ms)")
+    parser.add_argument("--ttft-ms", type=float, default=None, help="Time to first token")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests with --slow-ttft-ms")
+    parser.add_argument("--slow-ttft-ms", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Output token rate (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with 429s, in seconds")
+    parser.add_argument("--max-claims", type=int, default=3, help="Claims per full completion")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    profile = Profile(
+        ttft_ms=args.ttft_ms if args.ttft_ms is not None else args.latency_ms,
+        slow_rate=args.slow_rate,
+        slow_ttft_ms=args.slow_ttft_ms,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_s=args.retry_after,
+        max_claims=args.max_claims,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(profile=profile), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""LLM soak test. Streams claims through the API's provider chain against scripts/openai_standin.py.
+
+The stand-in injects time to first token, a token rate, 500s and 429s; the
+provider chain (OpenAIProvider, optional HedgedProvider, GovernedProvider) is
+built the way the API builds it. Reports outcomes, client-side TTFT and total
+latency percentiles, plus the stand-in, governor and hedging counters.
+Requires the API package to be importable (pip install -e apps/api).
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+
+from app.services.generation import SYSTEM_PROMPT
+from app.services.llm_governor import GovernedProvider, LLMGovernor
+from app.services.llm_hedging import HedgedProvider
+from app.services.llm_provider import OpenAIProvider, StreamResult
+from bench_llm_pool import CHUNKS, start_standin
+
+
+def _percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 1)  # noqa: E731
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": round(ordered[-1], 1)}
+
+
+async def soak(base_url: str, args: argparse.Namespace) -> dict:
+    openai_provider = OpenAIProvider(api_key="standin", base_url=base_url, timeout=args.timeout, max_retries=0)
+    provider = openai_provider
+    governor = LLMGovernor(max_concurrency=args.llm_concurrency, max_queue=args.requests)
+    hedging = None
+    if args.hedge_after_ms > 0:
+        hedging = HedgedProvider(
+            provider, provider, args.hedge_after_ms / 1000, governor=governor, max_fraction=args.hedge_max_fraction
+        )
+        provider = hedging
+    provider = GovernedProvider(provider, governor, max_retries=args.max_retries, backoff_max=2.0)
+
+    outcomes: dict[str, int] = {}
+    ttft: list[float] = []
+    total: list[float] = []
+
+    # Clients send below the governor's concurrency, so latencies measure the
+    # upstream rather than time spent queued, and hedges have slots to use.
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            first = None
+            try:
+                result = StreamResult()
+                async for _ in provider.async_stream_claims(f"soak {i}", CHUNKS, SYSTEM_PROMPT, result):
+                    if first is None:
+                        first = time.perf_counter()
+                outcome = "ok" if result.parsed is not None else "unparsed"
+            except Exception as exc:
+                outcome = type(exc).__name__
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        if outcome == "ok":
+            ttft.append((first - start) * 1000)
+            total.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(args.requests)])
+    wall_s = time.perf_counter() - start
+    await openai_provider.aclose()
+
+    async with httpx.AsyncClient() as client:
+        standin_stats = (await client.get(base_url.removesuffix("/v1") + "/stats")).json()
+    return {
+        "wall_s": round(wall_s, 2),
+        "outcomes": outcomes,
+        "ttft": _percentiles(ttft),
+        "total": _percentiles(total),
+        "standin": standin_stats,
+        "governor": {k: governor.stats[k] for k in ("rate_limited", "upstream_errors", "retries", "rejected", "timed_out")},
+        "hedging": hedging.stats if hedging else None,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Soak-test the LLM provider chain against the stand-in")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-concurrency", type=int, default=40, help="governor slots, shared with hedges")
+    parser.add_argument("--port", type=int, default=8103)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--max-retries", type=int, default=3, help="429 and transient-error retries in GovernedProvider")
+    parser.add_argument("--hedge-after-ms", type=float, default=0.0, help="0 disables hedging")
+    parser.add_argument("--hedge-max-fraction", type=float, default=0.1)
+    parser.add_argument("--ttft-ms", type=float, default=300)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ttft-ms", type=float, default=3000)
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    profile_args = [
+        "--ttft-ms", str(args.ttft_ms),
+        "--slow-rate", str(args.slow_rate),
+        "--slow-ttft-ms", str(args.slow_ttft_ms),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--error-rate", str(args.error_rate),
+        "--rate-limit-rate", str(args.rate_limit_rate),
+        "--retry-after", "0.2",
+        "--seed", str(args.seed),
+    ]
+    proc = start_standin(args.port, 0, profile_args)
+    try:
+        report = asyncio.run(soak(f"http://127.0.0.1:{args.port}/v1", args))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print(json.dumps({"requests": args.requests, "concurrency": args.concurrency,
+                      "hedge_after_ms": args.hedge_after_ms, **report}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())